@@ -0,0 +1,115 @@
+import os
+import json
+import gzip
+
+# Format used when a stage writes an artifact: "json" (pretty-printed array, the
+# historical format), "jsonl" (one record per line) or "jsonl.gz"
+DEFAULT_FORMAT = os.environ.get("ARTIFACT_FORMAT", "json")
+
+EXTENSIONS = {
+    "json": ".json",
+    "jsonl": ".jsonl",
+    "jsonl.gz": ".jsonl.gz"
+}
+
+
+def artifact_path(output_dir, name, fmt=None):
+    fmt = fmt or DEFAULT_FORMAT
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Unknown artifact format '{fmt}', expected one of {list(EXTENSIONS)}")
+    return os.path.join(output_dir, name + EXTENSIONS[fmt])
+
+
+def find_artifact(output_dir, name):
+    """
+    Returns the path of an existing artifact in any format, or None.
+
+    If several formats exist (e.g. after switching ARTIFACT_FORMAT) the most
+    recently written one wins.
+    """
+    candidates = [artifact_path(output_dir, name, fmt) for fmt in EXTENSIONS]
+    existing = [p for p in candidates if os.path.exists(p)]
+    if not existing:
+        return None
+    return max(existing, key=os.path.getmtime)
+
+
+def _format_of(path):
+    for fmt, ext in sorted(EXTENSIONS.items(), key=lambda item: -len(item[1])):
+        if path.endswith(ext):
+            return fmt
+    raise ValueError(f"Cannot infer artifact format from '{path}'")
+
+
+def read_records(path):
+    """
+    Yields records one at a time.
+
+    Line-delimited files are streamed, so memory is bounded by one record.
+    Legacy .json arrays still have to be parsed in one go.
+    """
+    fmt = _format_of(path)
+    if fmt == "json":
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+
+    opener = gzip.open if fmt == "jsonl.gz" else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def write_records(path, records):
+    """
+    Writes an iterable of records without materializing it.
+
+    Output goes to a temp file that replaces the target only once every
+    record is written, so readers never see a half-written artifact.
+
+    Returns:
+        int: Number of records written
+    """
+    fmt = _format_of(path)
+    tmp_path = path + ".tmp"
+    count = 0
+
+    try:
+        if fmt == "json":
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("[")
+                for record in records:
+                    # Indented as a list element, so the file matches json.dump(records, indent=2)
+                    body = json.dumps(record, indent=2).replace("\n", "\n  ")
+                    f.write(",\n  " if count else "\n  ")
+                    f.write(body)
+                    count += 1
+                f.write("\n]" if count else "]")
+        else:
+            opener = gzip.open if fmt == "jsonl.gz" else open
+            with opener(tmp_path, 'wt', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False))
+                    f.write("\n")
+                    count += 1
+        os.replace(tmp_path, path)
+    except BaseException:
+        # A failing record generator must not leave a stray temp file behind
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+
+def read_artifact(output_dir, name):
+    path = find_artifact(output_dir, name)
+    if path is None:
+        raise FileNotFoundError(f"No '{name}' artifact in {output_dir}")
+    return read_records(path)
+
+
+def write_artifact(output_dir, name, records, fmt=None):
+    path = artifact_path(output_dir, name, fmt)
+    count = write_records(path, records)
+    return path, count
@@ -1,69 +1,147 @@
 import os
-import json
 import glob
-import tiktoken
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import hashlib
+import argparse
 
-def process_documents():
+from token_chunker import TokenChunker
+from artifacts import find_artifact, read_records, write_artifact
+from parallel import iter_parallel, ThroughputReport
+from ingest_manifest import load_manifest, save_manifest, diff_sources, print_changes, source_key, \
+    write_stale_report, merge_by_source
+
+STAGE_NAME = "chunking"
+
+# Using 'cl100k_base' which is used by GPT-4 and GPT-3.5
+ENCODING_NAME = "cl100k_base"
+
+# Recorded in the manifest; a run under another scheme cannot reuse its chunk IDs
+CHUNK_ID_SCHEME = "sha256(source, content)"
+
+def build_chunker():
+    # We want chunks of 300-512 tokens.
+    # Each document is encoded once and cut on token boundaries, so the token
+    # counts recorded below never need another encode() downstream.
+    return TokenChunker(encoding_name=ENCODING_NAME, chunk_size=512, chunk_overlap=50)
+
+# Per-process chunker, built once by init_worker instead of once per file
+_worker_state = {}
+
+def init_worker():
+    _worker_state["chunker"] = build_chunker()
+
+def content_chunk_id(key, content, seen):
+    """
+    Chunk ID derived from the source key and the chunk text, so the same
+    chunk gets the same ID on every run regardless of file order, and an
+    edited chunk gets a new one. `seen` counts IDs already issued for this
+    source; a text repeated within one file gets a numbered suffix.
+    """
+    digest = hashlib.sha256(f"{key}\x00{content}".encode('utf-8')).hexdigest()[:16]
+    chunk_id = f"chunk_{digest}"
+    seen[chunk_id] = seen.get(chunk_id, 0) + 1
+    return chunk_id if seen[chunk_id] == 1 else f"{chunk_id}_{seen[chunk_id]}"
+
+def chunk_file(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    # Split into chunks
+    return _worker_state["chunker"].split(content)
+
+def process_documents(incremental=False, input_dir=None, output_dir=None, workers=1):
     # Setup paths
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    input_dir = os.path.join(base_dir, '..', '..', 'week 1', 'data')
-    output_dir = os.path.join(base_dir, '..', 'output')
-    output_file = os.path.join(output_dir, 'chunked_documents.json')
+    input_dir = input_dir or os.path.join(base_dir, '..', '..', 'week 1', 'data')
+    output_dir = output_dir or os.path.join(base_dir, '..', 'output')
     
     os.makedirs(output_dir, exist_ok=True)
     
-    # Initialize tokenizer and splitter
-    # Using 'cl100k_base' which is used by GPT-4 and GPT-3.5
-    encoding = tiktoken.get_encoding("cl100k_base")
-    
-    # Text splitter setup
-    # We want chunks of 300-512 tokens. 
-    # RecursiveCharacterTextSplitter operates on characters by default, but we can use from_tiktoken_encoder.
-    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-        model_name="gpt-4",
-        chunk_size=512,
-        chunk_overlap=50
-    )
-    
     # Find all markdown files
     search_pattern = os.path.join(input_dir, "**", "*.md")
-    files = glob.glob(search_pattern, recursive=True)
+    files = sorted(glob.glob(search_pattern, recursive=True))
     
     print(f"Found {len(files)} markdown files in {input_dir}")
     
-    chunked_data = []
-    chunk_count = 0
+    manifest = load_manifest(output_dir, STAGE_NAME)
+    if not incremental or manifest.get("chunk_id_scheme") != CHUNK_ID_SCHEME:
+        manifest["files"] = {}
+    previous_files = manifest["files"]
+    changes = diff_sources(manifest, files, input_dir)
+    previous_file = find_artifact(output_dir, 'chunked_documents')
+    
+    if incremental:
+        print_changes(STAGE_NAME, changes)
+        if not (changes["added"] or changes["changed"] or changes["deleted"]) and previous_file:
+            print("No source changes detected, chunks are up to date.")
+            write_stale_report(output_dir, STAGE_NAME, [], changes)
+            return
+    
+    keys = sorted(changes["paths"])
+    unchanged = set(changes["unchanged"]) if previous_file else set()
+    to_chunk = [key for key in keys if key not in unchanged]
+    
+    file_chunks = {key: previous_files[key].get("chunk_ids", []) for key in unchanged}
+    
+    report = ThroughputReport(STAGE_NAME, workers)
+    results = iter_parallel(chunk_file, (changes["paths"][key] for key in to_chunk), workers,
+                            initializer=init_worker)
+    failed = set()
     
-    for file_path in files:
+    def chunk(key):
+        file_path = changes["paths"][key]
         print(f"Processing: {file_path}")
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Split into chunks
-            chunks = text_splitter.split_text(content)
+        ok, result = next(results)
+        if not ok:
+            failed.add(key)
+            print(f"Error processing {file_path}: {result}")
+            return
+        
+        file_chunks[key] = []
+        seen = {}
+        for piece in result:
+            chunk_id = content_chunk_id(key, piece["content"], seen)
+            file_chunks[key].append(chunk_id)
             
-            for chunk_text in chunks:
-                chunk_count += 1
-                chunk_id = f"chunk_{chunk_count:04d}"
-                token_count = len(encoding.encode(chunk_text))
-                
-                chunked_data.append({
-                    "chunk_id": chunk_id,
-                    "content": chunk_text,
-                    "source_file": os.path.abspath(file_path),
-                    "token_count": token_count
-                })
-                
-        except Exception as e:
-            print(f"Error processing {file_path}: {e}")
+            yield {
+                "chunk_id": chunk_id,
+                "content": piece["content"],
+                "source_file": os.path.abspath(file_path),
+                "token_count": piece["token_count"],
+                "token_offsets": [piece["token_start"], piece["token_end"]],
+                "tokenizer": ENCODING_NAME
+            }
+        report.add(size=os.path.getsize(file_path))
+    
+    previous = read_records(previous_file) if unchanged else ()
+    chunked_data = merge_by_source(keys, unchanged, previous,
+                                   lambda c: source_key(c["source_file"], input_dir), chunk)
             
     # Save output
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(chunked_data, f, indent=2)
+    output_file, total_chunks = write_artifact(output_dir, 'chunked_documents', chunked_data)
+    
+    if incremental:
+        # Chunks of a changed file whose text survived the edit keep their ID and are not stale
+        current_ids = {chunk_id for key in changes["changed"] for chunk_id in file_chunks.get(key, [])}
+        stale_ids = []
+        for key in changes["changed"] + changes["deleted"]:
+            stale_ids.extend(chunk_id for chunk_id in previous_files.get(key, {}).get("chunk_ids", [])
+                             if chunk_id not in current_ids)
+        write_stale_report(output_dir, STAGE_NAME, stale_ids, changes)
+    
+    manifest["files"] = {}
+    for key, fp in changes["fingerprints"].items():
+        if key not in failed:
+            manifest["files"][key] = dict(fp, chunk_ids=file_chunks.get(key, []))
+    manifest.pop("next_chunk_number", None)
+    manifest["chunk_id_scheme"] = CHUNK_ID_SCHEME
+    save_manifest(output_dir, STAGE_NAME, manifest)
+    report.finish(output_dir)
         
-    print(f"Successfully created {len(chunked_data)} chunks. Saved to {output_file}")
+    print(f"Successfully created {total_chunks} chunks. Saved to {output_file}")
 
 if __name__ == "__main__":
-    process_documents()
+    parser = argparse.ArgumentParser(description="Chunk markdown sources")
+    parser.add_argument("--incremental", action="store_true", help="Only re-chunk added/changed files")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (0 = all cores)")
+    args = parser.parse_args()
+    process_documents(incremental=args.incremental, workers=args.workers)
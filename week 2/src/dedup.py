@@ -0,0 +1,185 @@
+import os
+import re
+import zlib
+import argparse
+import numpy as np
+
+from artifacts import find_artifact, read_records, write_artifact
+
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 32          # 32 bands x 4 rows: pairs above ~0.45 Jaccard become candidates
+SHINGLE_SIZE = 5        # words per shingle
+SIMILARITY_THRESHOLD = 0.9
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r"\w+")
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles.
+
+    Each of the num_perm hash functions is (a * x + b) mod p over the CRC32
+    of a shingle, with a/b drawn from a fixed seed so signatures are stable
+    across runs and processes.
+    """
+
+    def __init__(self, num_perm=NUM_PERMUTATIONS, shingle_size=SHINGLE_SIZE, seed=1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.randint(1, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self.b = rng.randint(0, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+
+    def shingles(self, text):
+        words = _WORD_RE.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text):
+        """Returns a uint32 array of length num_perm, or None for text without words."""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles),
+                             dtype=np.uint64, count=len(shingles)) % _MERSENNE_PRIME
+        # (num_perm, n_shingles) fits in uint64: both factors are below 2^31
+        permuted = (np.outer(self.a, hashes) + self.b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+def estimate_similarity(sig_a, sig_b):
+    return float(np.mean(sig_a == sig_b))
+
+
+def find_duplicate_groups(signatures, group_keys, bands=LSH_BANDS, threshold=SIMILARITY_THRESHOLD):
+    """
+    Clusters near-duplicate chunks.
+
+    Args:
+        signatures (list): MinHash signature (or None) per chunk, in artifact order
+        group_keys (list): Chunks are only merged when their keys are equal
+        bands (int): LSH bands; candidates share at least one whole band
+        threshold (float): Minimum estimated Jaccard similarity to merge
+
+    Returns:
+        list: canonical position for every chunk (its own position if unique);
+              the canonical chunk of a cluster is the earliest one
+    """
+    parent = list(range(len(signatures)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    buckets = {}
+    for pos, sig in enumerate(signatures):
+        if sig is None:
+            continue
+        rows = len(sig) // bands
+        for band in range(bands):
+            bucket = (group_keys[pos], band, sig[band * rows:(band + 1) * rows].tobytes())
+            for other in buckets.setdefault(bucket, []):
+                root_a, root_b = find(pos), find(other)
+                if root_a == root_b:
+                    continue
+                if estimate_similarity(sig, signatures[other]) >= threshold:
+                    # Keep the earliest chunk as the root so it becomes canonical
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+            buckets[bucket].append(pos)
+
+    return [find(i) for i in range(len(signatures))]
+
+
+def merge_duplicates(canonical, duplicates):
+    """Folds the duplicate chunks' source references and roles into the canonical chunk."""
+    members = [canonical] + duplicates
+    merged = dict(canonical)
+    merged["duplicate_chunk_ids"] = [c.get("chunk_id") for c in duplicates]
+    merged["source_files"] = list(dict.fromkeys(c.get("source_file") for c in members if c.get("source_file")))
+    merged["sources"] = list(dict.fromkeys(c.get("source") for c in members if c.get("source")))
+
+    roles = []
+    for c in members:
+        roles.extend(c.get("accessible_roles", []))
+    merged["accessible_roles"] = list(dict.fromkeys(roles))
+    return merged
+
+
+def process_dedup(output_dir=None, threshold=SIMILARITY_THRESHOLD, cross_department=False):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    output_dir = output_dir or os.path.join(base_dir, '..', 'output')
+    input_file = find_artifact(output_dir, 'tagged_chunks')
+
+    if input_file is None:
+        print("Input file tagged_chunks not found.")
+        return
+
+    # Pass 1: signatures only, chunk text is not kept in memory
+    hasher = MinHasher()
+    signatures = []
+    group_keys = []
+    for chunk in read_records(input_file):
+        signatures.append(hasher.signature(chunk.get("content", "")))
+        # Merging across departments would widen access to the restricted copy
+        group_keys.append(None if cross_department else chunk.get("department"))
+
+    roots = find_duplicate_groups(signatures, group_keys, threshold=threshold)
+    clusters = {}
+    for pos, root in enumerate(roots):
+        if pos != root:
+            clusters.setdefault(root, []).append(pos)
+    # Positions that are folded into an earlier canonical chunk
+    folded = {pos for members in clusters.values() for pos in members}
+
+    # Pass 2: duplicates come later than their canonical chunk, so hold the
+    # canonical chunks of open clusters until their last member has been read
+    last_member = {root: members[-1] for root, members in clusters.items()}
+    held = {}
+    duplicates = {root: [] for root in clusters}
+    stats = {"input": len(roots), "output": 0, "removed": len(folded)}
+
+    def deduped_chunks():
+        ready = {}
+        next_pos = 0
+        for pos, chunk in enumerate(read_records(input_file)):
+            if pos in clusters:
+                held[pos] = chunk
+            elif pos in folded:
+                root = roots[pos]
+                duplicates[root].append(chunk)
+                if last_member[root] == pos:
+                    ready[root] = merge_duplicates(held.pop(root), duplicates.pop(root))
+            else:
+                ready[pos] = chunk
+
+            # Emit in input order; stop at a canonical chunk still waiting for members
+            while next_pos <= pos:
+                if next_pos in ready:
+                    stats["output"] += 1
+                    yield ready.pop(next_pos)
+                elif next_pos not in folded:
+                    break
+                next_pos += 1
+
+    output_file, _ = write_artifact(output_dir, 'deduped_chunks', deduped_chunks())
+
+    print("Deduplication complete.")
+    print(f"Chunks in: {stats['input']}")
+    print(f"Chunks out: {stats['output']}")
+    print(f"Near-duplicates folded: {stats['removed']} ({len(clusters)} clusters)")
+    print(f"Saved to {output_file}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Collapse near-duplicate chunks before embedding")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD,
+                        help="Minimum estimated Jaccard similarity to merge two chunks")
+    parser.add_argument("--cross-department", action="store_true",
+                        help="Also merge near-duplicates tagged with different departments")
+    args = parser.parse_args()
+    process_dedup(threshold=args.threshold, cross_department=args.cross_department)
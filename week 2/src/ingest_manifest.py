@@ -0,0 +1,162 @@
+import os
+import json
+import hashlib
+
+MANIFEST_VERSION = 1
+
+
+def get_manifest_path(output_dir, stage):
+    # One manifest file per stage so independent stages never race on the same file
+    return os.path.join(output_dir, 'manifest', f"{stage}.json")
+
+
+def load_manifest(output_dir, stage):
+    path = get_manifest_path(output_dir, stage)
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "stage": stage, "files": {}}
+
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        print(f"Manifest version mismatch for '{stage}', forcing full run.")
+        return {"version": MANIFEST_VERSION, "stage": stage, "files": {}}
+    return manifest
+
+
+def save_manifest(output_dir, stage, manifest):
+    path = get_manifest_path(output_dir, stage)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Write to a temp file first so a crash never leaves a truncated manifest
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_key(file_path, input_dir):
+    # Manifest keys are input-relative with forward slashes so they survive OS changes
+    return os.path.relpath(file_path, input_dir).replace('\\', '/')
+
+
+def fingerprint_file(file_path, previous=None):
+    """
+    Returns {size, mtime, sha256} for a file.
+
+    The content hash is only recomputed when size or mtime differ from the
+    previous fingerprint, so unchanged trees cost one stat() per file.
+    """
+    stat = os.stat(file_path)
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime") == stat.st_mtime:
+        return {"size": previous["size"], "mtime": previous["mtime"], "sha256": previous["sha256"]}
+
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "sha256": file_sha256(file_path)
+    }
+
+
+def diff_sources(manifest, file_paths, input_dir):
+    """
+    Compares the current source files against a stage manifest.
+
+    Args:
+        manifest (dict): Stage manifest from load_manifest()
+        file_paths (list): Current source files for the stage
+        input_dir (str): Root the manifest keys are relative to
+
+    Returns:
+        dict: added / changed / unchanged / deleted source keys, the
+              key -> absolute path map and the fresh fingerprints
+    """
+    known = manifest.get("files", {})
+    changes = {
+        "added": [],
+        "changed": [],
+        "unchanged": [],
+        "deleted": [],
+        "paths": {},
+        "fingerprints": {}
+    }
+
+    for file_path in file_paths:
+        key = source_key(file_path, input_dir)
+        previous = known.get(key)
+        current = fingerprint_file(file_path, previous)
+
+        changes["paths"][key] = file_path
+        changes["fingerprints"][key] = current
+
+        if previous is None:
+            changes["added"].append(key)
+        elif previous.get("sha256") != current["sha256"]:
+            changes["changed"].append(key)
+        else:
+            changes["unchanged"].append(key)
+
+    changes["deleted"] = sorted(k for k in known if k not in changes["paths"])
+    return changes
+
+
+def print_changes(stage, changes):
+    print(f"[{stage}] added={len(changes['added'])} changed={len(changes['changed'])} "
+          f"unchanged={len(changes['unchanged'])} deleted={len(changes['deleted'])}")
+
+
+def write_stale_report(output_dir, stage, stale_ids, changes):
+    """Writes the IDs produced from changed/deleted sources so downstream stores can drop them."""
+    report_file = os.path.join(output_dir, f"stale_{stage}.json")
+    report = {
+        "stage": stage,
+        "stale_ids": sorted(stale_ids),
+        "changed_sources": changes["changed"],
+        "deleted_sources": changes["deleted"]
+    }
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"[{stage}] {len(stale_ids)} stale IDs reported in {report_file}")
+    return report
+
+
+def merge_by_source(keys, unchanged, previous, key_of, produce):
+    """
+    Yields a stage's output records in source key order without loading the
+    previous artifact: records of unchanged sources are copied from
+    `previous` (which every stage writes sorted by source key), all other
+    sources are passed to produce(key).
+
+    Args:
+        keys (list): Current source keys, sorted
+        unchanged (set): Keys whose previous records can be reused
+        previous (iterable): Records of the last run, sorted by source key
+        key_of (callable): Maps a previous record to its source key
+        produce (callable): Returns an iterable of fresh records for a key
+    """
+    previous = iter(previous)
+    pending = next(previous, None)
+    for key in keys:
+        # Records of deleted sources are skipped here
+        while pending is not None and key_of(pending) < key:
+            pending = next(previous, None)
+
+        if key in unchanged:
+            while pending is not None and key_of(pending) == key:
+                yield pending
+                pending = next(previous, None)
+        else:
+            yield from produce(key)
+
+    # Release the previous artifact before the caller replaces it (required on Windows)
+    if hasattr(previous, 'close'):
+        previous.close()
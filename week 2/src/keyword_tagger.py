@@ -0,0 +1,144 @@
+import os
+from collections import deque
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a set of keywords.
+
+    Scanning visits each character of the text once, so the cost is linear
+    in the text length no matter how many keywords are loaded. Matches are
+    plain substring matches, the same as `keyword in text`.
+    """
+
+    def __init__(self, keywords):
+        """
+        Args:
+            keywords (iterable): (keyword, label) pairs; the label is what a
+                                 hit counts towards (e.g. a department)
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for keyword, label in keywords:
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = nxt
+            if label not in self.output[state]:
+                self.output[state].append(label)
+
+        # Breadth-first pass to wire failure links and inherit their outputs
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(ch, 0)
+                self.output[nxt] = self.output[nxt] + self.output[self.fail[nxt]]
+
+    def count(self, text):
+        """
+        Returns:
+            dict: label -> number of keyword occurrences in text
+        """
+        goto, fail, output = self.goto, self.fail, self.output
+        counts = {}
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for label in output[state]:
+                counts[label] = counts.get(label, 0) + 1
+        return counts
+
+
+class DepartmentTagger:
+    """
+    Department detection compiled once from role_mappings.json.
+
+    Gives the same answer as the original per-chunk loops: the first
+    department (in config order) named by a source path segment, else the
+    first keyword department (in config order) with any hit in the content,
+    else "general".
+    """
+
+    def __init__(self, config):
+        self.dept_mappings = config.get("departments", {})
+        self.dept_order = {dept: i for i, dept in enumerate(self.dept_mappings)}
+        # Lowercase keys for reliable matching
+        self.dept_roles = {k.lower(): v for k, v in self.dept_mappings.items()}
+
+        # Path segment lookup table; for case-insensitive duplicates the earlier department wins
+        self.segment_lookup = {}
+        for dept in self.dept_mappings:
+            self.segment_lookup.setdefault(dept.lower(), dept)
+
+        # Keyword departments map back to the department key with the same name
+        by_lower = {}
+        for dept in self.dept_mappings:
+            by_lower.setdefault(dept.lower(), dept)
+
+        keywords = []
+        self.keyword_order = {}
+        self.always_match = []  # an empty keyword is "in" every text
+        for i, (dept_key, words) in enumerate(config.get("keywords", {}).items()):
+            dept = by_lower.get(dept_key.lower())
+            if dept is None:
+                continue
+            self.keyword_order.setdefault(dept, i)
+            for kw in words:
+                keywords.append((kw, dept))
+                if not kw:
+                    self.always_match.append(dept)
+        self.automaton = KeywordAutomaton(keywords)
+
+    def department_from_path(self, source_path):
+        segments = source_path.replace('\\', '/').split('/')
+        matches = [self.segment_lookup[s.lower()] for s in segments if s.lower() in self.segment_lookup]
+        if not matches:
+            return None
+        return min(matches, key=self.dept_order.get)
+
+    def score_departments(self, content):
+        """
+        Returns:
+            dict: department -> keyword hits, for every department in one scan
+        """
+        scores = self.automaton.count(content.lower())
+        for dept in self.always_match:
+            scores[dept] = scores.get(dept, 0) + 1
+        return scores
+
+    def detect(self, chunk):
+        dept = self.department_from_path(chunk.get("source_file", ""))
+        if dept:
+            return dept
+
+        scores = self.score_departments(chunk.get("content", ""))
+        if scores:
+            return min(scores, key=self.keyword_order.get)
+        return "general"  # Fallback
+
+    def roles_for(self, dept):
+        return self.dept_roles.get(dept.lower(), [])
+
+    def tag(self, chunk):
+        dept = self.detect(chunk)
+        chunk['department'] = dept
+        chunk['accessible_roles'] = self.roles_for(dept)
+        chunk['source'] = os.path.basename(chunk.get("source_file", ""))
+        return chunk
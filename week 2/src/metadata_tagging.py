@@ -1,85 +1,77 @@
 import os
 import json
+import argparse
 
-def process_metadata_tagging():
+from artifacts import find_artifact, read_records, write_artifact
+from ingest_manifest import load_manifest, save_manifest, file_sha256
+from keyword_tagger import DepartmentTagger
+
+STAGE_NAME = "metadata_tagging"
+
+def load_reusable_tags(output_dir, manifest, config_hash):
+    # Previous tags are only valid if role_mappings.json has not changed since
+    previous_file = find_artifact(output_dir, 'tagged_chunks')
+    if manifest.get("config_sha256") != config_hash or previous_file is None:
+        return {}
+    return {c["chunk_id"]: c for c in read_records(previous_file)}
+
+def process_metadata_tagging(incremental=False, output_dir=None):
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    input_file = os.path.join(base_dir, '..', 'output', 'chunked_documents.json')
+    output_dir = output_dir or os.path.join(base_dir, '..', 'output')
+    input_file = find_artifact(output_dir, 'chunked_documents')
     config_file = os.path.join(base_dir, '..', 'config', 'role_mappings.json')
-    output_file = os.path.join(base_dir, '..', 'output', 'tagged_chunks.json')
     
-    if not os.path.exists(input_file):
-        print("Input file chunked_documents.json not found.")
+    if input_file is None:
+        print("Input file chunked_documents not found.")
         return
-
-    with open(input_file, 'r', encoding='utf-8') as f:
-        chunks = json.load(f)
         
     with open(config_file, 'r', encoding='utf-8') as f:
         config = json.load(f)
+    
+    config_hash = file_sha256(config_file)
+    manifest = load_manifest(output_dir, STAGE_NAME)
+    previous_tags = load_reusable_tags(output_dir, manifest, config_hash) if incremental else {}
         
-    dept_mappings = config.get("departments", {})
-    # Lowercase keys for reliable matching
-    dept_mappings_lower = {k.lower(): v for k, v in dept_mappings.items()}
+    # Path lookup and keyword automaton are compiled once, not per chunk
+    tagger = DepartmentTagger(config)
     
-    tagged_chunks = []
     stats = {}
+    counts = {"tagged": 0, "reused": 0}
     
-    for chunk in chunks:
-        source_path = chunk.get("source_file", "")
-        # Try to detect department from path
-        # Assume path contains department name folder (e.g. .../Finance/...)
-        # Also check content keywords if path fails? 
-        # The prompt says: "Detect department from source_file path OR keywords in content"
-        
-        detected_dept = None
-        
-        # 1. Path detection
-        norm_path = source_path.replace('\\', '/').split('/')
-        for dept_name in dept_mappings.keys():
-            if dept_name in norm_path or dept_name.lower() in [p.lower() for p in norm_path]:
-                detected_dept = dept_name
-                break
+    def tag_chunks():
+        for chunk in read_records(input_file):
+            previous = previous_tags.get(chunk["chunk_id"])
+            if previous and previous.get("content") == chunk.get("content") \
+                    and previous.get("source_file") == chunk.get("source_file"):
+                # Chunk IDs are never reissued, so same ID + content means the tag is still valid
+                stats[previous["department"]] = stats.get(previous["department"], 0) + 1
+                counts["reused"] += 1
+                yield previous
+                continue
+            
+            # Adds department, accessible_roles and source
+            chunk = tagger.tag(chunk)
+            
+            # Stats
+            stats[chunk['department']] = stats.get(chunk['department'], 0) + 1
+            counts["tagged"] += 1
+            yield chunk
         
-        # 2. Keyword detection (if path failed or is ambiguous)
-        if not detected_dept:
-             content_lower = chunk.get("content", "").lower()
-             keywords_map = config.get("keywords", {})
-             for dept_key, keywords in keywords_map.items():
-                 for kw in keywords:
-                     if kw in content_lower:
-                         # map dept_key back to dept_mappings key
-                         # finding case-insensitive match in dept_mappings keys
-                         for valid_dept in dept_mappings.keys():
-                             if valid_dept.lower() == dept_key.lower():
-                                 detected_dept = valid_dept
-                                 break
-                         if detected_dept: break
-                 if detected_dept: break
-
-        if not detected_dept:
-            detected_dept = "general" # Fallback
-
-        # Assign roles
-        roles = dept_mappings_lower.get(detected_dept.lower(), [])
-        
-        # Add metadata
-        chunk['department'] = detected_dept
-        chunk['accessible_roles'] = roles
-        chunk['source'] = os.path.basename(source_path)
-        
-        tagged_chunks.append(chunk)
-        
-        # Stats
-        stats[detected_dept] = stats.get(detected_dept, 0) + 1
-        
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(tagged_chunks, f, indent=2)
+    output_file, _ = write_artifact(output_dir, 'tagged_chunks', tag_chunks())
+    
+    manifest["config_sha256"] = config_hash
+    save_manifest(output_dir, STAGE_NAME, manifest)
         
     print("Tagging complete.")
+    if incremental:
+        print(f"Re-tagged {counts['tagged']} chunks ({counts['reused']} reused)")
     for dept, count in stats.items():
         print(f"{dept}: {count} chunks")
         
     print(f"Saved to {output_file}")
 
 if __name__ == "__main__":
-    process_metadata_tagging()
+    parser = argparse.ArgumentParser(description="Tag chunks with department and role metadata")
+    parser.add_argument("--incremental", action="store_true", help="Only re-tag new/changed chunks")
+    args = parser.parse_args()
+    process_metadata_tagging(incremental=args.incremental)
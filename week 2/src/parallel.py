@@ -0,0 +1,96 @@
+import os
+import json
+import time
+import functools
+import itertools
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def resolve_workers(workers):
+    # 0 or None means "use every core"
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def _safe_call(func, item):
+    # Errors are returned instead of raised so one bad file does not abort the pool
+    try:
+        return True, func(item)
+    except Exception as e:
+        return False, str(e)
+
+
+def iter_parallel(func, items, workers=1, initializer=None, initargs=(), window=None):
+    """
+    Lazily applies func to an iterable of items, yielding results in input order.
+
+    At most `window` items are in flight, so a streamed input is never
+    materialized and a fast producer cannot run ahead of the pool.
+
+    Args:
+        func (callable): Module-level (picklable) function of one item
+        items (iterable): Work items, may be a generator
+        workers (int): Process count, 1 runs inline, 0 uses all cores
+        initializer (callable): Per-process setup, e.g. building a tokenizer
+        initargs (tuple): Arguments for initializer
+        window (int): Max pending items, defaults to 4 per worker
+
+    Yields:
+        tuple: (ok, result_or_error) for each item
+    """
+    workers = resolve_workers(workers)
+    call = functools.partial(_safe_call, func)
+
+    if workers == 1:
+        if initializer:
+            initializer(*initargs)
+        for item in items:
+            yield call(item)
+        return
+
+    window = window or workers * 4
+    items = iter(items)
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        pending = deque(executor.submit(call, item) for item in itertools.islice(items, window))
+        while pending:
+            result = pending.popleft().result()
+            for item in itertools.islice(items, 1):
+                pending.append(executor.submit(call, item))
+            yield result
+
+
+class ThroughputReport:
+    def __init__(self, stage, workers=1):
+        self.stage = stage
+        self.workers = resolve_workers(workers)
+        self.items = 0
+        self.bytes = 0
+        self.start_time = time.perf_counter()
+
+    def add(self, items=1, size=0):
+        self.items += items
+        self.bytes += size
+
+    def finish(self, output_dir=None):
+        elapsed = time.perf_counter() - self.start_time
+        stats = {
+            "stage": self.stage,
+            "workers": self.workers,
+            "items": self.items,
+            "bytes": self.bytes,
+            "seconds": round(elapsed, 4),
+            "items_per_sec": round(self.items / elapsed, 2) if elapsed > 0 else 0,
+            "mb_per_sec": round(self.bytes / (1024 * 1024) / elapsed, 3) if elapsed > 0 else 0
+        }
+
+        print(f"[{self.stage}] {stats['items']} items, {stats['bytes'] / 1024:.1f} KB in {stats['seconds']:.2f}s "
+              f"({stats['items_per_sec']} items/s, {stats['mb_per_sec']} MB/s, {self.workers} workers)")
+
+        if output_dir:
+            report_dir = os.path.join(output_dir, 'reports')
+            os.makedirs(report_dir, exist_ok=True)
+            with open(os.path.join(report_dir, f"{self.stage}_throughput.json"), 'w', encoding='utf-8') as f:
+                json.dump(stats, f, indent=2)
+        return stats
@@ -1,65 +1,170 @@
 import os
-import json
 import glob
+import argparse
+import functools
 import pandas as pd
 
-def parse_csv_files():
+from artifacts import find_artifact, read_records, write_artifact
+from parallel import iter_parallel, ThroughputReport
+from ingest_manifest import load_manifest, save_manifest, diff_sources, print_changes, source_key, merge_by_source
+
+STAGE_NAME = "parse_csv"
+
+ROWS_PER_GROUP = 50000
+
+def rows_to_text(df):
+    """
+    Serializes every row as "col: value; col: value" without iterrows().
+
+    to_numpy() yields the same common dtype iterrows() sees, so numeric
+    upcasting and NaN rendering match the old per-row f-string exactly.
+    """
+    columns = df.columns.tolist()
+    if df.empty:
+        return []
+    
+    values = df.to_numpy()
+    # One str() conversion per column, then a single format call per row
+    column_text = [values[:, i].astype(str).tolist() for i in range(len(columns))]
+    template = "; ".join(str(col).replace('{', '{{').replace('}', '}}') + ": {}" for col in columns)
+    return [template.format(*row) for row in zip(*column_text)]
+
+def get_department(file_path, input_dir):
+    rel_path = os.path.relpath(file_path, input_dir)
+    parts = rel_path.split(os.sep)
+    return parts[0] if len(parts) > 0 else "Unknown"
+
+def parse_csv_file(file_path, input_dir):
+    # Use pandas to read
+    # Try utf-8 first, then fallback or ignore errors as per prompt hint "encoding_errors='ignore'"
+    try:
+        df = pd.read_csv(file_path, encoding='utf-8')
+    except UnicodeDecodeError:
+         df = pd.read_csv(file_path, encoding_errors='ignore')
+
+    columns = df.columns.tolist()
+    
+    # Convert rows to text format
+    text_content = "\n".join(rows_to_text(df))
+    
+    return {
+        "filename": os.path.basename(file_path),
+        "filepath": os.path.abspath(file_path),
+        "department": get_department(file_path, input_dir),
+        "columns": columns,
+        "row_count": len(df),
+        "text_content": text_content
+    }
+
+def iter_csv_row_groups(file_path, input_dir, rows_per_group=ROWS_PER_GROUP):
+    """
+    Yields one document per group of rows using chunked reads, so memory is
+    bounded by rows_per_group instead of the file size.
+
+    Note: dtypes are inferred per group, so a column that is integer in one
+    group and has blanks in another renders as "1" vs "1.0" across groups.
+    """
+    department = get_department(file_path, input_dir)
+    row_start = 0
+    
+    # Invalid bytes are dropped up front since a mid-file decode error cannot be retried
+    reader = pd.read_csv(file_path, encoding='utf-8', encoding_errors='ignore', chunksize=rows_per_group)
+    for group_index, df in enumerate(reader):
+        yield {
+            "filename": os.path.basename(file_path),
+            "filepath": os.path.abspath(file_path),
+            "department": department,
+            "columns": df.columns.tolist(),
+            "row_count": len(df),
+            "row_group": group_index,
+            "row_start": row_start,
+            "text_content": "\n".join(rows_to_text(df))
+        }
+        row_start += len(df)
+
+def parse_csv_files(incremental=False, input_dir=None, output_dir=None, workers=1, stream=False,
+                    rows_per_group=ROWS_PER_GROUP):
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    input_dir = os.path.join(base_dir, '..', '..', 'week 1', 'data')
-    output_dir = os.path.join(base_dir, '..', 'output')
-    output_file = os.path.join(output_dir, 'parsed_csv.json')
+    input_dir = input_dir or os.path.join(base_dir, '..', '..', 'week 1', 'data')
+    output_dir = output_dir or os.path.join(base_dir, '..', 'output')
     
     os.makedirs(output_dir, exist_ok=True)
     
-    parsed_data = []
-    
     search_pattern = os.path.join(input_dir, "**", "*.csv")
-    files = glob.glob(search_pattern, recursive=True)
+    files = sorted(glob.glob(search_pattern, recursive=True))
+    
+    manifest = load_manifest(output_dir, STAGE_NAME)
+    if not incremental:
+        manifest["files"] = {}
+    changes = diff_sources(manifest, files, input_dir)
+    previous_file = find_artifact(output_dir, 'parsed_csv')
+    
+    if incremental:
+        print_changes(STAGE_NAME, changes)
+        if not (changes["added"] or changes["changed"] or changes["deleted"]) and previous_file:
+            print("No CSV changes detected, output is up to date.")
+            return
+    
+    keys = sorted(changes["paths"])
+    unchanged = set(changes["unchanged"]) if previous_file else set()
+    to_parse = [key for key in keys if key not in unchanged]
     
-    print(f"Parsing {len(files)} CSV files...")
+    print(f"Parsing {len(to_parse)} CSV files ({len(keys) - len(to_parse)} reused)...")
     
-    for file_path in files:
-        try:
-            # Use pandas to read
-            # Try utf-8 first, then fallback or ignore errors as per prompt hint "encoding_errors='ignore'"
+    report = ThroughputReport(STAGE_NAME, 1 if stream else workers)
+    failed = set()
+    
+    if stream:
+        # Row groups are produced one at a time, so memory stays bounded by rows_per_group
+        def parse(key):
+            file_path = changes["paths"][key]
             try:
-                df = pd.read_csv(file_path, encoding='utf-8')
-            except UnicodeDecodeError:
-                 df = pd.read_csv(file_path, encoding_errors='ignore')
-
-            columns = df.columns.tolist()
-            
-            # Convert rows to text format
-            text_lines = []
-            for _, row in df.iterrows():
-                row_str = "; ".join([f"{col}: {row[col]}" for col in columns])
-                text_lines.append(row_str)
-            
-            text_content = "\n".join(text_lines)
-            
-            # Determine department
-            rel_path = os.path.relpath(file_path, input_dir)
-            parts = rel_path.split(os.sep)
-            department = parts[0] if len(parts) > 0 else "Unknown"
-            
-            parsed_data.append({
-                "filename": os.path.basename(file_path),
-                "filepath": os.path.abspath(file_path),
-                "department": department,
-                "columns": columns,
-                "row_count": len(df),
-                "text_content": text_content
-            })
-            
-            print(f"Processed: {os.path.basename(file_path)} ({len(df)} rows)")
-            
-        except Exception as e:
-            print(f"Error parsing {file_path}: {e}")
-            
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(parsed_data, f, indent=2)
+                for doc in iter_csv_row_groups(file_path, input_dir, rows_per_group):
+                    report.add(items=doc["row_count"])
+                    yield doc
+            except Exception as e:
+                # Like a failed file in the pooled path: logged, kept out of the manifest so
+                # the next run re-parses it whole, and the other files are still written.
+                # Row groups streamed before the error cannot be taken back and stay until then.
+                failed.add(key)
+                print(f"Error parsing {file_path}: {e}")
+                return
+            report.add(items=0, size=os.path.getsize(file_path))
+            print(f"Streamed: {os.path.basename(file_path)}")
+    else:
+        results = iter_parallel(functools.partial(parse_csv_file, input_dir=input_dir),
+                                (changes["paths"][key] for key in to_parse), workers)
+        
+        def parse(key):
+            file_path = changes["paths"][key]
+            ok, result = next(results)
+            if ok:
+                report.add(size=os.path.getsize(file_path))
+                print(f"Processed: {result['filename']} ({result['row_count']} rows)")
+                yield result
+            else:
+                failed.add(key)
+                print(f"Error parsing {file_path}: {result}")
+    
+    previous = read_records(previous_file) if unchanged else ()
+    parsed_data = merge_by_source(keys, unchanged, previous,
+                                  lambda doc: source_key(doc["filepath"], input_dir), parse)
+    output_file, _ = write_artifact(output_dir, 'parsed_csv', parsed_data)
+    
+    # Failed files are left out of the manifest so the next run retries them
+    manifest["files"] = {k: v for k, v in changes["fingerprints"].items() if k not in failed}
+    save_manifest(output_dir, STAGE_NAME, manifest)
+    report.finish(output_dir)
         
     print(f"Saved parsed CSV data to {output_file}")
 
 if __name__ == "__main__":
-    parse_csv_files()
+    parser = argparse.ArgumentParser(description="Parse CSV sources")
+    parser.add_argument("--incremental", action="store_true", help="Only re-parse added/changed files")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (0 = all cores)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Chunked reads, one document per row group; runs in one process, ignoring --workers")
+    parser.add_argument("--rows-per-group", type=int, default=ROWS_PER_GROUP, help="Rows per streamed document")
+    args = parser.parse_args()
+    parse_csv_files(incremental=args.incremental, workers=args.workers, stream=args.stream,
+                    rows_per_group=args.rows_per_group)
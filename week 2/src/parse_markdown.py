@@ -1,58 +1,101 @@
 import os
-import json
 import glob
 import re
+import argparse
+import functools
 
-def parse_markdown_files():
+from artifacts import find_artifact, read_records, write_artifact
+from parallel import iter_parallel, ThroughputReport
+from ingest_manifest import load_manifest, save_manifest, diff_sources, print_changes, source_key, merge_by_source
+
+STAGE_NAME = "parse_markdown"
+
+def parse_markdown_file(file_path, input_dir):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    # Extract title (first # heading)
+    title_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
+    title = title_match.group(1).strip() if title_match else "Untitled"
+    
+    # Extract section headings (##)
+    sections = re.findall(r'^##\s+(.+)$', content, re.MULTILINE)
+    
+    # Determine department from folder structure
+    # Path might be .../week 1/data/Finance/somefile.md
+    rel_path = os.path.relpath(file_path, input_dir)
+    parts = rel_path.split(os.sep)
+    department = parts[0] if len(parts) > 0 else "Unknown"
+    
+    return {
+        "filename": os.path.basename(file_path),
+        "full_file_path": os.path.abspath(file_path),
+        "title": title,
+        "section_headings": sections,
+        "content": content,
+        "department": department
+    }
+
+def parse_markdown_files(incremental=False, input_dir=None, output_dir=None, workers=1):
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    input_dir = os.path.join(base_dir, '..', '..', 'week 1', 'data')
-    output_dir = os.path.join(base_dir, '..', 'output')
-    output_file = os.path.join(output_dir, 'parsed_markdown.json')
+    input_dir = input_dir or os.path.join(base_dir, '..', '..', 'week 1', 'data')
+    output_dir = output_dir or os.path.join(base_dir, '..', 'output')
     
     os.makedirs(output_dir, exist_ok=True)
     
-    parsed_data = []
-    
     search_pattern = os.path.join(input_dir, "**", "*.md")
-    files = glob.glob(search_pattern, recursive=True)
-    
-    print(f"Parsing {len(files)} markdown files...")
-    
-    for file_path in files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Extract title (first # heading)
-            title_match = re.search(r'^#\s+(.+)$', content, re.MULTILINE)
-            title = title_match.group(1).strip() if title_match else "Untitled"
-            
-            # Extract section headings (##)
-            sections = re.findall(r'^##\s+(.+)$', content, re.MULTILINE)
-            
-            # Determine department from folder structure
-            # Path might be .../week 1/data/Finance/somefile.md
-            rel_path = os.path.relpath(file_path, input_dir)
-            parts = rel_path.split(os.sep)
-            department = parts[0] if len(parts) > 0 else "Unknown"
-            
-            parsed_data.append({
-                "filename": os.path.basename(file_path),
-                "full_file_path": os.path.abspath(file_path),
-                "title": title,
-                "section_headings": sections,
-                "content": content,
-                "department": department
-            })
+    files = sorted(glob.glob(search_pattern, recursive=True))
+    
+    manifest = load_manifest(output_dir, STAGE_NAME)
+    if not incremental:
+        manifest["files"] = {}
+    changes = diff_sources(manifest, files, input_dir)
+    previous_file = find_artifact(output_dir, 'parsed_markdown')
+    
+    if incremental:
+        print_changes(STAGE_NAME, changes)
+        if not (changes["added"] or changes["changed"] or changes["deleted"]) and previous_file:
+            print("No markdown changes detected, output is up to date.")
+            return
+    
+    keys = sorted(changes["paths"])
+    unchanged = set(changes["unchanged"]) if previous_file else set()
+    to_parse = [key for key in keys if key not in unchanged]
+    
+    print(f"Parsing {len(to_parse)} markdown files ({len(keys) - len(to_parse)} reused)...")
+    
+    report = ThroughputReport(STAGE_NAME, workers)
+    results = iter_parallel(functools.partial(parse_markdown_file, input_dir=input_dir),
+                            (changes["paths"][key] for key in to_parse), workers)
+    failed = set()
+    
+    def parse(key):
+        # Results arrive in to_parse order, which is the order merge_by_source asks for them
+        file_path = changes["paths"][key]
+        ok, result = next(results)
+        if ok:
+            report.add(size=os.path.getsize(file_path))
             print(f"Parsed: {os.path.basename(file_path)}")
-            
-        except Exception as e:
-            print(f"Error parsing {file_path}: {e}")
-            
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(parsed_data, f, indent=2)
+            yield result
+        else:
+            failed.add(key)
+            print(f"Error parsing {file_path}: {result}")
+    
+    previous = read_records(previous_file) if unchanged else ()
+    parsed_data = merge_by_source(keys, unchanged, previous,
+                                  lambda doc: source_key(doc["full_file_path"], input_dir), parse)
+    output_file, _ = write_artifact(output_dir, 'parsed_markdown', parsed_data)
+    
+    # Failed files are left out of the manifest so the next run retries them
+    manifest["files"] = {k: v for k, v in changes["fingerprints"].items() if k not in failed}
+    save_manifest(output_dir, STAGE_NAME, manifest)
+    report.finish(output_dir)
         
     print(f"Saved parsed data to {output_file}")
 
 if __name__ == "__main__":
-    parse_markdown_files()
+    parser = argparse.ArgumentParser(description="Parse markdown sources")
+    parser.add_argument("--incremental", action="store_true", help="Only re-parse added/changed files")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (0 = all cores)")
+    args = parser.parse_args()
+    parse_markdown_files(incremental=args.incremental, workers=args.workers)
@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import glob
+import time
+import hashlib
+import argparse
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from ingest_manifest import fingerprint_file
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.normpath(os.path.join(base_dir, '..', '..'))
+STATE_FILE = os.path.join('week 2', 'output', 'manifest', 'pipeline_runner.json')
+REPORT_FILE = os.path.join('week 2', 'output', 'reports', 'pipeline_run.json')
+LOG_DIR = os.path.join('week 2', 'output', 'reports', 'logs')
+
+# Shared helpers every week 2 stage imports; a change to them reruns everything
+WEEK2_COMMON = ["week 2/src/artifacts.py", "week 2/src/ingest_manifest.py", "week 2/src/parallel.py"]
+
+
+def artifact(path):
+    # Matches name.json / name.jsonl / name.jsonl.gz
+    return f"{path}.json*"
+
+
+# Paths are relative to the repository root. `inputs` are everything the
+# stage reads (sources, upstream artifacts, config, its own code); `outputs`
+# must exist for a cached stage to be skipped.
+STAGES = {
+    "parse_markdown": {
+        "script": "week 2/src/parse_markdown.py",
+        "deps": [],
+        "inputs": ["week 1/data/**/*.md"],
+        "outputs": [artifact("week 2/output/parsed_markdown")],
+        "workers": True
+    },
+    "parse_csv": {
+        "script": "week 2/src/parse_csv.py",
+        "deps": [],
+        "inputs": ["week 1/data/**/*.csv"],
+        "outputs": [artifact("week 2/output/parsed_csv")],
+        "workers": True
+    },
+    "text_cleaning": {
+        "script": "week 2/src/text_cleaning.py",
+        "deps": ["parse_markdown", "parse_csv"],
+        "inputs": [artifact("week 2/output/parsed_markdown"), artifact("week 2/output/parsed_csv")],
+        "outputs": [artifact("week 2/output/cleaned_documents")],
+        "workers": True
+    },
+    "chunking": {
+        # Chunks are cut from the markdown sources directly, not from the cleaned text
+        "script": "week 2/src/chunking.py",
+        "deps": [],
+        "inputs": ["week 1/data/**/*.md", "week 2/src/token_chunker.py"],
+        "outputs": [artifact("week 2/output/chunked_documents")],
+        "workers": True
+    },
+    "metadata_tagging": {
+        "script": "week 2/src/metadata_tagging.py",
+        "deps": ["chunking"],
+        "inputs": [artifact("week 2/output/chunked_documents"), "week 2/config/role_mappings.json",
+                   "week 2/src/keyword_tagger.py"],
+        "outputs": [artifact("week 2/output/tagged_chunks")]
+    },
+    "validation": {
+        # Exits non-zero on failed chunks, which stops everything downstream
+        "script": "week 2/src/validation.py",
+        "deps": ["metadata_tagging"],
+        "inputs": [artifact("week 2/output/tagged_chunks")],
+        "outputs": ["week 2/output/validation_results.json"],
+        "workers": True
+    },
+    "dedup": {
+        "script": "week 2/src/dedup.py",
+        "deps": ["metadata_tagging"],
+        "inputs": [artifact("week 2/output/tagged_chunks")],
+        "outputs": [artifact("week 2/output/deduped_chunks")]
+    },
+    "embeddings": {
+        "script": "week 3/src/embeddings.py",
+        "deps": ["validation", "dedup"],
+        "inputs": [artifact("week 2/output/deduped_chunks"), "week 3/config/embedding_config.json",
+                   "week 3/src/batch_encoding.py", "week 3/src/embedding_store.py", "week 3/src/embedding_cache.py",
+                   "week 3/src/embedding_backends.py", "week 3/src/embedding_pool.py", "week 3/src/projection.py",
+                   "week 3/src/resources.py"],
+        "outputs": ["week 3/output/embedding_store/meta.json"],
+        "workers": True
+    },
+    "index_embeddings": {
+        "script": "week 3/src/index_embeddings.py",
+        "deps": ["embeddings"],
+        "inputs": ["week 3/output/embedding_store/*", artifact("week 2/output/deduped_chunks"),
+                   "week 3/src/embedding_store.py", "week 3/src/vector_db_setup.py", "week 3/src/resources.py",
+                   "week 3/config/db_config.json",
+                   "week 3/src/role_registry.py", "week 3/config/role_registry.json",
+                   "week 3/src/projection.py", "week 3/src/batch_encoding.py", "week 3/config/embedding_config.json",
+                   "week 4/config/role_hierarchy.json"],
+        "outputs": ["week 3/output/vector_db"],
+        "workers": True
+    }
+}
+
+
+def resolve_paths(patterns):
+    paths = []
+    for pattern in patterns:
+        paths.extend(glob.glob(os.path.join(ROOT_DIR, pattern), recursive=True))
+    return sorted(set(p for p in paths if os.path.isfile(p)))
+
+
+def stage_fingerprint(name, stage, args, previous_files):
+    """
+    Hashes the stage's code, arguments and input files.
+
+    Returns:
+        tuple: (fingerprint, {relative path: file fingerprint}) so the next
+               run can skip re-hashing files whose size and mtime are unchanged
+    """
+    patterns = [stage["script"]] + stage["inputs"] + WEEK2_COMMON
+    digest = hashlib.sha256(json.dumps({"stage": name, "args": args}, sort_keys=True).encode('utf-8'))
+    files = {}
+    for path in resolve_paths(patterns):
+        key = os.path.relpath(path, ROOT_DIR).replace('\\', '/')
+        files[key] = fingerprint_file(path, previous_files.get(key))
+        digest.update(f"{key}:{files[key]['sha256']}\n".encode('utf-8'))
+    return digest.hexdigest(), files
+
+
+def outputs_exist(stage):
+    return all(glob.glob(os.path.join(ROOT_DIR, pattern)) for pattern in stage["outputs"])
+
+
+def run_process(cmd, log_path):
+    """
+    Runs one stage script and measures it.
+
+    Returns:
+        dict: exit_code, wall_s, cpu_s and peak_rss_mb (None where the OS
+              cannot report resource usage for a child process)
+    """
+    start = time.perf_counter()
+    with open(log_path, 'w', encoding='utf-8') as log:
+        proc = subprocess.Popen(cmd, cwd=ROOT_DIR, stdout=log, stderr=subprocess.STDOUT)
+
+        if hasattr(os, 'wait4'):
+            # wait4 returns the rusage of exactly this child, safe with concurrent stages
+            _, status, usage = os.wait4(proc.pid, 0)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            cpu = usage.ru_utime + usage.ru_stime
+            # ru_maxrss is KB on Linux, bytes on macOS
+            rss_bytes = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+            peak_rss_mb = rss_bytes / (1024 * 1024)
+        else:
+            proc.wait()
+            cpu, peak_rss_mb = None, None
+
+    return {
+        "exit_code": proc.returncode,
+        "wall_s": round(time.perf_counter() - start, 3),
+        "cpu_s": round(cpu, 3) if cpu is not None else None,
+        "peak_rss_mb": round(peak_rss_mb, 1) if peak_rss_mb is not None else None
+    }
+
+
+def stage_command(name, stage, args):
+    return [sys.executable, os.path.join(ROOT_DIR, stage["script"])] + args
+
+
+def load_state():
+    path = os.path.join(ROOT_DIR, STATE_FILE)
+    if not os.path.exists(path):
+        return {"stages": {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state):
+    path = os.path.join(ROOT_DIR, STATE_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def select_stages(targets):
+    # The requested stages plus everything they depend on
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in selected:
+            selected.add(name)
+            pending.extend(STAGES[name]["deps"])
+    return selected
+
+
+def run_pipeline(targets=None, force=False, jobs=2, workers=1, dry_run=False):
+    """
+    Runs the ingest DAG, at most `jobs` independent stages at a time.
+
+    A stage is skipped when its fingerprint matches the last successful
+    run and its outputs still exist. A failed stage stops its dependents
+    but not unrelated branches.
+
+    Returns:
+        dict: Per-stage report, also written to week 2/output/reports/pipeline_run.json
+    """
+    selected = select_stages(targets or list(STAGES))
+    order = [name for name in STAGES if name in selected]
+    state = load_state()
+    state_lock = threading.Lock()
+    os.makedirs(os.path.join(ROOT_DIR, LOG_DIR), exist_ok=True)
+
+    report = {"started": time.strftime("%Y-%m-%dT%H:%M:%S"), "stages": {}}
+    start = time.perf_counter()
+    status = {}
+
+    def stage_args(name):
+        args = []
+        if STAGES[name].get("workers") and workers != 1:
+            args += ["--workers", str(workers)]
+        return args
+
+    def execute(name):
+        stage = STAGES[name]
+        args = stage_args(name)
+        with state_lock:
+            previous = dict(state["stages"].get(name, {}))
+        fingerprint, files = stage_fingerprint(name, stage, args, previous.get("files", {}))
+
+        if not force and previous.get("fingerprint") == fingerprint and outputs_exist(stage):
+            return name, {"status": "cached", "fingerprint": fingerprint}
+        if dry_run:
+            return name, {"status": "would_run", "fingerprint": fingerprint}
+
+        cmd = stage_command(name, stage, args)
+        log_path = os.path.join(ROOT_DIR, LOG_DIR, f"{name}.log")
+        result = run_process(cmd, log_path)
+        result["status"] = "ok" if result["exit_code"] == 0 else "failed"
+        result["log"] = os.path.relpath(log_path, ROOT_DIR).replace('\\', '/')
+
+        if result["status"] == "ok":
+            # Fingerprint the inputs as they were when the stage started
+            with state_lock:
+                state["stages"][name] = {"fingerprint": fingerprint, "files": files}
+                save_state(state)
+        return name, result
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        running = {}
+        while len(status) < len(order):
+            for name in order:
+                if name in status or name in running.values():
+                    continue
+                deps = [d for d in STAGES[name]["deps"] if d in selected]
+                if any(status.get(d) in ("failed", "blocked") for d in deps):
+                    status[name] = "blocked"
+                    report["stages"][name] = {"status": "blocked"}
+                    print(f"[{name}] blocked by a failed dependency")
+                elif all(status.get(d) in ("ok", "cached", "would_run") for d in deps):
+                    running[executor.submit(execute, name)] = name
+                    print(f"[{name}] started")
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                name, result = future.result()
+                status[name] = result["status"]
+                report["stages"][name] = result
+                print(format_result(name, result))
+
+    report["stages"] = {name: report["stages"][name] for name in order}
+    report["wall_s"] = round(time.perf_counter() - start, 3)
+    report["succeeded"] = all(s in ("ok", "cached", "would_run") for s in status.values())
+
+    report_path = os.path.join(ROOT_DIR, REPORT_FILE)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print_summary(report)
+    print(f"Saved report to {report_path}")
+    return report
+
+
+def format_result(name, result):
+    if result["status"] in ("cached", "would_run", "blocked"):
+        return f"[{name}] {result['status']}"
+    cpu = f"{result['cpu_s']:.2f}s" if result["cpu_s"] is not None else "n/a"
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/a"
+    line = f"[{name}] {result['status']} wall={result['wall_s']:.2f}s cpu={cpu} peak_rss={rss}"
+    if result["status"] == "failed":
+        line += f" (exit {result['exit_code']}, see {result['log']})"
+    return line
+
+
+def print_summary(report):
+    print("-" * 70)
+    print(f"{'Stage':<18} {'Status':<10} {'Wall (s)':>10} {'CPU (s)':>10} {'Peak RSS (MB)':>15}")
+    print("-" * 70)
+    for name, result in report["stages"].items():
+        wall = result.get("wall_s")
+        cpu = result.get("cpu_s")
+        rss = result.get("peak_rss_mb")
+        print(f"{name:<18} {result['status']:<10} "
+              f"{wall if wall is not None else '-':>10} {cpu if cpu is not None else '-':>10} "
+              f"{rss if rss is not None else '-':>15}")
+    print("-" * 70)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the ingest pipeline as a DAG, skipping unchanged stages")
+    parser.add_argument("stages", nargs="*",
+                        help=f"Stages to bring up to date (with their dependencies): {', '.join(STAGES)}; default: all")
+    parser.add_argument("--force", action="store_true", help="Rerun stages even if their inputs are unchanged")
+    parser.add_argument("--jobs", type=int, default=2, help="Independent stages to run at once")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes passed to stages that support it")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages would run")
+    args = parser.parse_args()
+    unknown = [s for s in args.stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    result = run_pipeline(args.stages, force=args.force, jobs=args.jobs, workers=args.workers, dry_run=args.dry_run)
+    sys.exit(0 if result["succeeded"] else 1)
@@ -0,0 +1,93 @@
+import tiktoken
+
+# Preferred cut points, strongest first: paragraph break, line break, word start
+PARAGRAPH, NEWLINE, WORD = 3, 2, 1
+
+
+class TokenChunker:
+    """
+    Splits text on token boundaries after encoding it exactly once.
+
+    Each chunk is a window of at most chunk_size tokens; consecutive windows
+    share chunk_overlap tokens. Within the last boundary_window tokens of a
+    window the cut moves back to the nearest paragraph/line/word break, and
+    it never lands inside a multi-byte UTF-8 character.
+
+    token_count is the length of the token slice, so downstream stages can
+    budget context without re-encoding the chunk text.
+    """
+
+    def __init__(self, encoding_name="cl100k_base", chunk_size=512, chunk_overlap=50, boundary_window=64):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.encoding_name = encoding_name
+        self.encoding = tiktoken.get_encoding(encoding_name)
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.boundary_window = boundary_window
+
+    def _cut_strength(self, token_bytes):
+        # How good a place it is to start a new chunk at this token
+        if not token_bytes or 0x80 <= token_bytes[0] <= 0xBF:
+            return -1  # UTF-8 continuation byte, cutting here would split a character
+        if token_bytes.startswith(b"\n\n"):
+            return PARAGRAPH
+        if token_bytes.startswith(b"\n"):
+            return NEWLINE
+        if token_bytes[:1].isspace():
+            return WORD
+        return 0
+
+    def _find_end(self, strengths, start, hard_end):
+        if hard_end >= len(strengths):
+            return len(strengths)
+
+        lowest = max(start + 1, hard_end - self.boundary_window)
+        best, best_strength = None, 0
+        for i in range(hard_end, lowest - 1, -1):
+            if strengths[i] > best_strength:
+                best, best_strength = i, strengths[i]
+                if best_strength == PARAGRAPH:
+                    break
+        if best is not None:
+            return best
+
+        # No natural break nearby, fall back to the closest character boundary
+        for i in range(hard_end, start, -1):
+            if strengths[i] >= 0:
+                return i
+        return hard_end
+
+    def split(self, text):
+        """
+        Returns:
+            list: dicts with content, token_count, token_start and token_end
+                  (token offsets into the encoded document)
+        """
+        tokens = self.encoding.encode(text)
+        if not tokens:
+            return []
+
+        strengths = [self._cut_strength(b) for b in self.encoding.decode_tokens_bytes(tokens)]
+        chunks = []
+        start = 0
+        while start < len(tokens):
+            end = self._find_end(strengths, start, start + self.chunk_size)
+            window = tokens[start:end]
+            content = self.encoding.decode(window).strip()
+            if content:
+                chunks.append({
+                    "content": content,
+                    "token_count": len(window),
+                    "token_start": start,
+                    "token_end": end
+                })
+            if end >= len(tokens):
+                break
+
+            # Step back for the overlap, then forward to a character boundary
+            next_start = max(end - self.chunk_overlap, start + 1)
+            while next_start < end and strengths[next_start] < 0:
+                next_start += 1
+            start = next_start
+        return chunks
@@ -1,71 +1,211 @@
 import os
+import sys
 import json
+import zlib
+import argparse
+import itertools
 import tiktoken
 
-def run_validation():
+from artifacts import find_artifact, read_records
+from parallel import iter_parallel, ThroughputReport
+
+ENCODING_NAME = "cl100k_base"
+MAX_TOKENS = 512
+HISTOGRAM_BIN = 64       # token histogram bucket width, the last bucket holds everything above MAX_TOKENS
+BATCH_SIZE = 256         # chunks per worker task
+MAX_REPORTED_ISSUES = 1000
+
+_encoding = None
+
+def get_token_count(chunk):
+    # Chunks from the token chunker carry their count; only older ones are re-encoded
+    if chunk.get("tokenizer") == ENCODING_NAME and "token_count" in chunk:
+        return chunk["token_count"]
+
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding(ENCODING_NAME)
+    return len(_encoding.encode(chunk.get("content", "")))
+
+def validate_chunk(chunk):
+    """
+    Returns:
+        dict: chunk_id, department, token_count and the list of issues found
+    """
+    issues = []
+
+    # Token count check
+    text = chunk.get("content", "")
+    token_count = get_token_count(chunk)
+
+    # Strict upper limit check, soft lower limit check
+    if token_count > MAX_TOKENS:
+        issues.append(f"Token count {token_count} exceeds {MAX_TOKENS} limit")
+
+    # Metadata presence
+    if "department" not in chunk:
+        issues.append("Missing department field")
+
+    if "accessible_roles" not in chunk:
+        issues.append("Missing accessible_roles field")
+    elif not chunk["accessible_roles"]:
+         issues.append("Empty accessible_roles list")
+
+    if not text.strip():
+        issues.append("Empty content")
+
+    return {
+        "chunk_id": chunk.get("chunk_id", "unknown"),
+        "department": chunk.get("department", "unknown"),
+        "token_count": token_count,
+        "issues": issues
+    }
+
+def validate_batch(batch):
+    return [validate_chunk(chunk) for chunk in batch]
+
+def in_sample(chunk, sample_percent):
+    # Keyed on chunk_id so repeated sampled runs check the same chunks
+    if sample_percent >= 100:
+        return True
+    bucket = zlib.crc32(str(chunk.get("chunk_id", "")).encode('utf-8')) % 10000
+    return bucket < sample_percent * 100
+
+def _bucket_label(low):
+    # The last in-range bucket includes MAX_TOKENS itself
+    high = low + HISTOGRAM_BIN - 1
+    return f"{low}-{MAX_TOKENS if high >= MAX_TOKENS - 1 else high}"
+
+def histogram_label(token_count):
+    if token_count > MAX_TOKENS:
+        return f">{MAX_TOKENS}"
+    low = min(token_count // HISTOGRAM_BIN, (MAX_TOKENS - 1) // HISTOGRAM_BIN) * HISTOGRAM_BIN
+    return _bucket_label(low)
+
+def empty_histogram():
+    labels = [_bucket_label(low) for low in range(0, MAX_TOKENS, HISTOGRAM_BIN)]
+    return {label: 0 for label in labels + [f">{MAX_TOKENS}"]}
+
+def run_validation(sample_percent=100, fail_fast=False, workers=1, output_dir=None):
+    """
+    Streams tagged_chunks through the checks and writes validation_results.json.
+
+    Args:
+        sample_percent (float): Share of chunks to validate, 100 checks everything
+        fail_fast (bool): Stop at the first failing chunk
+        workers (int): Worker processes, 0 uses every core
+
+    Returns:
+        dict: The results written to disk, or None if there was nothing to validate
+    """
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    input_file = os.path.join(base_dir, '..', 'output', 'tagged_chunks.json')
-    output_file = os.path.join(base_dir, '..', 'output', 'validation_results.json')
-    
-    if not os.path.exists(input_file):
-        print("tagged_chunks.json not found.")
+    output_dir = output_dir or os.path.join(base_dir, '..', 'output')
+    input_file = find_artifact(output_dir, 'tagged_chunks')
+    output_file = os.path.join(output_dir, 'validation_results.json')
+    issues_file = os.path.join(output_dir, 'validation_issues.jsonl')
+
+    if input_file is None:
+        print("tagged_chunks not found.")
         return
 
-    with open(input_file, 'r', encoding='utf-8') as f:
-        chunks = json.load(f)
-        
-    encoding = tiktoken.get_encoding("cl100k_base")
-    
     results = {
-        "total_chunks": len(chunks),
+        "total_chunks": 0,
         "passed": 0,
         "failed": 0,
-        "issues": []
+        "issues": [],
+        "issues_truncated": 0,
+        "mode": {
+            "sample_percent": sample_percent,
+            "fail_fast": fail_fast,
+            "stopped_early": False
+        },
+        "stats": {
+            "skipped_by_sampling": 0,
+            "token_histogram": empty_histogram(),
+            "token_count": {"min": None, "max": None, "total": 0},
+            "departments": {}
+        }
     }
-    
-    for chunk in chunks:
-        chunk_id = chunk.get("chunk_id", "unknown")
-        issues = []
-        
-        # Token count check
-        text = chunk.get("content", "")
-        token_count = len(encoding.encode(text))
-        
-        # Strict upper limit check, soft lower limit check
-        if token_count > 512:
-            issues.append(f"Token count {token_count} exceeds 512 limit")
-        
-        # Metadata presence
-        if "department" not in chunk:
-            issues.append("Missing department field")
-        
-        if "accessible_roles" not in chunk:
-            issues.append("Missing accessible_roles field")
-        elif not chunk["accessible_roles"]:
-             issues.append("Empty accessible_roles list")
-             
-        if not text.strip():
-            issues.append("Empty content")
-            
-        if issues:
-            results["failed"] += 1
-            results["issues"].append({
-                "chunk_id": chunk_id,
-                "issue_type": "Validation Failed",
-                "details": issues
-            })
-        else:
-            results["passed"] += 1
-            
+    stats = results["stats"]
+    report = ThroughputReport("validation", workers)
+
+    def sampled_batches():
+        for chunk in read_records(input_file):
+            if in_sample(chunk, sample_percent):
+                yield chunk
+            else:
+                stats["skipped_by_sampling"] += 1
+
+    chunks = sampled_batches()
+    batches = iter(lambda: list(itertools.islice(chunks, BATCH_SIZE)), [])
+
+    # Every issue goes to the JSONL file; the summary keeps only the first ones
+    with open(issues_file, 'w', encoding='utf-8') as issues_out:
+        for ok, batch_result in iter_parallel(validate_batch, batches, workers=workers):
+            if not ok:
+                raise RuntimeError(f"Validation worker failed: {batch_result}")
+
+            for result in batch_result:
+                results["total_chunks"] += 1
+                report.add()
+                token_count = result["token_count"]
+                stats["token_histogram"][histogram_label(token_count)] += 1
+                counts = stats["token_count"]
+                counts["total"] += token_count
+                counts["min"] = token_count if counts["min"] is None else min(counts["min"], token_count)
+                counts["max"] = token_count if counts["max"] is None else max(counts["max"], token_count)
+
+                dept = stats["departments"].setdefault(result["department"], {"chunks": 0, "passed": 0, "failed": 0})
+                dept["chunks"] += 1
+
+                if result["issues"]:
+                    results["failed"] += 1
+                    dept["failed"] += 1
+                    issue = {
+                        "chunk_id": result["chunk_id"],
+                        "issue_type": "Validation Failed",
+                        "details": result["issues"]
+                    }
+                    issues_out.write(json.dumps(issue) + "\n")
+                    if len(results["issues"]) < MAX_REPORTED_ISSUES:
+                        results["issues"].append(issue)
+                    else:
+                        results["issues_truncated"] += 1
+                    if fail_fast:
+                        break
+                else:
+                    results["passed"] += 1
+                    dept["passed"] += 1
+
+            if fail_fast and results["failed"]:
+                results["mode"]["stopped_early"] = True
+                break
+
+    if results["total_chunks"]:
+        stats["token_count"]["mean"] = round(stats["token_count"]["total"] / results["total_chunks"], 2)
+    stats["throughput"] = report.finish()
+
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(results, f, indent=2)
-        
+
     print(f"Validation Complete.")
     print(f"Total: {results['total_chunks']}")
     print(f"Passed: {results['passed']}")
     print(f"Failed: {results['failed']}")
+    if sample_percent < 100:
+        print(f"Sampled {sample_percent}% ({stats['skipped_by_sampling']} chunks skipped)")
+    if results["mode"]["stopped_early"]:
+        print("Stopped at the first failure (--fail-fast).")
     if results['failed'] > 0:
-        print(f"See {output_file} for details.")
+        print(f"See {output_file} and {issues_file} for details.")
+    return results
 
 if __name__ == "__main__":
-    run_validation()
+    parser = argparse.ArgumentParser(description="Validate tagged chunks (exits with 1 if any chunk fails)")
+    parser.add_argument("--sample", type=float, default=100, help="Percent of chunks to validate")
+    parser.add_argument("--fail-fast", action="store_true", help="Stop at the first failing chunk")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (0 = all cores)")
+    args = parser.parse_args()
+    results = run_validation(sample_percent=args.sample, fail_fast=args.fail_fast, workers=args.workers)
+    # Non-zero exit lets the ingest pipeline use validation as a gate
+    sys.exit(0 if results and results["failed"] == 0 else 1)
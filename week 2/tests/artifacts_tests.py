@@ -0,0 +1,70 @@
+import unittest
+import tempfile
+import json
+import sys
+import os
+
+# Set paths
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from artifacts import write_records, read_records, write_artifact, find_artifact, artifact_path
+
+RECORDS = [
+    {"chunk_id": "chunk_0001", "content": "Q4 revenue grew 12%\nline two", "roles": ["finance", "c-level"]},
+    {"chunk_id": "chunk_0002", "content": "Résumé — naïve café ✓", "nested": {"a": [1, 2, {"b": None}]}},
+    {"chunk_id": "chunk_0003", "content": "", "roles": [], "meta": {}},
+]
+
+
+class TestArtifacts(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output_dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_json_is_byte_identical_to_json_dump(self):
+        for records in (RECORDS, RECORDS[:1], []):
+            path = os.path.join(self.output_dir, "chunks.json")
+            count = write_records(path, iter(records))
+            with open(path, 'r', encoding='utf-8') as f:
+                written = f.read()
+            self.assertEqual(written, json.dumps(records, indent=2))
+            self.assertEqual(count, len(records))
+
+    def test_round_trip_every_format(self):
+        for fmt in ("json", "jsonl", "jsonl.gz"):
+            path, count = write_artifact(self.output_dir, f"chunks_{fmt.replace('.', '_')}", iter(RECORDS), fmt)
+            self.assertEqual(count, len(RECORDS))
+            self.assertEqual(list(read_records(path)), RECORDS)
+
+    def test_find_artifact_prefers_latest(self):
+        self.assertIsNone(find_artifact(self.output_dir, "chunks"))
+        old, _ = write_artifact(self.output_dir, "chunks", RECORDS, "json")
+        new, _ = write_artifact(self.output_dir, "chunks", RECORDS[:1], "jsonl")
+        os.utime(old, (1, 1))
+        self.assertEqual(find_artifact(self.output_dir, "chunks"), new)
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            artifact_path(self.output_dir, "chunks", "csv")
+
+    def test_failed_write_keeps_old_artifact_and_no_temp_file(self):
+        for fmt in ("json", "jsonl", "jsonl.gz"):
+            path, _ = write_artifact(self.output_dir, "chunks", RECORDS, fmt)
+
+            def failing():
+                yield RECORDS[0]
+                raise RuntimeError("chunking failed")
+
+            with self.assertRaises(RuntimeError):
+                write_records(path, failing())
+            self.assertFalse(os.path.exists(path + ".tmp"))
+            self.assertEqual(list(read_records(path)), RECORDS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from unittest import mock
+import random
+import sys
+import os
+
+# Set paths
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+import tiktoken
+import token_chunker
+from token_chunker import TokenChunker
+
+# Byte-level encoding with one merge, so the tests run without downloading
+# cl100k_base and every non-ASCII character spans several tokens
+RANKS = {bytes([i]): i for i in range(256)}
+RANKS[b"\n\n"] = 256
+STUB = tiktoken.Encoding(name="stub_bytes", pat_str=r"""\n\n|\n| ?[^\s]+|\s+""",
+                         mergeable_ranks=RANKS, special_tokens={})
+
+WORDS = "revenue café naïve 日本語 budget ✓ résumé quarter growth €42".split()
+
+
+def make_chunker(**kwargs):
+    with mock.patch.object(token_chunker.tiktoken, "get_encoding", return_value=STUB):
+        return TokenChunker(encoding_name="stub_bytes", **kwargs)
+
+
+def random_text(seed, n_words=600):
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(n_words):
+        parts.append(rng.choice(WORDS))
+        parts.append(rng.choice([" "] * 12 + ["\n", "\n\n"]))
+    return "".join(parts)
+
+
+class TestTokenChunker(unittest.TestCase):
+    def setUp(self):
+        self.chunker = make_chunker(chunk_size=64, chunk_overlap=8, boundary_window=16)
+        self.text = random_text(1)
+        self.tokens = STUB.encode(self.text)
+        self.chunks = self.chunker.split(self.text)
+
+    def test_window_limit(self):
+        self.assertGreater(len(self.chunks), 10)
+        for chunk in self.chunks:
+            self.assertLessEqual(chunk["token_count"], 64)
+            self.assertGreater(chunk["token_count"], 0)
+
+    def test_never_splits_a_utf8_character(self):
+        for seed in range(5):
+            text = random_text(seed)
+            tokens = STUB.encode(text)
+            for chunk in make_chunker(chunk_size=32, chunk_overlap=5, boundary_window=4).split(text):
+                window = STUB.decode_bytes(tokens[chunk["token_start"]:chunk["token_end"]])
+                window.decode("utf-8")  # strict, raises on a split character
+                self.assertNotIn("�", chunk["content"])
+
+    def test_offsets_match_token_count_and_content(self):
+        for chunk in self.chunks:
+            self.assertEqual(chunk["token_end"] - chunk["token_start"], chunk["token_count"])
+            self.assertEqual(STUB.decode(self.tokens[chunk["token_start"]:chunk["token_end"]]).strip(),
+                             chunk["content"])
+
+    def test_overlap_and_coverage(self):
+        self.assertEqual(self.chunks[0]["token_start"], 0)
+        self.assertEqual(self.chunks[-1]["token_end"], len(self.tokens))
+        for prev, chunk in zip(self.chunks, self.chunks[1:]):
+            # Steps back chunk_overlap tokens, then forward at most to the end of a 4-byte character
+            self.assertGreaterEqual(chunk["token_start"], prev["token_end"] - 8)
+            self.assertLessEqual(chunk["token_start"], prev["token_end"] - 8 + 3)
+            self.assertLess(chunk["token_start"], prev["token_end"])
+
+    def test_prefers_paragraph_break(self):
+        text = "a" * 50 + "\n\n" + "b " * 40 + "c" * 100
+        chunks = make_chunker(chunk_size=64, chunk_overlap=0, boundary_window=16).split(text)
+        self.assertEqual(chunks[0]["token_end"], 50)
+        self.assertEqual(chunks[0]["content"], "a" * 50)
+
+    def test_hard_cut_without_breaks(self):
+        chunks = make_chunker(chunk_size=64, chunk_overlap=0, boundary_window=16).split("x" * 200)
+        self.assertEqual([c["token_count"] for c in chunks], [64, 64, 64, 8])
+
+    def test_empty_text_and_invalid_overlap(self):
+        self.assertEqual(self.chunker.split(""), [])
+        with self.assertRaises(ValueError):
+            make_chunker(chunk_size=10, chunk_overlap=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
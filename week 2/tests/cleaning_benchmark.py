@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import glob
+import time
+import argparse
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+data_path = os.path.join(base_dir, '..', '..', 'week 1', 'data')
+sys.path.append(src_path)
+
+from text_cleaning import detailed_clean, clean_batch
+
+def load_corpus(target_mb):
+    # Repeat the week 1 documents until the corpus reaches the requested size
+    files = sorted(glob.glob(os.path.join(data_path, "**", "*.md"), recursive=True))
+    files += sorted(glob.glob(os.path.join(data_path, "**", "*.csv"), recursive=True))
+    docs = []
+    for file_path in files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            docs.append(f.read())
+
+    corpus = []
+    size = 0
+    while size < target_mb * 1024 * 1024:
+        for doc in docs:
+            corpus.append(doc)
+            size += len(doc)
+    return corpus, size
+
+def time_run(func, corpus, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = func(corpus)
+        best = min(best, time.perf_counter() - start)
+    return output, best
+
+def run_benchmark(target_mb, repeats):
+    corpus, size = load_corpus(target_mb)
+    size_mb = size / (1024 * 1024)
+    print(f"Cleaning benchmark: {len(corpus)} docs, {size_mb:.1f} MB, best of {repeats}")
+    print("-" * 50)
+
+    reference, old_time = time_run(lambda docs: [detailed_clean(d) for d in docs], corpus, repeats)
+    fast, new_time = time_run(lambda docs: list(clean_batch(docs)), corpus, repeats)
+
+    results = {
+        "documents": len(corpus),
+        "size_mb": size_mb,
+        "detailed_clean_s": old_time,
+        "clean_batch_s": new_time,
+        "detailed_clean_mb_per_s": size_mb / old_time,
+        "clean_batch_mb_per_s": size_mb / new_time,
+        "speedup": old_time / new_time,
+        "identical_output": reference == fast
+    }
+
+    print(f"detailed_clean:   {old_time:.3f} s  ({results['detailed_clean_mb_per_s']:.1f} MB/s)")
+    print(f"clean_batch:      {new_time:.3f} s  ({results['clean_batch_mb_per_s']:.1f} MB/s)")
+    print("-" * 50)
+    print(f"Speedup:          {results['speedup']:.2f}x")
+    print(f"Identical output: {results['identical_output']}")
+
+    output_file = os.path.join(base_dir, '..', 'output', 'cleaning_benchmark_results.json')
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved to {output_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark text cleaning")
+    parser.add_argument("--mb", type=float, default=20, help="Corpus size in MB")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.mb, args.repeats)
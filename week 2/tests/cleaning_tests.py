@@ -0,0 +1,76 @@
+import unittest
+import random
+import glob
+import sys
+import os
+
+# Set paths
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+data_path = os.path.join(base_dir, '..', '..', 'week 1', 'data')
+sys.path.append(src_path)
+
+from text_cleaning import detailed_clean, fast_clean, clean_batch
+
+# Hand-picked cases around whitespace, newlines and normalization
+EDGE_CASES = [
+    "",
+    "   ",
+    "\n\n\n\n",
+    "plain ascii text",
+    "  leading and trailing  \t ",
+    "tabs\t\tand   spaces",
+    "line one\n\n\n\nline two",
+    "a \n \n \n b",
+    "windows\r\nline\r\nendings\r\n",
+    "form\x0cfeed \x0b vertical\x1ctab",
+    "  \n\t\n  indented\n\n\n\t\tmore  \n",
+    "# Heading\n\n- **bold** item\n- `code` (parens) [link](http://x.y/z)",
+    "ﬁnancial ① ２０２４ ｆｕｌｌｗｉｄｔｈ",
+    "non\u00a0breaking\u2003em\u2009thin space",
+    "line\u2028separator\u2029paragraph\u0085nel",
+    "émojis 🚀 and accents café naïve",
+    "$1,234.56 | 50% | a+b=c <tag> & \"quotes\"",
+    "dash-es; colon: semi; bang! q? comma, dot.",
+    "\n\n  trailing newlines with spaces  \n\n\n",
+]
+
+FUZZ_ALPHABET = list("ab1 \t\n\r.,!?;:-_#*|$%()") + ["\x0b", "\x0c", "\x1c", "\u00a0", "\u2003", "\u2028",
+                                                       "\u0085", "\u00e9", "\ufb01", "\u2460", "\U0001f680", "\u3000"]
+
+
+class TestCleaningParity(unittest.TestCase):
+    def assertParity(self, text):
+        self.assertEqual(fast_clean(text), detailed_clean(text), msg=repr(text))
+
+    def test_edge_cases(self):
+        for text in EDGE_CASES:
+            self.assertParity(text)
+
+    def test_none_input(self):
+        self.assertEqual(fast_clean(None), detailed_clean(None))
+
+    def test_source_documents(self):
+        # Every markdown and CSV file shipped in week 1
+        files = glob.glob(os.path.join(data_path, "**", "*.md"), recursive=True)
+        files += glob.glob(os.path.join(data_path, "**", "*.csv"), recursive=True)
+        self.assertTrue(files)
+        for file_path in files:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                self.assertParity(f.read())
+
+    def test_random_corpus(self):
+        rng = random.Random(1234)
+        for _ in range(2000):
+            text = "".join(rng.choice(FUZZ_ALPHABET) for _ in range(rng.randint(0, 80)))
+            self.assertParity(text)
+
+    def test_clean_batch_is_lazy_and_ordered(self):
+        texts = (t for t in EDGE_CASES)
+        batch = clean_batch(texts)
+        self.assertFalse(isinstance(batch, list))
+        self.assertEqual(list(batch), [detailed_clean(t) for t in EDGE_CASES])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import pandas as pd
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from parse_csv import parse_csv_file, iter_csv_row_groups
+
+SAMPLE_CSV = os.path.join(base_dir, '..', '..', 'week 1', 'data', 'HR', 'hr_data.csv')
+
+def build_synthetic_csv(target_dir, rows):
+    # Tile the real hr_data.csv rows with unique employee IDs up to the requested size
+    sample = pd.read_csv(SAMPLE_CSV)
+    repeats = rows // len(sample) + 1
+    df = pd.concat([sample] * repeats, ignore_index=True).iloc[:rows]
+    df["employee_id"] = [f"EMP{i:08d}" for i in range(rows)]
+
+    dept_dir = os.path.join(target_dir, 'HR')
+    os.makedirs(dept_dir, exist_ok=True)
+    csv_path = os.path.join(dept_dir, 'hr_data.csv')
+    df.to_csv(csv_path, index=False)
+    return csv_path
+
+def iterrows_reference(file_path):
+    # The original per-row implementation, kept here as the baseline
+    df = pd.read_csv(file_path, encoding='utf-8')
+    columns = df.columns.tolist()
+    text_lines = []
+    for _, row in df.iterrows():
+        row_str = "; ".join([f"{col}: {row[col]}" for col in columns])
+        text_lines.append(row_str)
+    return "\n".join(text_lines)
+
+def measure(label, func, trace_memory=True):
+    # Timed without tracemalloc (it slows allocation-heavy code several times over),
+    # then optionally re-run once to capture peak Python heap usage
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    stats = {"seconds": elapsed}
+
+    line = f"{label:<22} {elapsed:8.2f} s"
+    if trace_memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats["peak_mb"] = peak / (1024 * 1024)
+        line += f"   peak {stats['peak_mb']:8.1f} MB"
+    print(line)
+    return result, stats
+
+def run_benchmark(rows, rows_per_group, skip_iterrows=False):
+    print(f"Starting CSV Benchmark ({rows} rows)...")
+    results = {"rows": rows, "rows_per_group": rows_per_group}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = build_synthetic_csv(tmp_dir, rows)
+        print(f"Synthetic file: {os.path.getsize(csv_path) / (1024 * 1024):.1f} MB")
+        print("-" * 56)
+
+        vectorized, results['vectorized'] = measure(
+            "vectorized", lambda: parse_csv_file(csv_path, tmp_dir)["text_content"])
+
+        def stream_all():
+            # Only one row group is alive at a time, which is the point of streaming
+            groups = 0
+            for doc in iter_csv_row_groups(csv_path, tmp_dir, rows_per_group):
+                groups += 1
+            return groups
+        groups, results['streaming'] = measure("streaming", stream_all)
+        results['streaming']['row_groups'] = groups
+
+        if not skip_iterrows:
+            reference, results['iterrows'] = measure(
+                "iterrows (baseline)", lambda: iterrows_reference(csv_path), trace_memory=False)
+            results['identical_output'] = reference == vectorized
+            results['speedup'] = results['iterrows']['seconds'] / results['vectorized']['seconds']
+
+    print("-" * 56)
+    if 'speedup' in results:
+        print(f"Vectorized speedup:   {results['speedup']:.1f}x")
+        print(f"Identical output:     {results['identical_output']}")
+
+    output_file = os.path.join(base_dir, '..', 'output', 'csv_benchmark_results.json')
+    with open(output_file, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved to {output_file}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark CSV row serialization")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--rows-per-group", type=int, default=50000)
+    parser.add_argument("--skip-iterrows", action="store_true", help="Skip the slow baseline")
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.rows_per_group, args.skip_iterrows)
@@ -0,0 +1,96 @@
+import unittest
+import tempfile
+import random
+import json
+import sys
+import os
+
+# Set paths
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from dedup import MinHasher, estimate_similarity, find_duplicate_groups, process_dedup
+
+WORDS = ("revenue campaign customer brand growth market retention loyalty partner quarter "
+         "europe latin america payment adoption churn spend budget channel social media").split()
+
+
+def random_text(rng, n_words=200):
+    return " ".join(rng.choice(WORDS) for _ in range(n_words))
+
+
+def chunk(chunk_id, content, department="marketing", roles=("marketing", "c-level"), source="a.md"):
+    return {
+        "chunk_id": chunk_id,
+        "content": content,
+        "source_file": f"data/{department}/{source}",
+        "department": department,
+        "accessible_roles": list(roles),
+        "source": source
+    }
+
+
+class TestMinHash(unittest.TestCase):
+    def setUp(self):
+        self.hasher = MinHasher()
+        self.rng = random.Random(42)
+
+    def test_identical_text(self):
+        text = random_text(self.rng)
+        self.assertEqual(estimate_similarity(self.hasher.signature(text), self.hasher.signature(text)), 1.0)
+
+    def test_near_duplicate_scores_high(self):
+        text = random_text(self.rng, 400)
+        edited = text.replace("revenue", "income", 1) + " extra closing words"
+        self.assertGreater(estimate_similarity(self.hasher.signature(text), self.hasher.signature(edited)), 0.8)
+
+    def test_unrelated_text_scores_low(self):
+        a = self.hasher.signature(random_text(self.rng))
+        b = self.hasher.signature(random_text(self.rng))
+        self.assertLess(estimate_similarity(a, b), 0.3)
+
+    def test_empty_text(self):
+        self.assertIsNone(self.hasher.signature(" ... "))
+
+    def test_groups_respect_keys(self):
+        sig = self.hasher.signature(random_text(self.rng))
+        roots = find_duplicate_groups([sig, sig, sig, None], ["a", "b", "a", "a"])
+        self.assertEqual(roots, [0, 1, 0, 3])
+
+
+class TestDedupStage(unittest.TestCase):
+    def test_collapses_near_duplicates(self):
+        rng = random.Random(7)
+        base = random_text(rng, 300)
+        other = random_text(rng, 300)
+        chunks = [
+            chunk("chunk_0001", base, source="q1.md"),
+            chunk("chunk_0002", other, source="q1.md"),
+            chunk("chunk_0003", base + " minor edit", roles=("marketing", "employees"), source="q3.md"),
+            chunk("chunk_0004", base, department="Finance", roles=("finance",), source="f.md"),
+            chunk("chunk_0005", "", source="q3.md"),
+        ]
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            with open(os.path.join(output_dir, 'tagged_chunks.json'), 'w', encoding='utf-8') as f:
+                json.dump(chunks, f)
+
+            stats = process_dedup(output_dir=output_dir)
+            with open(os.path.join(output_dir, 'deduped_chunks.json'), 'r', encoding='utf-8') as f:
+                deduped = json.load(f)
+
+        self.assertEqual(stats["removed"], 1)
+        self.assertEqual([c["chunk_id"] for c in deduped], ["chunk_0001", "chunk_0002", "chunk_0004", "chunk_0005"])
+
+        canonical = deduped[0]
+        self.assertEqual(canonical["duplicate_chunk_ids"], ["chunk_0003"])
+        self.assertEqual(canonical["source_files"], ["data/marketing/q1.md", "data/marketing/q3.md"])
+        self.assertEqual(canonical["sources"], ["q1.md", "q3.md"])
+        self.assertEqual(canonical["accessible_roles"], ["marketing", "c-level", "employees"])
+        # Same text in another department is kept separately
+        self.assertEqual(deduped[2]["accessible_roles"], ["finance"])
+
+
+if __name__ == '__main__':
+    unittest.main()
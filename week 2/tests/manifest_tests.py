@@ -0,0 +1,128 @@
+import unittest
+import tempfile
+import sys
+import os
+
+# Set paths
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from ingest_manifest import load_manifest, save_manifest, diff_sources, merge_by_source
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+class TestDiffSources(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmp.name, "data")
+        self.output_dir = os.path.join(self.tmp.name, "output")
+        self.paths = {key: os.path.join(self.input_dir, *key.split("/"))
+                      for key in ("finance/q1.md", "finance/q2.md", "hr/leave.md")}
+        for key, path in self.paths.items():
+            write(path, f"content of {key}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def record(self, changes):
+        manifest = load_manifest(self.output_dir, "parse")
+        manifest["files"] = changes["fingerprints"]
+        save_manifest(self.output_dir, "parse", manifest)
+
+    def test_first_run_adds_everything(self):
+        changes = diff_sources(load_manifest(self.output_dir, "parse"), list(self.paths.values()), self.input_dir)
+        self.assertEqual(sorted(changes["added"]), sorted(self.paths))
+        self.assertEqual(changes["changed"] + changes["unchanged"] + changes["deleted"], [])
+
+    def test_classifies_changes(self):
+        self.record(diff_sources(load_manifest(self.output_dir, "parse"), list(self.paths.values()), self.input_dir))
+
+        write(self.paths["finance/q1.md"], "edited content, a different size")
+        os.remove(self.paths["hr/leave.md"])
+        new_path = os.path.join(self.input_dir, "hr", "benefits.md")
+        write(new_path, "new file")
+
+        current = [self.paths["finance/q1.md"], self.paths["finance/q2.md"], new_path]
+        changes = diff_sources(load_manifest(self.output_dir, "parse"), current, self.input_dir)
+        self.assertEqual(changes["added"], ["hr/benefits.md"])
+        self.assertEqual(changes["changed"], ["finance/q1.md"])
+        self.assertEqual(changes["unchanged"], ["finance/q2.md"])
+        self.assertEqual(changes["deleted"], ["hr/leave.md"])
+        self.assertEqual(changes["paths"]["hr/benefits.md"], new_path)
+
+    def test_touched_but_identical_file_is_unchanged(self):
+        self.record(diff_sources(load_manifest(self.output_dir, "parse"), list(self.paths.values()), self.input_dir))
+        path = self.paths["finance/q2.md"]
+        stat = os.stat(path)
+        os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+        changes = diff_sources(load_manifest(self.output_dir, "parse"), [path], self.input_dir)
+        self.assertEqual(changes["unchanged"], ["finance/q2.md"])
+        self.assertEqual(changes["fingerprints"]["finance/q2.md"]["mtime"], stat.st_mtime + 10)
+
+    def test_unchanged_stat_skips_hashing(self):
+        previous = diff_sources(load_manifest(self.output_dir, "parse"), list(self.paths.values()), self.input_dir)
+        path = self.paths["finance/q1.md"]
+        # A fingerprint with matching size/mtime is trusted as-is
+        forged = dict(previous["fingerprints"]["finance/q1.md"], sha256="cached")
+        changes = diff_sources({"files": {"finance/q1.md": forged}}, [path], self.input_dir)
+        self.assertEqual(changes["fingerprints"]["finance/q1.md"]["sha256"], "cached")
+        self.assertEqual(changes["unchanged"], ["finance/q1.md"])
+
+
+class TestMergeBySource(unittest.TestCase):
+    def setUp(self):
+        self.previous = [
+            {"id": "a1", "source": "a"},
+            {"id": "a2", "source": "a"},
+            {"id": "b1", "source": "b"},
+            {"id": "gone1", "source": "bb"},
+            {"id": "c1", "source": "c"},
+        ]
+
+    def merge(self, keys, unchanged, previous=None):
+        produced = []
+
+        def produce(key):
+            produced.append(key)
+            return [{"id": f"{key}-new", "source": key}]
+
+        records = list(merge_by_source(keys, set(unchanged), iter(previous or self.previous),
+                                       lambda r: r["source"], produce))
+        return [r["id"] for r in records], produced
+
+    def test_reuses_unchanged_and_produces_the_rest(self):
+        ids, produced = self.merge(["a", "b", "c"], {"a", "c"})
+        self.assertEqual(ids, ["a1", "a2", "b-new", "c1"])
+        self.assertEqual(produced, ["b"])
+
+    def test_drops_deleted_and_inserts_added_in_order(self):
+        ids, produced = self.merge(["a", "ab", "c"], {"a", "c"})
+        self.assertEqual(ids, ["a1", "a2", "ab-new", "c1"])
+        self.assertEqual(produced, ["ab"])
+
+    def test_empty_previous(self):
+        ids, produced = self.merge(["a", "b"], set(), previous=[])
+        self.assertEqual(ids, ["a-new", "b-new"])
+
+    def test_closes_previous_generator(self):
+        closed = []
+
+        def previous():
+            try:
+                yield from self.previous
+            finally:
+                closed.append(True)
+
+        list(merge_by_source(["a"], {"a"}, previous(), lambda r: r["source"], lambda key: []))
+        self.assertEqual(closed, [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
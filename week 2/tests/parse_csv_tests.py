@@ -0,0 +1,61 @@
+import unittest
+import tempfile
+import contextlib
+import io
+import sys
+import os
+
+# Set paths
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from parse_csv import parse_csv_files, STAGE_NAME
+from artifacts import find_artifact, read_records
+from ingest_manifest import load_manifest
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+class TestParseCsvFailures(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmp.name, "data")
+        self.output_dir = os.path.join(self.tmp.name, "output")
+        write(os.path.join(self.input_dir, "finance", "good.csv"),
+              "item,amount\n" + "".join(f"row{i},{i}\n" for i in range(10)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_stage(self, **kwargs):
+        log = io.StringIO()
+        with contextlib.redirect_stdout(log):
+            parse_csv_files(input_dir=self.input_dir, output_dir=self.output_dir, **kwargs)
+        docs = list(read_records(find_artifact(self.output_dir, 'parsed_csv')))
+        return docs, load_manifest(self.output_dir, STAGE_NAME)["files"], log.getvalue()
+
+    def test_bad_file_is_skipped_in_both_modes(self):
+        write(os.path.join(self.input_dir, "hr", "empty.csv"), "")
+        for mode in ({"stream": False}, {"stream": True, "rows_per_group": 4}):
+            docs, files, log = self.run_stage(**mode)
+            self.assertEqual({doc["filename"] for doc in docs}, {"good.csv"})
+            self.assertEqual(sum(doc["row_count"] for doc in docs), 10)
+            self.assertEqual(sorted(files), ["finance/good.csv"])
+            self.assertIn("Error parsing", log)
+
+    def test_stream_error_after_first_row_group_keeps_other_files(self):
+        # The malformed row sits in the second row group, after the first was already streamed
+        write(os.path.join(self.input_dir, "hr", "broken.csv"), "a,b\n1,2\n3,4\n5,6\n7,8,9\n")
+        docs, files, log = self.run_stage(stream=True, rows_per_group=2)
+        self.assertEqual(sum(doc["row_count"] for doc in docs if doc["filename"] == "good.csv"), 10)
+        self.assertEqual(sorted(files), ["finance/good.csv"])
+        self.assertIn("broken.csv", log)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+import tempfile
+import sys
+import os
+
+# Set paths
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+import pipeline_runner
+
+# Each toy stage concatenates its inputs into its output and appends its name to a run log
+STAGE_SCRIPT = """
+import sys, time
+name, sources, target = sys.argv[1], sys.argv[2:-1], sys.argv[-1]
+time.sleep(0.2)
+text = "".join(open(source).read() for source in sources)
+if "FAIL" in text:
+    sys.exit(1)
+open(target, "w").write(text + name + "\\n")
+open("runs.log", "a").write(name + "\\n")
+"""
+
+
+class TestPipelineRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        with open(os.path.join(self.root, "stage.py"), "w") as f:
+            f.write(STAGE_SCRIPT)
+        self.write("a.txt", "source a\n")
+        self.write("b.txt", "source b\n")
+
+        self.saved = (pipeline_runner.ROOT_DIR, pipeline_runner.STAGES, pipeline_runner.WEEK2_COMMON)
+        pipeline_runner.ROOT_DIR = self.root
+        pipeline_runner.WEEK2_COMMON = []
+        pipeline_runner.STAGES = {
+            "parse_a": self.stage([], ["a.txt"], "a.out"),
+            "parse_b": self.stage([], ["b.txt"], "b.out"),
+            "merge": self.stage(["parse_a", "parse_b"], ["a.out", "b.out"], "merged.out"),
+            "tail": self.stage(["merge"], ["merged.out"], "tail.out"),
+        }
+
+    def tearDown(self):
+        pipeline_runner.ROOT_DIR, pipeline_runner.STAGES, pipeline_runner.WEEK2_COMMON = self.saved
+        self.tmp.cleanup()
+
+    def stage(self, deps, inputs, output):
+        return {"script": "stage.py", "deps": deps, "inputs": inputs, "outputs": [output],
+                "args": inputs + [output]}
+
+    def write(self, name, text):
+        with open(os.path.join(self.root, name), "w") as f:
+            f.write(text)
+
+    def runs(self):
+        path = os.path.join(self.root, "runs.log")
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            runs = f.read().split()
+        os.remove(path)
+        return runs
+
+    def run_pipeline(self, **kwargs):
+        # Toy stages take their name, input and output as arguments
+        original = pipeline_runner.stage_command
+        pipeline_runner.stage_command = lambda name, stage, args: \
+            [sys.executable, os.path.join(self.root, "stage.py"), name] + stage["args"]
+        try:
+            return pipeline_runner.run_pipeline(**kwargs)
+        finally:
+            pipeline_runner.stage_command = original
+
+    def test_runs_then_caches(self):
+        report = self.run_pipeline(jobs=2)
+        self.assertTrue(report["succeeded"])
+        self.assertEqual(sorted(self.runs()), ["merge", "parse_a", "parse_b", "tail"])
+        for name, result in report["stages"].items():
+            self.assertEqual(result["status"], "ok")
+            self.assertGreaterEqual(result["wall_s"], 0.2)
+            if hasattr(os, 'wait4'):
+                self.assertIsNotNone(result["cpu_s"])
+                self.assertGreater(result["peak_rss_mb"], 0)
+
+        report = self.run_pipeline(jobs=2)
+        self.assertEqual(self.runs(), [])
+        self.assertTrue(all(r["status"] == "cached" for r in report["stages"].values()))
+
+    def test_unchanged_output_stops_reruns(self):
+        self.run_pipeline()
+        self.runs()
+        # Same content with a new mtime: the hash is recomputed and still matches
+        self.write("a.txt", "source a\n")
+        os.utime(os.path.join(self.root, "a.txt"), (1, 1))
+        self.run_pipeline()
+        self.assertEqual(self.runs(), [])
+
+    def test_changed_input_reruns_only_dependents(self):
+        self.run_pipeline()
+        self.runs()
+        self.write("b.txt", "source b, edited\n")
+        self.run_pipeline()
+        self.assertEqual(self.runs(), ["parse_b", "merge", "tail"])
+
+    def test_missing_output_reruns_stage(self):
+        self.run_pipeline()
+        self.runs()
+        os.remove(os.path.join(self.root, "tail.out"))
+        self.run_pipeline()
+        self.assertEqual(self.runs(), ["tail"])
+
+    def test_failure_blocks_dependents(self):
+        self.write("b.txt", "FAIL\n")
+        report = self.run_pipeline()
+        self.assertFalse(report["succeeded"])
+        self.assertEqual(report["stages"]["parse_a"]["status"], "ok")
+        self.assertEqual(report["stages"]["parse_b"]["status"], "failed")
+        self.assertEqual(report["stages"]["merge"]["status"], "blocked")
+        self.assertEqual(report["stages"]["tail"]["status"], "blocked")
+
+    def test_independent_stages_overlap(self):
+        report = self.run_pipeline(targets=["parse_a", "parse_b"], jobs=2)
+        stage_walls = sum(r["wall_s"] for r in report["stages"].values())
+        self.assertLess(report["wall_s"], stage_walls)
+        self.assertEqual(set(report["stages"]), {"parse_a", "parse_b"})
+
+
+if __name__ == '__main__':
+    unittest.main()
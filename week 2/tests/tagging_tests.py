@@ -0,0 +1,127 @@
+import unittest
+import random
+import json
+import sys
+import os
+
+# Set paths
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+config_file = os.path.join(base_dir, '..', 'config', 'role_mappings.json')
+sys.path.append(src_path)
+
+from keyword_tagger import KeywordAutomaton, DepartmentTagger
+
+with open(config_file, 'r', encoding='utf-8') as f:
+    CONFIG = json.load(f)
+
+
+def detect_department(chunk, config, dept_mappings):
+    """
+    Reference oracle: the per-keyword scan metadata_tagging used before
+    DepartmentTagger. Path folder first, then the first keyword (in config
+    order) found in the content, else "general".
+    """
+    norm_path = chunk.get("source_file", "").replace('\\', '/').split('/')
+    for dept_name in dept_mappings.keys():
+        if dept_name in norm_path or dept_name.lower() in [p.lower() for p in norm_path]:
+            return dept_name
+
+    content_lower = chunk.get("content", "").lower()
+    for dept_key, keywords in config.get("keywords", {}).items():
+        for kw in keywords:
+            if kw in content_lower:
+                for valid_dept in dept_mappings.keys():
+                    if valid_dept.lower() == dept_key.lower():
+                        return valid_dept
+    return "general"
+
+SOURCE_PATHS = [
+    "",
+    "data/Finance/quarterly_report.md",
+    "data\\HR\\hr_data.csv",
+    "data/hr/handbook.md",
+    "data/MARKETING/q4.md",
+    "data/engineering/Finance/mixed.md",
+    "data/general/employee_handbook.md",
+    "data/unknown/notes.md",
+    "finance.md",
+]
+
+SNIPPETS = ["financial", "Budget", "employee", "SALARY", "campaign", "api", "system", "deploy",
+            "nothing relevant", "apiary", "codes", "Quarterly revenue", "brand-new", "sales"]
+
+
+def random_content(rng):
+    words = [rng.choice(SNIPPETS) for _ in range(rng.randint(0, 6))]
+    return " ".join(words)
+
+
+class TestKeywordAutomaton(unittest.TestCase):
+    def test_counts_match_substring_search(self):
+        keywords = [("he", "a"), ("she", "b"), ("his", "c"), ("hers", "a"), ("s", "d")]
+        automaton = KeywordAutomaton(keywords)
+        rng = random.Random(7)
+        for _ in range(500):
+            text = "".join(rng.choice("hers i") for _ in range(rng.randint(0, 30)))
+            expected = {}
+            for kw, label in keywords:
+                hits = sum(1 for i in range(len(text)) if text.startswith(kw, i))
+                if hits:
+                    expected[label] = expected.get(label, 0) + hits
+            self.assertEqual(automaton.count(text), expected, msg=text)
+
+    def test_shared_keyword_counts_for_every_label(self):
+        automaton = KeywordAutomaton([("budget", "finance"), ("budget", "marketing")])
+        self.assertEqual(automaton.count("budget budget"), {"finance": 2, "marketing": 2})
+
+    def test_empty_text(self):
+        self.assertEqual(KeywordAutomaton([("api", "engineering")]).count(""), {})
+
+
+class TestDepartmentTaggerParity(unittest.TestCase):
+    def setUp(self):
+        self.tagger = DepartmentTagger(CONFIG)
+        self.dept_mappings = CONFIG.get("departments", {})
+
+    def assertParity(self, chunk):
+        expected = detect_department(chunk, CONFIG, self.dept_mappings)
+        self.assertEqual(self.tagger.detect(chunk), expected, msg=repr(chunk))
+
+    def test_paths_and_keywords(self):
+        for path in SOURCE_PATHS:
+            for content in SNIPPETS + [""]:
+                self.assertParity({"source_file": path, "content": content})
+
+    def test_random_chunks(self):
+        rng = random.Random(1234)
+        for _ in range(2000):
+            self.assertParity({"source_file": rng.choice(SOURCE_PATHS), "content": random_content(rng)})
+
+    def test_missing_fields(self):
+        self.assertParity({})
+
+    def test_roles_match_config(self):
+        chunk = self.tagger.tag({"source_file": "data/Finance/report.md", "content": ""})
+        self.assertEqual(chunk["department"], "Finance")
+        self.assertEqual(chunk["accessible_roles"], self.dept_mappings["Finance"])
+        self.assertEqual(chunk["source"], "report.md")
+
+    def test_scores_every_department(self):
+        scores = self.tagger.score_departments("Budget for the API campaign, budget approved")
+        self.assertEqual(scores, {"Finance": 2, "engineering": 1, "marketing": 1})
+
+    def test_custom_config_order_and_case(self):
+        config = {
+            "departments": {"Ops": ["ops"], "ops": ["other"], "Legal": ["legal"]},
+            "keywords": {"legal": ["contract", ""], "OPS": ["contract"], "missing": ["x"]}
+        }
+        tagger = DepartmentTagger(config)
+        for path in ["a/OPS/b.md", "a/legal/b.md", "a/b.md"]:
+            for content in ["contract", "x", ""]:
+                chunk = {"source_file": path, "content": content}
+                self.assertEqual(tagger.detect(chunk), detect_department(chunk, config, config["departments"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import tempfile
+import json
+import sys
+import os
+
+# Set paths
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from validation import run_validation, histogram_label, ENCODING_NAME
+
+
+def chunk(n, token_count=100, department="Finance", roles=("finance",), content="Quarterly revenue grew."):
+    return {
+        "chunk_id": f"chunk_{n:04d}",
+        "content": content,
+        "token_count": token_count,
+        "tokenizer": ENCODING_NAME,
+        "department": department,
+        "accessible_roles": list(roles)
+    }
+
+
+class TestValidation(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.output_dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_chunks(self, chunks):
+        with open(os.path.join(self.output_dir, 'tagged_chunks.json'), 'w', encoding='utf-8') as f:
+            json.dump(chunks, f)
+
+    def test_counts_and_stats(self):
+        chunks = [chunk(i, token_count=i * 10) for i in range(1, 41)]
+        chunks.append(chunk(41, token_count=600, department="HR"))
+        chunks.append(chunk(42, roles=()))
+        chunks.append(chunk(43, content="   ", department="HR"))
+        self.write_chunks(chunks)
+
+        results = run_validation(output_dir=self.output_dir)
+        self.assertEqual(results["total_chunks"], 43)
+        self.assertEqual(results["failed"], 3)
+        self.assertEqual(results["passed"], 40)
+        self.assertEqual([i["chunk_id"] for i in results["issues"]], ["chunk_0041", "chunk_0042", "chunk_0043"])
+
+        stats = results["stats"]
+        self.assertEqual(sum(stats["token_histogram"].values()), 43)
+        self.assertEqual(stats["token_histogram"][">512"], 1)
+        self.assertEqual(stats["departments"]["HR"], {"chunks": 2, "passed": 0, "failed": 2})
+        self.assertEqual(stats["token_count"]["max"], 600)
+
+        with open(os.path.join(self.output_dir, 'validation_issues.jsonl'), 'r', encoding='utf-8') as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_fail_fast_stops_at_first_failure(self):
+        chunks = [chunk(i) for i in range(1, 1001)]
+        chunks[10]["accessible_roles"] = []
+        chunks[500]["accessible_roles"] = []
+        self.write_chunks(chunks)
+
+        results = run_validation(fail_fast=True, output_dir=self.output_dir)
+        self.assertEqual(results["failed"], 1)
+        self.assertTrue(results["mode"]["stopped_early"])
+        self.assertEqual(results["total_chunks"], 11)
+
+    def test_sample_is_deterministic(self):
+        self.write_chunks([chunk(i) for i in range(1, 2001)])
+        first = run_validation(sample_percent=10, output_dir=self.output_dir)
+        second = run_validation(sample_percent=10, output_dir=self.output_dir)
+        self.assertEqual(first["total_chunks"], second["total_chunks"])
+        self.assertEqual(first["total_chunks"] + first["stats"]["skipped_by_sampling"], 2000)
+        self.assertLess(abs(first["total_chunks"] - 200), 60)
+
+    def test_parallel_matches_serial(self):
+        chunks = [chunk(i, token_count=(i * 37) % 700) for i in range(1, 801)]
+        self.write_chunks(chunks)
+        serial = run_validation(output_dir=self.output_dir)
+        parallel = run_validation(workers=2, output_dir=self.output_dir)
+        for key in ("total_chunks", "passed", "failed", "issues"):
+            self.assertEqual(serial[key], parallel[key])
+        self.assertEqual(serial["stats"]["token_histogram"], parallel["stats"]["token_histogram"])
+
+    def test_histogram_labels(self):
+        self.assertEqual(histogram_label(0), "0-63")
+        self.assertEqual(histogram_label(511), "448-512")
+        self.assertEqual(histogram_label(512), "448-512")
+        self.assertEqual(histogram_label(513), ">512")
+
+
+if __name__ == '__main__':
+    unittest.main()
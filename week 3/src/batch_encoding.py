@@ -0,0 +1,103 @@
+import os
+import json
+import itertools
+import numpy as np
+
+DEFAULT_CONFIG = {
+    "model_name": "all-MiniLM-L6-v2",
+    "batch_size": 64,
+    "sort_window": 4096,
+    "store_dtype": "float32",
+    "model_revision": None,
+    "cache_enabled": True,
+    "cache_max_mb": 512,
+    "backend": "torch",
+    "max_seq_length": 256,
+    "onnx_model_dir": "../output/onnx/all-MiniLM-L6-v2",
+    "onnx_quantized": True,
+    "onnx_threads": 0,
+    "parity_min_cosine": 0.98,
+    "query_cache_size": 1024,
+    "query_cache_ttl_seconds": 3600,
+    "query_batch_max_size": 32,
+    "query_batch_max_wait_ms": 5,
+    "projection_method": "pca",
+    "projection_dim": 0
+}
+
+
+def load_embedding_config():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    config_path = os.path.join(base_dir, '..', 'config', 'embedding_config.json')
+    config = dict(DEFAULT_CONFIG)
+    if os.path.exists(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    return config
+
+
+def text_length(chunk):
+    # The chunker's token count is a good proxy for the model's own sequence length
+    if chunk.get("token_count") is not None:
+        return chunk["token_count"]
+    return len(chunk.get("content", ""))
+
+
+def encode_sorted(encode, texts, lengths, batch_size=64):
+    """
+    Encodes texts in batches of similar length and returns vectors in input order.
+
+    Sorting by length keeps the padding inside each batch small, which is
+    where most of the time goes when short and long chunks are mixed.
+
+    Args:
+        encode (callable): list of str -> 2D array, one row per text
+        texts (list): Texts to encode
+        lengths (list): Length estimate per text, used only for ordering
+        batch_size (int): Texts per encode call
+
+    Returns:
+        np.ndarray: (len(texts), dim) float32 matrix
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    order = sorted(range(len(texts)), key=lambda i: lengths[i])
+    vectors = None
+    for start in range(0, len(order), batch_size):
+        batch = order[start:start + batch_size]
+        embeddings = np.asarray(encode([texts[i] for i in batch]), dtype=np.float32)
+        if vectors is None:
+            vectors = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+        # Scatter back to the original positions
+        vectors[batch] = embeddings
+    return vectors
+
+
+def iter_encoded_windows(encode, chunks, batch_size=64, sort_window=4096, cache=None):
+    """
+    Streams (chunks, vectors) windows in input order.
+
+    Chunks are length-sorted within windows of sort_window chunks, so only
+    one window is held in memory however large the corpus is. With an
+    EmbeddingCache only the chunks it has not seen reach the model.
+    """
+    chunks = iter(chunks)
+    while True:
+        window = list(itertools.islice(chunks, sort_window))
+        if not window:
+            return
+        texts = [c.get("content", "") for c in window]
+        lengths = [text_length(c) for c in window]
+        if cache is None:
+            vectors = encode_sorted(encode, texts, lengths, batch_size)
+        else:
+            vectors = cache.encode(texts, lambda missing: encode_sorted(
+                encode, [texts[i] for i in missing], [lengths[i] for i in missing], batch_size))
+        yield window, vectors
+
+
+def iter_encoded(encode, chunks, batch_size=64, sort_window=4096, cache=None):
+    """Streams (chunk, vector) pairs in input order."""
+    for window, vectors in iter_encoded_windows(encode, chunks, batch_size, sort_window, cache):
+        yield from zip(window, vectors)
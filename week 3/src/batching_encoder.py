@@ -0,0 +1,146 @@
+import time
+import queue
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+_STOP = object()
+
+
+class BatchingEncoder:
+    """
+    Encodes single queries from many threads as shared micro-batches.
+
+    Callers submit a query and get a Future. A background thread encodes
+    pending queries in one encode_many(list) call and resolves every future
+    with its own row. When the encoder is idle a query is dispatched at once,
+    together with whatever is already queued, so a lone query never waits.
+    Queries that arrive while an encode is in flight queue up behind it and
+    form the next batch; only then does the thread keep collecting until
+    max_batch_size queries are waiting or max_wait_ms have passed since the
+    oldest of them was submitted. Under load batches fill up instead.
+
+    stats() reports the queue depth, the batch size distribution and the
+    wait each query spent before its batch was dispatched, to tune the window.
+    """
+
+    def __init__(self, encode_many, max_batch_size=32, max_wait_ms=5, history=4096):
+        self.encode_many = encode_many
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="batching-encoder", daemon=True)
+        self.requests = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.max_queue_depth = 0
+        self.batch_sizes = Counter()
+        self._waits = deque(maxlen=history)
+        self._encode_times = deque(maxlen=history)
+        self._thread.start()
+
+    def submit(self, query):
+        """Queues one query; the Future resolves to its embedding row."""
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("BatchingEncoder is closed")
+            self._queue.put((query, future, time.monotonic()))
+            self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return future
+
+    def encode(self, texts, timeout=None, **kwargs):
+        """
+        Model-like entry point: a single string joins the shared batches, a
+        list is already a batch and is encoded directly.
+        """
+        if isinstance(texts, str):
+            return self.submit(texts).result(timeout)
+        return self.encode_many(list(texts))
+
+    def _collect(self, first, wait):
+        batch = [first]
+        deadline = first[2] + self.max_wait if wait else 0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Finish this batch, then stop
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            # Anything already waiting queued up during the previous encode:
+            # that is load, so the window may fill the batch. Otherwise the
+            # encoder was idle and the next query goes out immediately.
+            try:
+                item, busy = self._queue.get_nowait(), True
+            except queue.Empty:
+                item, busy = self._queue.get(), False
+            if item is _STOP:
+                return
+            batch = [entry for entry in self._collect(item, busy) if entry[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            dispatched = time.monotonic()
+            try:
+                vectors = self.encode_many([query for query, _, _ in batch])
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                with self._lock:
+                    self.failed_batches += 1
+            else:
+                for (_, future, _), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            with self._lock:
+                self.requests += len(batch)
+                self.batches += 1
+                self.batch_sizes[len(batch)] += 1
+                self._waits.extend(dispatched - submitted for _, _, submitted in batch)
+                self._encode_times.append(time.monotonic() - dispatched)
+
+    def stats(self):
+        with self._lock:
+            waits = np.array(self._waits) * 1000
+            encode_times = np.array(self._encode_times) * 1000
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "batch_sizes": dict(sorted(self.batch_sizes.items())),
+                "wait_ms_p50": float(np.percentile(waits, 50)) if len(waits) else 0.0,
+                "wait_ms_p95": float(np.percentile(waits, 95)) if len(waits) else 0.0,
+                "wait_ms_max": float(waits.max()) if len(waits) else 0.0,
+                "encode_ms_mean": float(encode_times.mean()) if len(encode_times) else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000
+            }
+
+    def close(self, timeout=None):
+        """Stops accepting queries; everything already queued is still encoded."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
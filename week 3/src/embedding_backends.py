@@ -0,0 +1,203 @@
+import os
+import sys
+import argparse
+import numpy as np
+
+from batch_encoding import load_embedding_config
+
+ONNX_FP32_FILE = "model.onnx"
+ONNX_INT8_FILE = "model_int8.onnx"
+
+
+def hub_model_id(model_name):
+    # SentenceTransformer resolves bare names to the sentence-transformers org
+    return model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+
+
+def get_onnx_dir(config):
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.normpath(os.path.join(base_dir, '..', 'config', config["onnx_model_dir"]))
+
+
+def backend_cache_name(config, backend):
+    # Quantized vectors differ slightly, they must not share cache entries with torch
+    if backend == "onnx":
+        return f"{config['model_name']}:onnx-{'int8' if config['onnx_quantized'] else 'fp32'}"
+    return config["model_name"]
+
+
+class TorchBackend:
+    """Full-precision SentenceTransformer, the reference backend."""
+
+    def __init__(self, model_name, revision=None):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, revision=revision)
+        self.name = model_name
+        self.cache_name = model_name
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+
+
+class OnnxBackend:
+    """
+    int8-quantized ONNX Runtime export of the same transformer, for CPU.
+
+    Reproduces the SentenceTransformer head of the MiniLM models: mean
+    pooling over the attention mask followed by L2 normalization.
+    """
+
+    def __init__(self, model_dir, model_name, max_seq_length=256, threads=0, quantized=True):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError("The onnx backend needs 'onnxruntime' and 'transformers' installed") from e
+
+        model_file = os.path.join(model_dir, ONNX_INT8_FILE if quantized else ONNX_FP32_FILE)
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(f"{model_file} not found, run: python embedding_backends.py export")
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_file, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_seq_length = max_seq_length
+        self.name = model_name
+        self.cache_name = backend_cache_name({"model_name": model_name, "onnx_quantized": quantized}, "onnx")
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def _encode_batch(self, texts):
+        tokens = self.tokenizer(texts, padding=True, truncation=True, max_length=self.max_seq_length,
+                                return_tensors="np")
+        feed = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+        hidden = self.session.run(None, feed)[0]
+
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        vectors = np.vstack([self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)])
+        return vectors[0] if single else vectors
+
+
+def get_backend(config=None, backend=None):
+    """Builds the embedding backend named in embedding_config.json ("torch" or "onnx")."""
+    config = config or load_embedding_config()
+    backend = backend or config["backend"]
+    if backend == "torch":
+        return TorchBackend(config["model_name"], config["model_revision"])
+    if backend == "onnx":
+        return OnnxBackend(get_onnx_dir(config), config["model_name"], config["max_seq_length"],
+                           config["onnx_threads"], config["onnx_quantized"])
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def export_onnx(config=None):
+    """Exports the transformer to ONNX and writes an int8 dynamically quantized copy."""
+    import torch
+    from transformers import AutoTokenizer, AutoModel
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    config = config or load_embedding_config()
+    model_id = hub_model_id(config["model_name"])
+    output_dir = get_onnx_dir(config)
+    os.makedirs(output_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_id, revision=config["model_revision"])
+    model = AutoModel.from_pretrained(model_id, revision=config["model_revision"]).eval()
+    sample = tokenizer(["an example sentence to trace the graph"], return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    fp32_path = os.path.join(output_dir, ONNX_FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes={name: {0: "batch", 1: "sequence"} for name in input_names + ["last_hidden_state"]},
+            opset_version=14
+        )
+    quantize_dynamic(fp32_path, os.path.join(output_dir, ONNX_INT8_FILE), weight_type=QuantType.QInt8)
+    tokenizer.save_pretrained(output_dir)
+    print(f"Exported {model_id} to {output_dir}")
+    return output_dir
+
+
+def cosine_agreement(reference, candidate):
+    """Row-wise cosine similarity between two embedding matrices."""
+    reference = np.asarray(reference, dtype=np.float32)
+    candidate = np.asarray(candidate, dtype=np.float32)
+    dots = (reference * candidate).sum(axis=1)
+    norms = np.linalg.norm(reference, axis=1) * np.linalg.norm(candidate, axis=1)
+    return dots / np.clip(norms, 1e-12, None)
+
+
+def parity_check(reference, candidate, texts, min_cosine=0.98, batch_size=32):
+    """
+    Encodes texts with both backends and compares them.
+
+    Returns:
+        dict: mean / min / p5 cosine and whether min_cosine is met
+    """
+    cosines = cosine_agreement(reference.encode(texts, batch_size=batch_size),
+                               candidate.encode(texts, batch_size=batch_size))
+    result = {
+        "texts": len(texts),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "min_cosine": round(float(cosines.min()), 5),
+        "p5_cosine": round(float(np.percentile(cosines, 5)), 5),
+        "threshold": min_cosine
+    }
+    result["passed"] = result["min_cosine"] >= min_cosine
+    return result
+
+
+def load_parity_texts(limit=200):
+    # Real chunks are the most representative inputs for the check
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.append(os.path.join(base_dir, '..', '..', 'week 2', 'src'))
+    from artifacts import find_artifact, read_records
+
+    week2_output = os.path.join(base_dir, '..', '..', 'week 2', 'output')
+    chunks_file = find_artifact(week2_output, 'deduped_chunks') or find_artifact(week2_output, 'chunked_documents')
+    texts = []
+    if chunks_file:
+        for chunk in read_records(chunks_file):
+            texts.append(chunk.get("content", ""))
+            if len(texts) >= limit:
+                break
+    return texts + ["What is the Q4 revenue?", "Employee leave policy", "Marketing campaign results"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage embedding backends")
+    parser.add_argument("command", choices=["export", "parity"],
+                        help="export: write the int8 ONNX model; parity: compare onnx against torch")
+    args = parser.parse_args()
+
+    config = load_embedding_config()
+    if args.command == "export":
+        export_onnx(config)
+    else:
+        result = parity_check(get_backend(config, "torch"), get_backend(config, "onnx"), load_parity_texts(),
+                              min_cosine=config["parity_min_cosine"])
+        print(f"Parity over {result['texts']} texts: mean cosine {result['mean_cosine']}, "
+              f"min {result['min_cosine']}, p5 {result['p5_cosine']} -> {'PASS' if result['passed'] else 'FAIL'}")
+        raise SystemExit(0 if result["passed"] else 1)
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import numpy as np
+
+
+def get_cache_path():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, '..', 'output', 'embedding_cache.sqlite')
+
+
+def assemble(count, hits, missing, fresh):
+    """Merges cached rows (position -> vector) and freshly encoded rows back into input order."""
+    if not hits:
+        return fresh
+    dim = len(next(iter(hits.values())))
+    vectors = np.empty((count, dim), dtype=np.float32)
+    for i, vector in hits.items():
+        vectors[i] = vector
+    if missing:
+        vectors[missing] = fresh
+    return vectors
+
+
+class EmbeddingCache:
+    """
+    Persistent text -> vector cache in SQLite.
+
+    Keys are sha256(model name, model revision, text), so a model upgrade
+    or a revision bump never serves stale vectors. When the stored vectors
+    exceed max_mb, the least recently used entries are evicted down to 90%
+    of the limit.
+    """
+
+    def __init__(self, path, model_name, model_revision=None, max_mb=512):
+        self.path = path
+        self.namespace = f"{model_name}\x00{model_revision or ''}\x00"
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.counts = {"hits": 0, "misses": 0, "evicted": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                dtype TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings (last_used)")
+        self.conn.commit()
+
+    def key(self, text):
+        return hashlib.sha256((self.namespace + text).encode('utf-8')).hexdigest()
+
+    def get_many(self, texts):
+        """
+        Returns:
+            dict: position in texts -> cached vector, for every hit
+        """
+        keys = [self.key(t) for t in texts]
+        found = {}
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            part = list(set(keys[start:start + 500]))
+            rows = self.conn.execute(
+                f"SELECT key, dtype, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})", part)
+            for key, dtype, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=dtype)
+
+        if found:
+            now = time.time()
+            self.conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                  [(now, key) for key in found])
+            self.conn.commit()
+
+        hits = {i: found[k] for i, k in enumerate(keys) if k in found}
+        self.counts["hits"] += len(hits)
+        self.counts["misses"] += len(texts) - len(hits)
+        return hits
+
+    def put_many(self, texts, vectors):
+        now = time.time()
+        vectors = np.asarray(vectors)
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, dtype, vector, last_used) VALUES (?, ?, ?, ?)",
+            [(self.key(t), vectors.dtype.name, np.ascontiguousarray(v).tobytes(), now)
+             for t, v in zip(texts, vectors)])
+        self.conn.commit()
+        self.evict()
+
+    def encode(self, texts, encode_missing):
+        """
+        Returns vectors for all texts, calling encode_missing(positions)
+        only for the ones not in the cache and storing its results.
+        """
+        hits = self.get_many(texts)
+        missing = [i for i in range(len(texts)) if i not in hits]
+
+        fresh = None
+        if missing:
+            fresh = np.asarray(encode_missing(missing))
+            self.put_many([texts[i] for i in missing], fresh)
+        return assemble(len(texts), hits, missing, fresh)
+
+    def size_bytes(self):
+        return self.conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+    def evict(self):
+        size = self.size_bytes()
+        if size <= self.max_bytes:
+            return 0
+
+        target = int(self.max_bytes * 0.9)
+        rows = self.conn.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used").fetchall()
+        doomed = []
+        for key, length in rows:
+            if size <= target:
+                break
+            doomed.append((key,))
+            size -= length
+        evicted = len(doomed)
+        self.conn.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+        self.conn.commit()
+        self.counts["evicted"] += evicted
+        return evicted
+
+    def stats(self):
+        lookups = self.counts["hits"] + self.counts["misses"]
+        entries = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {
+            "hits": self.counts["hits"],
+            "misses": self.counts["misses"],
+            "hit_rate": round(self.counts["hits"] / lookups, 4) if lookups else 0,
+            "evicted": self.counts["evicted"],
+            "entries": entries,
+            "size_mb": round(self.size_bytes() / (1024 * 1024), 2),
+            "max_mb": round(self.max_bytes / (1024 * 1024), 2)
+        }
+
+    def write_stats(self, output_dir):
+        stats = self.stats()
+        report_dir = os.path.join(output_dir, 'reports')
+        os.makedirs(report_dir, exist_ok=True)
+        with open(os.path.join(report_dir, 'embedding_cache.json'), 'w', encoding='utf-8') as f:
+            json.dump(stats, f, indent=2)
+        print(f"Embedding cache: {stats['hits']} hits / {stats['misses']} misses "
+              f"(hit rate {stats['hit_rate']:.1%}), {stats['entries']} entries, "
+              f"{stats['size_mb']} MB, {stats['evicted']} evicted")
+        return stats
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,96 @@
+import os
+import sys
+import itertools
+import functools
+from collections import deque
+
+# Ordered, bounded process pool shared with the week 2 pipeline
+base_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(base_dir, '..', '..', 'week 2', 'src'))
+
+from parallel import iter_parallel, resolve_workers
+from batch_encoding import encode_sorted, text_length
+from embedding_backends import get_backend
+from embedding_cache import assemble
+
+_worker = {}
+
+
+def pin_threads(threads):
+    # Must run before torch / onnxruntime create their thread pools
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set in this process
+
+
+def init_worker(load_model, threads, batch_size):
+    """Per-process setup: pin threads, then load this worker's own model copy."""
+    pin_threads(threads)
+    _worker["model"] = load_model()
+    _worker["batch_size"] = batch_size
+
+
+def encode_shard(shard):
+    texts, lengths = shard
+    model = _worker["model"]
+    return encode_sorted(lambda batch: model.encode(batch, batch_size=_worker["batch_size"]),
+                         texts, lengths, _worker["batch_size"])
+
+
+def iter_pool_encoded_windows(chunks, config, backend=None, workers=0, shard_size=None, cache=None,
+                              load_model=None):
+    """
+    Same contract as batch_encoding.iter_encoded_windows, with the encoding
+    spread over worker processes.
+
+    Each worker holds its own model and cpu_count // workers threads, so
+    the processes do not oversubscribe the cores. Shards are dispatched
+    ahead of time but yielded strictly in input order. With a cache, the
+    parent looks chunks up before dispatch and only misses reach a worker.
+
+    Args:
+        chunks (iterable): Chunk records, may be a generator
+        config (dict): embedding_config.json contents
+        backend (str): "torch" or "onnx", defaults to the config
+        workers (int): Worker processes, 0 uses every core
+        shard_size (int): Chunks per worker task, defaults to sort_window
+        cache (EmbeddingCache): Optional persistent cache
+        load_model (callable): Picklable model factory, defaults to get_backend(config, backend)
+    """
+    workers = resolve_workers(workers)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    shard_size = shard_size or config["sort_window"]
+    batch_size = config["batch_size"]
+    load_model = load_model or functools.partial(get_backend, dict(config, onnx_threads=threads), backend)
+
+    chunks = iter(chunks)
+    pending = deque()
+
+    def shards():
+        while True:
+            window = list(itertools.islice(chunks, shard_size))
+            if not window:
+                return
+            texts = [c.get("content", "") for c in window]
+            hits = cache.get_many(texts) if cache is not None else {}
+            missing = [i for i in range(len(window)) if i not in hits]
+            pending.append((window, texts, hits, missing))
+            yield [texts[i] for i in missing], [text_length(window[i]) for i in missing]
+
+    results = iter_parallel(encode_shard, shards(), workers=workers, initializer=init_worker,
+                            initargs=(load_model, threads, batch_size), window=workers * 2)
+    for ok, fresh in results:
+        if not ok:
+            raise RuntimeError(f"Embedding worker failed: {fresh}")
+        window, texts, hits, missing = pending.popleft()
+        if cache is not None and missing:
+            cache.put_many([texts[i] for i in missing], fresh)
+        yield window, assemble(len(window), hits, missing, fresh)
@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import numpy as np
+
+STORE_VERSION = 1
+VECTORS_FILE = "vectors.bin"
+IDS_FILE = "ids.txt"
+META_FILE = "meta.json"
+
+
+def get_store_path():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, '..', 'output', 'embedding_store')
+
+
+class EmbeddingStore:
+    """
+    Embeddings as one contiguous row-major matrix file plus an ID sidecar.
+
+    Layout of the store directory:
+        vectors.bin  raw float32/float16 rows, row i is the i-th appended vector
+        ids.txt      chunk ID of row i on line i
+        meta.json    version, dim, dtype, count, ids_bytes, model_name
+
+    meta.json is written last on every append, so `count` (and `ids_bytes`,
+    the committed length of ids.txt) only ever covers rows that were
+    completely written; anything past it (an interrupted append) is ignored
+    on read and trimmed by the next append.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported embedding store version: {self.meta.get('version')}")
+        self.dim = self.meta["dim"]
+        self.dtype = np.dtype(self.meta["dtype"])
+        self._ids = None
+        self._rows = None
+
+    @classmethod
+    def create(cls, path, dim, dtype="float32", model_name=None, overwrite=False):
+        if os.path.exists(path):
+            if not overwrite:
+                raise FileExistsError(f"Embedding store already exists: {path}")
+            shutil.rmtree(path)
+        os.makedirs(path)
+        open(os.path.join(path, VECTORS_FILE), 'wb').close()
+        open(os.path.join(path, IDS_FILE), 'w', encoding='utf-8').close()
+        meta = {
+            "version": STORE_VERSION,
+            "dim": int(dim),
+            "dtype": np.dtype(dtype).name,
+            "count": 0,
+            "ids_bytes": 0,
+            "model_name": model_name
+        }
+        cls._write_meta(path, meta)
+        return cls(path)
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, META_FILE))
+
+    @staticmethod
+    def _write_meta(path, meta):
+        tmp_path = os.path.join(path, META_FILE + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp_path, os.path.join(path, META_FILE))
+
+    def __len__(self):
+        return self.meta["count"]
+
+    @property
+    def model_name(self):
+        return self.meta.get("model_name")
+
+    def _trim_to_count(self):
+        # Drop rows of an append that never reached meta.json; two stat() calls when there are none
+        count = self.meta["count"]
+        vectors_path = os.path.join(self.path, VECTORS_FILE)
+        row_bytes = self.dim * self.dtype.itemsize
+        if os.path.getsize(vectors_path) != count * row_bytes:
+            with open(vectors_path, 'r+b') as f:
+                f.truncate(count * row_bytes)
+
+        ids_path = os.path.join(self.path, IDS_FILE)
+        if "ids_bytes" not in self.meta:
+            # Stores written before ids_bytes was tracked are measured once
+            with open(ids_path, 'rb') as f:
+                self.meta["ids_bytes"] = sum(len(line) for _, line in zip(range(count), f))
+        if os.path.getsize(ids_path) != self.meta["ids_bytes"]:
+            with open(ids_path, 'r+b') as f:
+                f.truncate(self.meta["ids_bytes"])
+
+    def append(self, ids, vectors):
+        """Appends rows; vectors is any (len(ids), dim) array-like."""
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim or vectors.shape[0] != len(ids):
+            raise ValueError(f"Expected a ({len(ids)}, {self.dim}) matrix, got {vectors.shape}")
+        if not len(ids):
+            return
+
+        self._trim_to_count()
+        with open(os.path.join(self.path, VECTORS_FILE), 'ab') as f:
+            f.write(vectors.tobytes())
+        # Binary, so the byte length recorded in meta.json is exact on every platform
+        ids_data = "".join(f"{chunk_id}\n" for chunk_id in ids).encode('utf-8')
+        with open(os.path.join(self.path, IDS_FILE), 'ab') as f:
+            f.write(ids_data)
+
+        if self._ids is not None:
+            self._ids.extend(ids)
+        self._rows = None
+        self.meta["count"] += len(ids)
+        self.meta["ids_bytes"] += len(ids_data)
+        self._write_meta(self.path, self.meta)
+
+    def vectors(self):
+        """Read-only memory map of all rows, shape (count, dim); no data is copied."""
+        if not len(self):
+            return np.zeros((0, self.dim), dtype=self.dtype)
+        return np.memmap(os.path.join(self.path, VECTORS_FILE), dtype=self.dtype, mode='r',
+                         shape=(len(self), self.dim))
+
+    def ids(self):
+        if self._ids is None:
+            count = len(self)
+            with open(os.path.join(self.path, IDS_FILE), 'r', encoding='utf-8') as f:
+                self._ids = [line.rstrip("\n") for _, line in zip(range(count), f)]
+        return self._ids
+
+    def row_of(self, chunk_id):
+        """Row offset of a chunk ID, or None; the last row wins if an ID was appended twice."""
+        if self._rows is None:
+            self._rows = {chunk_id: row for row, chunk_id in enumerate(self.ids())}
+        return self._rows.get(chunk_id)
+
+    def get(self, chunk_id):
+        row = self.row_of(chunk_id)
+        return None if row is None else self.vectors()[row]
+
+    def iter_batches(self, batch_size=1024):
+        """Yields (ids, matrix view) pairs in row order."""
+        ids = self.ids()
+        vectors = self.vectors()
+        for start in range(0, len(ids), batch_size):
+            yield ids[start:start + batch_size], vectors[start:start + batch_size]
+
+
+def import_json_embeddings(json_file, path, dtype="float32", batch_size=1024):
+    """Converts a legacy chunk_embeddings.json into a store."""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path.append(os.path.join(base_dir, '..', '..', 'week 2', 'src'))
+    from artifacts import read_records
+
+    store = None
+    ids, vectors = [], []
+    for item in read_records(json_file):
+        if store is None:
+            store = EmbeddingStore.create(path, len(item["embedding"]), dtype=dtype, overwrite=True)
+        ids.append(item["chunk_id"])
+        vectors.append(item["embedding"])
+        if len(ids) >= batch_size:
+            store.append(ids, vectors)
+            ids, vectors = [], []
+    if store is not None and ids:
+        store.append(ids, vectors)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert chunk_embeddings.json into a binary embedding store")
+    parser.add_argument("json_file", help="Path to chunk_embeddings.json")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    args = parser.parse_args()
+    store = import_json_embeddings(args.json_file, get_store_path(), dtype=args.dtype)
+    if store is None:
+        print("No embeddings found.")
+    else:
+        size = os.path.getsize(os.path.join(store.path, VECTORS_FILE))
+        print(f"Stored {len(store)} x {store.dim} {store.dtype.name} vectors ({size / 1024:.1f} KB) in {store.path}")
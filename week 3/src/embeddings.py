@@ -1,54 +1,116 @@
 import os
-import json
-from sentence_transformers import SentenceTransformer
+import sys
+import shutil
+import argparse
 
-def generate_embeddings():
+# Shared artifact reader/writer lives with the week 2 pipeline
+base_dir = os.path.dirname(os.path.abspath(__file__))
+week2_src = os.path.join(base_dir, '..', '..', 'week 2', 'src')
+sys.path.append(week2_src)
+
+from artifacts import find_artifact, read_records
+from parallel import ThroughputReport
+from batch_encoding import load_embedding_config, iter_encoded_windows
+from embedding_store import EmbeddingStore, get_store_path
+from embedding_cache import EmbeddingCache, get_cache_path
+from embedding_backends import backend_cache_name
+from resources import get_model
+from embedding_pool import iter_pool_encoded_windows
+from projection import fit_store_projection, carry_over_projection
+
+def generate_embeddings(batch_size=None, use_cache=True, backend=None, workers=1, refit_projection=False):
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    input_file = os.path.join(base_dir, '..', '..', 'week 2', 'output', 'chunked_documents.json')
-    output_file = os.path.join(base_dir, '..', 'output', 'chunk_embeddings.json')
+    input_dir = os.path.join(base_dir, '..', '..', 'week 2', 'output')
+    output_dir = os.path.join(base_dir, '..', 'output')
+    # Near-duplicates are collapsed by week 2 dedup.py; fall back to the raw chunks
+    input_file = find_artifact(input_dir, 'deduped_chunks') or find_artifact(input_dir, 'chunked_documents')
     
-    if not os.path.exists(input_file):
-        print(f"Input file not found: {input_file}")
+    if input_file is None:
+        print(f"Input file not found: deduped_chunks / chunked_documents in {input_dir}")
         return
-
-    # Load chunks
-    with open(input_file, 'r', encoding='utf-8') as f:
-        chunks = json.load(f)
         
-    print(f"Loading SentenceTransformer model 'all-MiniLM-L6-v2'...")
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    config = load_embedding_config()
+    if batch_size:
+        config["batch_size"] = batch_size
+    batch_size = config["batch_size"]
+    backend = backend or config["backend"]
+    model_name = backend_cache_name(config, backend)
+
+    # Unchanged chunks are served from the cache, so re-embeds cost only the diff
+    cache = None
+    if use_cache and config["cache_enabled"]:
+        cache = EmbeddingCache(get_cache_path(), model_name, config["model_revision"], config["cache_max_mb"])
     
-    print(f"Generating embeddings for {len(chunks)} chunks...")
+    chunks = read_records(input_file)
+    if workers == 1:
+        print(f"Loading model '{config['model_name']}' ({backend} backend)...")
+        model = get_model(config, backend)
+
+        def encode(texts):
+            return model.encode(texts, batch_size=batch_size)
+
+        # Length-sorted batches in artifact order
+        windows = iter_encoded_windows(encode, chunks, batch_size, config["sort_window"], cache)
+    else:
+        # Full re-embeds: every worker process loads its own model copy
+        windows = iter_pool_encoded_windows(chunks, config, backend, workers, cache=cache)
     
-    embedded_data = []
+    print(f"Generating embeddings from {input_file} (batch size {batch_size}, {workers or 'all'} workers)...")
     
-    try:
-        # Batch processing could be faster but let's keep it simple for now
-        for i, chunk in enumerate(chunks):
-            content = chunk.get("content", "")
-            # Generate embedding
-            embedding = model.encode(content)
-            
-            embedded_data.append({
-                "chunk_id": chunk.get("chunk_id"),
-                "content": content,
-                "source_file": chunk.get("source_file"),
-                "embedding": embedding.tolist() # Convert numpy array to list for JSON serialization
-            })
-            
-            if (i+1) % 10 == 0:
-                print(f"Generated embedding for chunk {i+1}/{len(chunks)}")
-                
-    except Exception as e:
-        print(f"Error generating embeddings: {e}")
-        
-    # Save output
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(embedded_data, f, indent=2)
+    report = ThroughputReport("embeddings", workers)
+
+    # Build the new store next to the old one and swap it in once complete
+    store_path = get_store_path()
+    tmp_path = store_path + ".tmp"
+    store = None
+    
+    for window, vectors in windows:
+        if store is None:
+            store = EmbeddingStore.create(tmp_path, vectors.shape[1], dtype=config["store_dtype"],
+                                          model_name=model_name, overwrite=True)
+        store.append([chunk.get("chunk_id") for chunk in window], vectors)
+        report.add(items=len(window), size=sum(len(chunk.get("content", "")) for chunk in window))
+        print(f"Generated embeddings for {len(store)} chunks")
+
+    report.finish(output_dir)
+    if cache is not None:
+        cache.write_stats(output_dir)
+        cache.close()
+
+    if store is None:
+        print("No chunks to embed, existing store left unchanged.")
+        return
+
+    # The projection parameters live inside the store. Keep the previous fit unless a
+    # refit is asked for: a new basis changes every projected vector, so the next
+    # index_embeddings run has to re-upsert the whole collection
+    projection = None
+    if config["projection_dim"] and not refit_projection:
+        projection = carry_over_projection(config, store_path, tmp_path)
+        if projection is not None:
+            print(f"Kept the {projection.tag} projection of the previous store")
+
+    if os.path.exists(store_path):
+        shutil.rmtree(store_path)
+    os.replace(tmp_path, store_path)
+
+    if config["projection_dim"] and projection is None:
+        projection = fit_store_projection(config, store_path)
+        print(f"Fitted {projection.tag} projection on the new store")
         
-    print(f"Total embeddings: {len(embedded_data)}")
-    print(f"Dimension: {len(embedded_data[0]['embedding'])}")
-    print(f"Saved to {output_file}")
+    print(f"Total embeddings: {len(store)}")
+    print(f"Dimension: {store.dim} ({store.dtype.name})")
+    print(f"Saved to {store_path}")
 
 if __name__ == "__main__":
-    generate_embeddings()
+    parser = argparse.ArgumentParser(description="Generate chunk embeddings")
+    parser.add_argument("--batch-size", type=int, help="Chunks per encode call (default from embedding_config.json)")
+    parser.add_argument("--no-cache", action="store_true", help="Encode every chunk, ignoring the embedding cache")
+    parser.add_argument("--backend", choices=["torch", "onnx"], help="Embedding backend (default from embedding_config.json)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Encoding processes, each with its own model (0 = all cores)")
+    parser.add_argument("--refit-projection", action="store_true",
+                        help="Refit the configured projection instead of keeping the previous one")
+    args = parser.parse_args()
+    generate_embeddings(batch_size=args.batch_size, use_cache=not args.no_cache, backend=args.backend,
+                        workers=args.workers, refit_projection=args.refit_projection)
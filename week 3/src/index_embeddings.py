@@ -1,85 +1,198 @@
 import os
-import json
-import vector_db_setup
-# But actually better to just import the function if in same dir
-from vector_db_setup import setup_vector_db
+import sys
+import argparse
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from embedding_store import EmbeddingStore, get_store_path
+from role_registry import RoleRegistry
+from projection import load_projection, projected_name
 
-def index_data():
+# Shared artifact reader lives with the week 2 pipeline
+base_dir = os.path.dirname(os.path.abspath(__file__))
+week2_src = os.path.join(base_dir, '..', '..', 'week 2', 'src')
+sys.path.append(week2_src)
+
+from artifacts import find_artifact, read_records
+from parallel import resolve_workers
+
+def chunk_metadata(item, model_name=None, registry=None):
+    # Chroma metadata values must be int, float, str, or bool.
+    # Lists (accessible_roles) need to be converted to string representation or handled differently.
+    # We will join the list into a comma-separated string for storage.
+    roles_str = ",".join(item.get('accessible_roles', []))
+
+    metadata = {
+        "department": item.get('department', 'unknown'),
+        "accessible_roles": roles_str,
+        "source": item.get('source', 'unknown')
+    }
+    # Canonical chunks of a near-duplicate cluster list every file they stand for
+    if len(item.get('sources', [])) > 1:
+        metadata["sources"] = ",".join(item['sources'])
+    # Carried from chunking so context budgeting never has to re-encode
+    if item.get('token_count') is not None:
+        metadata["token_count"] = item['token_count']
+    # A model change alters every vector, so it must show up as a metadata change too
+    if model_name:
+        metadata["embedding_model"] = model_name
+    # Integer role bitmasks (and per-bit flags for Chroma) that search filters on
+    if registry is not None:
+        metadata.update(registry.metadata_for_department(metadata["department"]))
+    return metadata
+
+def iter_indexed_metadata(collection, page_size=5000):
+    """Yields (id, metadata) for everything already in the collection, one page at a time."""
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+        yield from zip(page['ids'], page['metadatas'])
+        if len(page['ids']) < page_size:
+            return
+        offset += page_size
+
+def plan_changes(indexed, wanted, full=False):
+    """
+    Compares the collection with the chunks that should be in it.
+
+    Chunk IDs are content-addressed, so an unchanged ID with unchanged
+    metadata already holds the right document and vector and is skipped.
+    When only the metadata differs (re-tagging, a new role in the registry)
+    and the embedding model is the same, the vector is left alone and only
+    the metadata is rewritten.
+
+    Args:
+        indexed (dict): chunk_id -> metadata currently in the collection
+        wanted (dict): chunk_id -> metadata the collection should hold
+        full (bool): Re-upsert every wanted chunk
+
+    Returns:
+        tuple: (ids to upsert, ids to update metadata of, ids to delete), each in a stable order
+    """
+    upsert, update = [], []
+    for chunk_id, metadata in wanted.items():
+        current = indexed.get(chunk_id)
+        if full or current is None or current.get("embedding_model") != metadata.get("embedding_model"):
+            upsert.append(chunk_id)
+        elif current != metadata:
+            update.append(chunk_id)
+    delete = sorted(chunk_id for chunk_id in indexed if chunk_id not in wanted)
+    return upsert, update, delete
+
+def metadata_payload(metadata, current=None):
+    """
+    Metadata to send for a chunk already in the collection: Chroma merges it
+    into the stored dict and only drops keys set to None, so keys that are no
+    longer wanted (e.g. "sources" after a cluster split) are sent as None.
+    """
+    if not current:
+        return metadata
+    payload = {key: None for key in current if key not in metadata}
+    payload.update(metadata)
+    return payload
+
+def run_batches(func, batches, workers):
+    """Calls func on each batch from `workers` threads, keeping at most 2 batches per thread in flight."""
+    batches = iter(batches)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque(executor.submit(func, batch) for batch in itertools.islice(batches, workers * 2))
+        while pending:
+            pending.popleft().result()
+            for batch in itertools.islice(batches, 1):
+                pending.append(executor.submit(func, batch))
+
+def index_data(full=False, workers=4, batch_size=100, collection=None, registry=None):
     base_dir = os.path.dirname(os.path.abspath(__file__))
-    embeddings_file = os.path.join(base_dir, '..', 'output', 'chunk_embeddings.json')
-    metadata_file = os.path.join(base_dir, '..', '..', 'week 2', 'output', 'tagged_chunks.json')
-    
-    if not os.path.exists(embeddings_file) or not os.path.exists(metadata_file):
+    store_path = get_store_path()
+    week2_output = os.path.join(base_dir, '..', '..', 'week 2', 'output')
+    metadata_file = find_artifact(week2_output, 'deduped_chunks') or find_artifact(week2_output, 'tagged_chunks')
+
+    if not EmbeddingStore.exists(store_path) or metadata_file is None:
         print("Input files missing.")
         return
 
-    # Load data
-    with open(embeddings_file, 'r', encoding='utf-8') as f:
-        embeddings_data = json.load(f)
-        
-    with open(metadata_file, 'r', encoding='utf-8') as f:
-        metadata_list = json.load(f)
-        
-    # Map metadata by chunk_id for easy lookup
-    metadata_map = {item['chunk_id']: item for item in metadata_list}
-    
-    collection = setup_vector_db()
-    
-    # Prepare batch data
-    ids = []
-    embeddings = []
-    documents = []
-    metadatas = []
-    
-    batch_size = 100
-    
-    print(f"Indexing {len(embeddings_data)} documents...")
-    
-    for i, item in enumerate(embeddings_data):
+    # Vectors are read straight from the memory-mapped store, nothing is parsed
+    store = EmbeddingStore(store_path)
+    vectors = store.vectors()
+    # Optional PCA / truncation configured in embedding_config.json, the same one queries use
+    projection = load_projection(store_path=store_path)
+    model_name = projected_name(store.model_name, projection)
+
+    if collection is None:
+        # Chroma is only needed once there is something to write
+        from vector_db_setup import setup_vector_db
+        collection = setup_vector_db()
+
+    if registry is None:
+        # Roles added to role_hierarchy.json get their bit here
+        registry = RoleRegistry.load()
+        added = registry.sync()
+        if added:
+            registry.save()
+            print(f"Role registry v{registry.version}: registered {', '.join(added)}")
+
+    rows = {}
+    documents = {}
+    wanted = {}
+    for item in read_records(metadata_file):
         chunk_id = item['chunk_id']
-        chunk_meta = metadata_map.get(chunk_id, {})
-        
-        ids.append(chunk_id)
-        embeddings.append(item['embedding'])
-        documents.append(item['content'])
-        
-        # Prepare metadata dict for Chroma
-        # Chroma metadata values must be int, float, str, or bool. 
-        # Lists (accessible_roles) need to be converted to string representation or handled differently.
-        # We will join the list into a comma-separated string for storage.
-        roles_str = ",".join(chunk_meta.get('accessible_roles', []))
-        
-        metadatas.append({
-            "department": chunk_meta.get('department', 'unknown'),
-            "accessible_roles": roles_str,
-            "source": chunk_meta.get('source', 'unknown')
-        })
-        
-        # Batch add
-        if len(ids) >= batch_size:
-            collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                documents=documents,
-                metadatas=metadatas
-            )
-            print(f"Indexed batch {i+1}")
-            ids = []
-            embeddings = []
-            documents = []
-            metadatas = []
-
-    # Final batch
-    if ids:
-        collection.add(
+        row = store.row_of(chunk_id)
+        if row is None:
+            continue
+        rows[chunk_id] = row
+        documents[chunk_id] = item.get('content', '')
+        wanted[chunk_id] = chunk_metadata(item, model_name, registry)
+
+    indexed = dict(iter_indexed_metadata(collection))
+    upsert_ids, update_ids, delete_ids = plan_changes(indexed, wanted, full)
+    # Documents are only needed for the chunks being written
+    for chunk_id in set(documents) - set(upsert_ids):
+        del documents[chunk_id]
+
+    unchanged = len(wanted) - len(upsert_ids) - len(update_ids)
+    print(f"Indexing {len(wanted)} chunks from {store_path}: {len(upsert_ids)} to upsert, "
+          f"{len(update_ids)} metadata-only updates, {len(delete_ids)} stale to delete, {unchanged} unchanged")
+
+    def upsert_batch(ids):
+        embeddings = np.asarray(vectors[[rows[i] for i in ids]], dtype=np.float32)
+        if projection is not None:
+            embeddings = projection.transform(embeddings)
+        collection.upsert(
             ids=ids,
             embeddings=embeddings,
-            documents=documents,
-            metadatas=metadatas
+            documents=[documents[i] for i in ids],
+            metadatas=[metadata_payload(wanted[i], indexed.get(i)) for i in ids]
         )
-        print(f"Indexed final batch of {len(ids)}")
-        
-    print(f"Total indexed: {len(embeddings_data)} documents")
+        print(f"Upserted batch of {len(ids)}")
+
+    def update_batch(ids):
+        collection.update(ids=ids, metadatas=[metadata_payload(wanted[i], indexed[i]) for i in ids])
+        print(f"Updated metadata of batch of {len(ids)}")
+
+    def delete_batch(ids):
+        collection.delete(ids=ids)
+        print(f"Deleted batch of {len(ids)}")
+
+    def batches(ids):
+        return (ids[start:start + batch_size] for start in range(0, len(ids), batch_size))
+
+    # In store row order, so the memmap is read front to back
+    upsert_ids.sort(key=rows.get)
+    workers = resolve_workers(workers)
+    # Upserts land before deletes, so a live index never misses a source's chunks in between
+    run_batches(upsert_batch, batches(upsert_ids), workers)
+    run_batches(update_batch, batches(update_ids), workers)
+    run_batches(delete_batch, batches(delete_ids), workers)
+
+    print(f"Total indexed: {len(wanted)} documents")
+    return {"indexed": len(wanted), "upserted": len(upsert_ids), "updated": len(update_ids),
+            "deleted": len(delete_ids), "unchanged": unchanged}
 
 if __name__ == "__main__":
-    index_data()
+    parser = argparse.ArgumentParser(description="Sync the vector DB with the embedding store")
+    parser.add_argument("--full", action="store_true", help="Re-upsert every chunk, not only changed ones")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent write batches (0 = all cores)")
+    parser.add_argument("--batch-size", type=int, default=100, help="Chunks per upsert/delete call")
+    args = parser.parse_args()
+    index_data(full=args.full, workers=args.workers, batch_size=args.batch_size)
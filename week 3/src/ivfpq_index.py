@@ -0,0 +1,446 @@
+import os
+import json
+import shutil
+import hashlib
+import argparse
+from array import array
+import numpy as np
+
+from embedding_store import EmbeddingStore, get_store_path, VECTORS_FILE
+from numpy_search import MetadataColumns, normalize_rows, top_k, iter_chunk_records, resolve_chunks_file
+from role_registry import RoleRegistry
+from projection import load_projection, projected_name
+
+INDEX_VERSION = 2
+META_FILE = "meta.json"
+ARRAYS_FILE = "index.npz"
+# Per-chunk sidecars: id/document/metadata as JSON lines, read back for the hits only
+CHUNKS_FILE = "chunks.jsonl"
+POSITIONS_FILE = "positions.npz"
+COLUMNS_FILE = "columns.npz"
+COLUMNS_LAYOUT_FILE = "columns.json"
+
+# Rows per block in assignment / encoding, bounds the temporary distance matrices
+BLOCK_ROWS = 65536
+
+
+def get_index_path():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, '..', 'output', 'ivfpq_index')
+
+
+def nearest(x, centroids):
+    """Index of the closest centroid (L2) for each row of x, computed block by block."""
+    half_norms = 0.5 * (centroids ** 2).sum(axis=1)
+    labels = np.empty(len(x), dtype=np.int64)
+    for start in range(0, len(x), BLOCK_ROWS):
+        block = x[start:start + BLOCK_ROWS]
+        # argmin ||x - c||^2 == argmax x.c - ||c||^2 / 2
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T - half_norms, axis=1)
+    return labels
+
+
+def default_pq_m(dim):
+    # 8-dim sub-vectors (m=48 for 384 dims), or the closest divisor of dim below that
+    target = max(1, dim // 8)
+    return max(m for m in range(1, target + 1) if dim % m == 0)
+
+
+def resolve_pq_m(dim, m=0):
+    """m sub-quantizers for dim-wide vectors; 0 picks default_pq_m(dim)."""
+    if not m:
+        return default_pq_m(dim)
+    if dim % m:
+        divisors = [d for d in range(1, dim + 1) if dim % d == 0]
+        raise ValueError(f"pq_m={m} must divide the embedding dimension {dim} (e.g. {default_pq_m(dim)}; "
+                         f"divisors: {divisors}), or set pq_m to 0 to pick one")
+    return m
+
+
+def resident_bytes():
+    """Resident set size of this process, or None where it cannot be read."""
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def kmeans(x, k, iterations=20, seed=0):
+    """Lloyd's k-means; empty clusters are re-seeded from random points."""
+    rng = np.random.default_rng(seed)
+    k = min(k, len(x))
+    centroids = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = nearest(x, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, x)
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+    return centroids
+
+
+class IvfPqIndex:
+    """
+    Inverted-file index with product-quantized residuals, for inner-product
+    search over normalized embeddings.
+
+    Build: k-means splits the corpus into nlist cells; each vector's
+    residual to its cell centroid is cut into m sub-vectors and each
+    sub-vector is replaced by the id of its nearest of 2**nbits sub-centroids,
+    so a vector costs m bytes instead of dim * 4.
+
+    Search: the nprobe cells closest to the query are scanned with a
+    per-query lookup table (q . centroid + sum of q_j . codebook_j[code_j]),
+    and the best `rerank` candidates are re-scored exactly against the full
+    vectors, which only need to be readable (e.g. a memmap), not resident.
+    """
+
+    def __init__(self, centroids, codebooks, codes, list_offsets, list_order):
+        self.centroids = centroids        # (nlist, dim)
+        self.codebooks = codebooks        # (m, ksub, dim / m)
+        self.codes = codes                # (n, m) uint8, in vector order
+        self.list_offsets = list_offsets  # (nlist + 1,) into list_order
+        self.list_order = list_order      # (n,) vector positions grouped by cell
+        self.cell_of = np.empty(len(codes), dtype=np.int64)
+        for cell in range(len(centroids)):
+            self.cell_of[list_order[list_offsets[cell]:list_offsets[cell + 1]]] = cell
+
+    @property
+    def nlist(self):
+        return len(self.centroids)
+
+    @property
+    def m(self):
+        return len(self.codebooks)
+
+    @classmethod
+    def build(cls, vectors, nlist=0, m=0, nbits=8, train_size=100000, iterations=20, seed=0):
+        """
+        Only the training sample is held as float32; the corpus is read,
+        normalized and encoded BLOCK_ROWS rows at a time, so `vectors` can
+        be a memmap or RowView much larger than memory.
+
+        Args:
+            vectors (array): (n, dim) embeddings, sliceable; normalized here
+            nlist (int): Coarse cells, 0 picks 4 * sqrt(n)
+            m (int): Sub-quantizers, must divide dim; 0 picks default_pq_m(dim)
+            nbits (int): Bits per code, at most 8
+            train_size (int): Vectors sampled to train the quantizers
+        """
+        n, dim = vectors.shape
+        m = resolve_pq_m(dim, m)
+        if not 1 <= nbits <= 8:
+            raise ValueError("nbits must be between 1 and 8")
+        if not n:
+            raise ValueError("No vectors to index")
+        nlist = nlist or max(1, int(4 * np.sqrt(n)))
+
+        rng = np.random.default_rng(seed)
+        # Sorted, so a memmap is read front to back
+        sample_rows = np.sort(rng.choice(n, min(n, train_size), replace=False))
+        sample = normalize_rows(np.asarray(vectors[sample_rows], dtype=np.float32))
+        centroids = kmeans(sample, nlist, iterations, seed)
+
+        sample_residuals = sample - centroids[nearest(sample, centroids)]
+        dsub = dim // m
+        codebooks = np.stack([kmeans(sample_residuals[:, j * dsub:(j + 1) * dsub], 2 ** nbits, iterations, seed + j)
+                              for j in range(m)])
+        if codebooks.shape[1] < 2 ** nbits:
+            # Tiny corpora: fewer training points than sub-centroids
+            pad = np.repeat(codebooks[:, -1:], 2 ** nbits - codebooks.shape[1], axis=1)
+            codebooks = np.concatenate([codebooks, pad], axis=1)
+
+        labels = np.empty(n, dtype=np.int64)
+        codes = np.empty((n, m), dtype=np.uint8)
+        for start in range(0, n, BLOCK_ROWS):
+            block = normalize_rows(np.asarray(vectors[start:start + BLOCK_ROWS], dtype=np.float32))
+            labels[start:start + len(block)] = nearest(block, centroids)
+            block -= centroids[labels[start:start + len(block)]]
+            for j in range(m):
+                codes[start:start + len(block), j] = nearest(block[:, j * dsub:(j + 1) * dsub], codebooks[j])
+
+        list_order = np.argsort(labels, kind='stable')
+        list_offsets = np.concatenate([[0], np.cumsum(np.bincount(labels, minlength=len(centroids)))])
+        return cls(centroids, codebooks, codes, list_offsets, list_order)
+
+    def lookup_table(self, query):
+        # (m, ksub): q_j . codebook_j[c] for every sub-quantizer j and code c
+        dsub = self.codebooks.shape[2]
+        return np.einsum('jkd,jd->jk', self.codebooks, query.reshape(self.m, dsub))
+
+    def candidates(self, query, nprobe, mask=None):
+        """
+        Approximate scores for the vectors of the nprobe closest cells.
+
+        Returns:
+            tuple: (vector positions, approximate inner products)
+        """
+        coarse = self.centroids @ query
+        cells = top_k(coarse, nprobe)
+        positions = np.concatenate([self.list_order[self.list_offsets[c]:self.list_offsets[c + 1]] for c in cells]) \
+            if len(cells) else np.zeros(0, dtype=np.int64)
+        if mask is not None:
+            positions = positions[mask[positions]]
+        lut = self.lookup_table(query)
+        approx = coarse[self.cell_of[positions]] + lut[np.arange(self.m), self.codes[positions]].sum(axis=1)
+        return positions, approx
+
+    def search(self, query, vectors, k=10, nprobe=8, rerank=50, mask=None):
+        """
+        Args:
+            query (array): (dim,) query embedding
+            vectors (array): Full vectors in index order, only the shortlist is read
+            k (int): Results
+            nprobe (int): Cells scanned
+            rerank (int): Candidates re-scored exactly, at least k
+            mask (array): Optional boolean filter over vector positions
+
+        Returns:
+            tuple: (positions, exact cosine similarities), best first
+        """
+        query = normalize_rows(np.asarray(query, dtype=np.float32)[None])[0]
+        positions, approx = self.candidates(query, nprobe, mask)
+        shortlist = np.sort(positions[top_k(approx, max(k, rerank))])
+        exact = normalize_rows(np.asarray(vectors[shortlist], dtype=np.float32)) @ query
+        best = top_k(exact, k)
+        return shortlist[best], exact[best]
+
+    def memory_bytes(self):
+        return {
+            "codes": self.codes.nbytes,
+            "centroids": self.centroids.nbytes,
+            "codebooks": self.codebooks.nbytes,
+            "inverted_lists": self.list_order.nbytes + self.list_offsets.nbytes + self.cell_of.nbytes
+        }
+
+    def save(self, directory):
+        np.savez(os.path.join(directory, ARRAYS_FILE), centroids=self.centroids, codebooks=self.codebooks,
+                 codes=self.codes, list_offsets=self.list_offsets, list_order=self.list_order)
+
+    @classmethod
+    def load(cls, directory):
+        with np.load(os.path.join(directory, ARRAYS_FILE)) as arrays:
+            return cls(arrays["centroids"], arrays["codebooks"], arrays["codes"], arrays["list_offsets"],
+                       arrays["list_order"])
+
+
+class RowView:
+    """
+    Exposes the store rows of an index as one array, without copying the
+    store; rows are projected on read when a projection is configured.
+    """
+
+    def __init__(self, matrix, rows, projection=None):
+        self.matrix = matrix
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.projection = projection
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def shape(self):
+        return len(self.rows), self.projection.dim if self.projection else self.matrix.shape[1]
+
+    def __getitem__(self, positions):
+        vectors = self.matrix[self.rows[positions]]
+        return vectors if self.projection is None else self.projection.transform(vectors)
+
+
+class ChunkRecords:
+    """
+    Chunk ids, documents and metadata of an index, kept on disk as JSON
+    lines and read back by byte offset for the hits of a query only.
+    """
+
+    def __init__(self, path, offsets):
+        self.path = path
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @staticmethod
+    def write(path, records, rows, offsets):
+        """
+        Writes (chunk id, store row, document, metadata) records as they
+        stream past, appending each store row and line offset; yields the
+        metadata so the filter columns are built in the same pass.
+        """
+        with open(path, 'wb') as f:
+            for chunk_id, row, document, metadata in records:
+                offsets.append(f.tell())
+                rows.append(row)
+                line = json.dumps({"id": chunk_id, "document": document, "metadata": metadata}, ensure_ascii=False)
+                f.write(line.encode('utf-8') + b"\n")
+                yield metadata
+            offsets.append(f.tell())
+
+    def read(self, positions):
+        with open(self.path, 'rb') as f:
+            records = []
+            for position in positions:
+                f.seek(int(self.offsets[position]))
+                records.append(json.loads(f.readline()))
+            return records
+
+
+def source_fingerprint(store, chunks_file, registry):
+    """What the index was built from; any change means the sidecars may be stale."""
+    vectors_stat = os.stat(os.path.join(store.path, VECTORS_FILE))
+    chunks_stat = os.stat(chunks_file)
+    access = json.dumps({"version": registry.version, "roles": registry.roles,
+                         "departments": registry.department_roles}, sort_keys=True)
+    return {
+        "store": {"count": len(store), "size": vectors_stat.st_size, "mtime": vectors_stat.st_mtime},
+        "chunks": {"file": os.path.basename(chunks_file), "size": chunks_stat.st_size, "mtime": chunks_stat.st_mtime},
+        "registry": hashlib.sha256(access.encode('utf-8')).hexdigest()
+    }
+
+
+class IvfPqCollection:
+    """
+    Approximate counterpart of NumpyCollection with the same query()
+    contract. Only the PQ codes, quantizers, store rows, line offsets and
+    the compact filter columns are held in memory. The full vectors stay
+    in the memory-mapped embedding store and are read for the re-scored
+    shortlist only; documents and metadata stay in the index's JSON-lines
+    sidecar and are read for the returned hits only.
+    """
+
+    def __init__(self, index, records, vectors, columns, nprobe=8, rerank=50):
+        self.index = index
+        self.records = records
+        self.vectors = vectors
+        self.columns = columns
+        self.nprobe = nprobe
+        self.rerank = rerank
+
+    @classmethod
+    def build(cls, store_path=None, index_path=None, chunks_file=None, registry=None, nlist=0, m=0,
+              **build_args):
+        """Trains the index over every indexed chunk of the store, persists it and returns it loaded."""
+        store = EmbeddingStore(store_path or get_store_path())
+        projection = load_projection(store_path=store.path)
+        model_name = projected_name(store.model_name, projection)
+        # Checked before anything is read
+        m = resolve_pq_m(projection.dim if projection else store.dim, m)
+        registry = registry or RoleRegistry.load()
+        chunks_file = resolve_chunks_file(chunks_file)
+        index_path = index_path or get_index_path()
+
+        tmp_path = index_path + ".tmp"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        # One streaming pass over the artifact: sidecar lines, store rows and filter columns
+        rows, offsets = array('q'), array('q')
+        records = iter_chunk_records(store, chunks_file, registry, model_name)
+        columns = MetadataColumns(ChunkRecords.write(os.path.join(tmp_path, CHUNKS_FILE), records, rows, offsets))
+        columns.save(os.path.join(tmp_path, COLUMNS_FILE), os.path.join(tmp_path, COLUMNS_LAYOUT_FILE))
+        rows, offsets = np.frombuffer(rows, dtype=np.int64), np.frombuffer(offsets, dtype=np.int64)
+        np.savez(os.path.join(tmp_path, POSITIONS_FILE), rows=rows, offsets=offsets)
+
+        index = IvfPqIndex.build(RowView(store.vectors(), rows, projection), nlist=nlist, m=m, **build_args)
+        index.save(tmp_path)
+        meta = {"version": INDEX_VERSION, "count": len(rows), "nlist": index.nlist, "m": index.m,
+                "ksub": index.codebooks.shape[1], "dim": index.centroids.shape[1], "model_name": model_name,
+                "source": source_fingerprint(store, chunks_file, registry)}
+        with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+        # Swap the finished index in whole, a reader never sees half of one
+        if os.path.exists(index_path):
+            shutil.rmtree(index_path)
+        os.replace(tmp_path, index_path)
+        return cls.load(store.path, index_path, chunks_file, registry)
+
+    @classmethod
+    def load(cls, store_path=None, index_path=None, chunks_file=None, registry=None, nprobe=8, rerank=50):
+        store = EmbeddingStore(store_path or get_store_path())
+        projection = load_projection(store_path=store.path)
+        model_name = projected_name(store.model_name, projection)
+        index_path = index_path or get_index_path()
+        rebuild = "rebuild it with: python ivfpq_index.py build"
+
+        with open(os.path.join(index_path, META_FILE), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported IVF-PQ index version: {meta.get('version')}; {rebuild}")
+        if meta.get("model_name") != model_name:
+            raise ValueError(f"IVF-PQ index was built for {meta.get('model_name')}, the store holds "
+                             f"{model_name}; {rebuild}")
+        # Documents, metadata and filter columns were captured at build time
+        source = source_fingerprint(store, resolve_chunks_file(chunks_file), registry or RoleRegistry.load())
+        if meta.get("source") != source:
+            raise ValueError(f"IVF-PQ index is stale (the store, chunk artifact or role registry changed); {rebuild}")
+
+        with np.load(os.path.join(index_path, POSITIONS_FILE)) as positions:
+            rows, offsets = positions["rows"], positions["offsets"]
+        columns = MetadataColumns.load(os.path.join(index_path, COLUMNS_FILE),
+                                       os.path.join(index_path, COLUMNS_LAYOUT_FILE))
+        return cls(IvfPqIndex.load(index_path), ChunkRecords(os.path.join(index_path, CHUNKS_FILE), offsets),
+                   RowView(store.vectors(), rows, projection), columns, nprobe, rerank)
+
+    def count(self):
+        return len(self.records)
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None, nprobe=None):
+        """
+        Same arguments and result shape as NumpyCollection.query; nprobe
+        overrides the configured number of cells scanned. A where filter
+        is applied inside the probed cells, so a very selective filter can
+        return fewer than n_results.
+        """
+        mask = self.columns.mask(where) if where else None
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query in np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32)):
+            positions, similarities = self.index.search(query, self.vectors, n_results, nprobe or self.nprobe,
+                                                        self.rerank, mask)
+            hits = self.records.read(positions)
+            results["ids"].append([hit["id"] for hit in hits])
+            results["documents"].append([hit["document"] for hit in hits])
+            results["metadatas"].append([hit["metadata"] for hit in hits])
+            results["distances"].append([float(1 - s) for s in similarities])
+        return results
+
+    def memory_report(self):
+        """
+        Bytes of every array the collection holds, against holding each
+        vector as float32, plus the measured resident set size of the
+        process (which also counts the interpreter, the model and any
+        memory-mapped store pages the re-scoring touched).
+        """
+        arrays = self.index.memory_bytes()
+        arrays["filter_columns"] = self.columns.nbytes()
+        arrays["positions"] = self.vectors.rows.nbytes + self.records.offsets.nbytes
+        total = sum(arrays.values())
+        full = self.count() * self.index.centroids.shape[1] * 4
+        return dict(arrays, arrays_total=total, full_float32=full,
+                    compression=round(full / total, 2) if total else 0, process_rss=resident_bytes())
+
+
+if __name__ == "__main__":
+    from vector_db_setup import load_db_config
+
+    parser = argparse.ArgumentParser(description="Build the IVF-PQ approximate search index")
+    parser.add_argument("command", choices=["build"])
+    args = parser.parse_args()
+
+    config = load_db_config()
+    collection = IvfPqCollection.build(nlist=config["ivf_nlist"], m=config["pq_m"], nbits=config["pq_bits"])
+    report = collection.memory_report()
+    rss = "" if report["process_rss"] is None else f", process RSS {report['process_rss'] / (1024 * 1024):.1f} MB"
+    print(f"Built IVF-PQ index over {collection.count()} chunks: {collection.index.nlist} cells, "
+          f"{collection.index.m} x {config['pq_bits']}-bit codes, {report['arrays_total'] / (1024 * 1024):.1f} MB "
+          f"of index arrays ({report['compression']}x smaller than float32){rss} in {get_index_path()}")
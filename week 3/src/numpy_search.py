@@ -0,0 +1,316 @@
+import os
+import sys
+import json
+import numbers
+from array import array
+import numpy as np
+
+from embedding_store import EmbeddingStore, get_store_path
+from index_embeddings import chunk_metadata
+from role_registry import RoleRegistry, MASK_BITS, MASK_FIELD, FLAG_FIELD
+from projection import load_projection, projected_name
+
+# Shared artifact reader lives with the week 2 pipeline
+base_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(base_dir, '..', '..', 'week 2', 'src'))
+
+from artifacts import find_artifact, read_records
+
+# Rows scored per block when the matrix is float16, so only one float32 block exists at a time
+SCORE_BLOCK_ROWS = 16384
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.clip(norms, 1e-12, None)
+
+
+def top_k(scores, k):
+    """Positions of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def append_result(results, collection, positions, similarities):
+    """Appends one query's hits to a Chroma-shaped result dict."""
+    results["ids"].append([collection.ids[i] for i in positions])
+    results["documents"].append([collection.documents[i] for i in positions])
+    results["metadatas"].append([collection.metadatas[i] for i in positions])
+    results["distances"].append([float(1 - s) for s in similarities])
+
+
+def resolve_chunks_file(chunks_file=None):
+    """The week 2 chunk artifact the indexer reads, unless one is given."""
+    if chunks_file is None:
+        week2_output = os.path.join(base_dir, '..', '..', 'week 2', 'output')
+        chunks_file = find_artifact(week2_output, 'deduped_chunks') or find_artifact(week2_output, 'tagged_chunks')
+        if chunks_file is None:
+            raise FileNotFoundError(f"No deduped_chunks / tagged_chunks artifact in {week2_output}")
+    return chunks_file
+
+
+def iter_chunk_records(store, chunks_file=None, registry=None, model_name=None):
+    """
+    Streams the chunks of the week 2 artifact that have a vector in the
+    store, with the metadata the indexer would write to Chroma.
+
+    Yields:
+        tuple: (chunk id, store row, document, metadata), in artifact order
+    """
+    # Read-only: bits are only assigned by index_embeddings
+    registry = registry or RoleRegistry.load()
+    for item in read_records(resolve_chunks_file(chunks_file)):
+        row = store.row_of(item['chunk_id'])
+        if row is None:
+            continue
+        yield item['chunk_id'], row, item.get('content', ''), \
+            chunk_metadata(item, model_name or store.model_name, registry)
+
+
+def load_chunk_records(store, chunks_file=None, registry=None, model_name=None):
+    """
+    Returns:
+        tuple: (ids, store rows, documents, metadatas) of iter_chunk_records, as lists
+    """
+    ids, rows, documents, metadatas = [], [], [], []
+    for chunk_id, row, document, metadata in iter_chunk_records(store, chunks_file, registry, model_name):
+        ids.append(chunk_id)
+        rows.append(row)
+        documents.append(document)
+        metadatas.append(metadata)
+    return ids, rows, documents, metadatas
+
+
+def is_number(value):
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+
+class MetadataColumns:
+    """
+    Column-wise copy of the chunk metadata for vectorized where filters.
+
+    Numeric fields become float arrays (NaN where missing); everything else
+    is factorized into int32 codes (-1 where missing), so an equality or
+    $in filter is one integer comparison over the whole corpus. Role
+    access is kept only as the int64 role_mask_<i> columns: a
+    {"role_bit_<n>": True} filter is answered with a shift and an AND
+    instead of one column per role.
+
+    The metadata is consumed as a stream into compact typed arrays, so it
+    can come straight from an artifact without a list of dicts in memory.
+    """
+
+    # kind -> (array typecode, numpy dtype, value of a row without the field)
+    KINDS = {"numeric": ("d", np.float64, float("nan")), "codes": ("i", np.int32, -1), "mask": ("q", np.int64, 0)}
+
+    def __init__(self, metadatas=()):
+        self.size = 0
+        self.numeric = {}
+        self.codes = {}
+        self.values = {}
+        self.role_masks = {}
+
+        flag_prefix = FLAG_FIELD.format("")
+        mask_prefix = MASK_FIELD.format("")
+        columns = {}  # key -> [kind, typed array, lookup]
+        for metadata in metadatas:
+            for key, value in metadata.items():
+                if value is None or key.startswith(flag_prefix):
+                    continue
+                column = columns.get(key)
+                if column is None:
+                    kind = "mask" if key.startswith(mask_prefix) else "numeric" if is_number(value) else "codes"
+                    column = columns[key] = [kind, array(self.KINDS[kind][0]), {}]
+                elif column[0] == "numeric" and not is_number(value):
+                    column[:] = self._factorize(column[1])
+                kind, data, lookup = column
+                self._pad(kind, data, self.size)
+                data.append(lookup.setdefault(value, len(lookup)) if kind == "codes" else value)
+            self.size += 1
+
+        for key, (kind, data, lookup) in columns.items():
+            self._pad(kind, data, self.size)
+            column = np.frombuffer(data, dtype=self.KINDS[kind][1]) if len(data) else \
+                np.zeros(0, dtype=self.KINDS[kind][1])
+            if kind == "mask":
+                self.role_masks[int(key[len(mask_prefix):])] = column
+            elif kind == "numeric":
+                self.numeric[key] = column
+            else:
+                self.codes[key] = column
+                self.values[key] = lookup
+
+    @classmethod
+    def _pad(cls, kind, data, size):
+        if len(data) < size:
+            typecode, _, missing = cls.KINDS[kind]
+            data.extend(array(typecode, [missing]) * (size - len(data)))
+
+    @staticmethod
+    def _factorize(numbers_column):
+        # A field that looked numeric turned out not to be: re-code the rows seen so far
+        lookup = {}
+        codes = array("i", (-1 if v != v else lookup.setdefault(v, len(lookup)) for v in numbers_column))
+        return ["codes", codes, lookup]
+
+    def nbytes(self):
+        return sum(column.nbytes for group in (self.numeric, self.codes, self.role_masks)
+                   for column in group.values())
+
+    def save(self, arrays_file, layout_file):
+        arrays = {}
+        layout = {"size": self.size, "numeric": {}, "codes": {}, "role_masks": {}}
+        for i, (key, column) in enumerate(self.numeric.items()):
+            arrays[f"numeric_{i}"] = column
+            layout["numeric"][key] = f"numeric_{i}"
+        for i, (key, column) in enumerate(self.codes.items()):
+            arrays[f"codes_{i}"] = column
+            # Lookup order is code order
+            layout["codes"][key] = {"array": f"codes_{i}", "values": list(self.values[key])}
+        for field, column in self.role_masks.items():
+            arrays[f"role_mask_{field}"] = column
+            layout["role_masks"][str(field)] = f"role_mask_{field}"
+        np.savez(arrays_file, **arrays)
+        with open(layout_file, 'w', encoding='utf-8') as f:
+            json.dump(layout, f)
+
+    @classmethod
+    def load(cls, arrays_file, layout_file):
+        with open(layout_file, 'r', encoding='utf-8') as f:
+            layout = json.load(f)
+        columns = cls()
+        columns.size = layout["size"]
+        with np.load(arrays_file) as arrays:
+            columns.numeric = {key: arrays[name] for key, name in layout["numeric"].items()}
+            columns.codes = {key: arrays[entry["array"]] for key, entry in layout["codes"].items()}
+            columns.role_masks = {int(field): arrays[name] for field, name in layout["role_masks"].items()}
+        columns.values = {key: {value: code for code, value in enumerate(entry["values"])}
+                          for key, entry in layout["codes"].items()}
+        return columns
+
+    def _role_bit(self, bit):
+        masks = self.role_masks.get(bit // MASK_BITS)
+        if masks is None:
+            return np.zeros(self.size, dtype=bool)
+        return (masks >> (bit % MASK_BITS)) & 1 == 1
+
+    def _compare(self, key, op, value):
+        if key.startswith(FLAG_FIELD.format("")):
+            if op not in ("$eq", "$ne") or not isinstance(value, bool):
+                raise ValueError(f"Role flag '{key}' only supports $eq / $ne with a bool")
+            mask = self._role_bit(int(key[len(FLAG_FIELD.format("")):]))
+            return mask if (op == "$eq") == value else ~mask
+        if key in self.numeric:
+            column = self.numeric[key]
+            if op in ("$in", "$nin"):
+                mask = np.isin(column, np.asarray(value, dtype=np.float64))
+                return mask if op == "$in" else ~mask
+            ops = {"$eq": np.equal, "$ne": np.not_equal, "$gt": np.greater, "$gte": np.greater_equal,
+                   "$lt": np.less, "$lte": np.less_equal}
+            if op not in ops:
+                raise ValueError(f"Unsupported where operator: {op}")
+            with np.errstate(invalid='ignore'):
+                return ops[op](column, value)
+
+        if key not in self.codes:
+            # Unknown field: nothing equals it, everything differs from it
+            return np.full(self.size, op in ("$ne", "$nin"), dtype=bool)
+        column, lookup = self.codes[key], self.values[key]
+        if op in ("$eq", "$ne"):
+            mask = column == lookup.get(value, -2)
+            return mask if op == "$eq" else ~mask
+        if op in ("$in", "$nin"):
+            mask = np.isin(column, [lookup[v] for v in value if v in lookup])
+            return mask if op == "$in" else ~mask
+        raise ValueError(f"Operator {op} needs a numeric field, '{key}' is not")
+
+    def mask(self, where):
+        """Boolean row mask for a Chroma-style where clause ($and/$or, $eq/$ne/$in/$nin/$gt/$gte/$lt/$lte)."""
+        mask = np.ones(self.size, dtype=bool)
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                parts = [self.mask(part) for part in condition]
+                combined = np.logical_and.reduce(parts) if key == "$and" else np.logical_or.reduce(parts)
+                mask &= combined
+            elif isinstance(condition, dict):
+                for op, value in condition.items():
+                    mask &= self._compare(key, op, value)
+            else:
+                mask &= self._compare(key, "$eq", condition)
+        return mask
+
+
+class NumpyCollection:
+    """
+    Exact in-process search over the whole embedding matrix.
+
+    The vectors are held as one contiguous, L2-normalized float32 (or
+    float16) array, so a query is a single matrix-vector product and the
+    top k come from argpartition; recall is exact by construction. It
+    answers query() in the same shape as a Chroma collection, distances
+    being cosine distances (1 - similarity) as with hnsw:space=cosine.
+    """
+
+    def __init__(self, ids, vectors, documents, metadatas, dtype="float32"):
+        self.ids = list(ids)
+        self.matrix = np.ascontiguousarray(normalize_rows(np.asarray(vectors, dtype=np.float32)), dtype=dtype)
+        self.documents = list(documents)
+        self.metadatas = list(metadatas)
+        self.columns = MetadataColumns(self.metadatas)
+
+    @classmethod
+    def load(cls, store_path=None, chunks_file=None, dtype="float32", registry=None):
+        """Loads the embedding store and the chunk metadata the indexer would write to Chroma."""
+        store = EmbeddingStore(store_path or get_store_path())
+        # Optional PCA / truncation configured in embedding_config.json
+        projection = load_projection(store_path=store.path)
+        ids, rows, documents, metadatas = load_chunk_records(store, chunks_file, registry,
+                                                             projected_name(store.model_name, projection))
+        vectors = store.vectors()[rows] if rows else np.zeros((0, store.dim), dtype=np.float32)
+        if projection is not None:
+            vectors = projection.transform(vectors)
+        return cls(ids, vectors, documents, metadatas, dtype=dtype)
+
+    def count(self):
+        return len(self.ids)
+
+    def scores(self, queries):
+        """Cosine similarity of every row against each query, shape (len(queries), count)."""
+        queries = normalize_rows(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        if self.matrix.dtype == np.float32:
+            return queries @ self.matrix.T
+        # numpy has no float16 BLAS; widen one block at a time instead
+        scores = np.empty((len(queries), len(self.ids)), dtype=np.float32)
+        for start in range(0, len(self.ids), SCORE_BLOCK_ROWS):
+            block = self.matrix[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return scores
+
+    def query(self, query_embeddings, n_results=10, where=None, include=None):
+        """
+        Args:
+            query_embeddings (list): One or more query vectors
+            n_results (int): Results per query
+            where (dict): Chroma-style metadata filter
+            include (list): Accepted for compatibility; every field is returned
+
+        Returns:
+            dict: ids / documents / metadatas / distances, one list per query
+        """
+        scores = self.scores(query_embeddings)
+        if where:
+            mask = self.columns.mask(where)
+            scores[:, ~mask] = -np.inf
+            available = int(mask.sum())
+        else:
+            available = len(self.ids)
+        k = min(n_results, available)
+
+        results = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for row_scores in scores:
+            top = top_k(row_scores, k)
+            append_result(results, self, top, row_scores[top])
+        return results
@@ -0,0 +1,180 @@
+import os
+import json
+import hashlib
+import argparse
+import numpy as np
+
+from batch_encoding import load_embedding_config
+from embedding_store import EmbeddingStore, get_store_path
+
+METHODS = ("pca", "truncate")
+
+
+def normalize(x):
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.clip(norms, 1e-12, None)
+
+
+def projection_files(store_path, method, dim):
+    # Kept inside the store directory, so a rebuilt store never pairs with old parameters
+    name = f"projection_{method}{dim}"
+    return os.path.join(store_path, f"{name}.npz"), os.path.join(store_path, f"{name}.json")
+
+
+class Projection:
+    """
+    Reduces embeddings to `dim` dimensions, identically at index and query time.
+
+    "pca" projects onto the top principal components of the corpus (fitted
+    on the store); "truncate" keeps the first `dim` coordinates, which only
+    preserves quality for Matryoshka-trained models, all-MiniLM-L6-v2 is
+    not one. Outputs are re-normalized so cosine scores stay comparable.
+    """
+
+    def __init__(self, method, dim, source_dim, model_name=None, mean=None, components=None,
+                 explained_variance=None):
+        if method not in METHODS:
+            raise ValueError(f"Unknown projection method: {method}")
+        if not 0 < dim <= source_dim:
+            raise ValueError(f"Projection dim must be in 1..{source_dim}, got {dim}")
+        self.method = method
+        self.dim = dim
+        self.source_dim = source_dim
+        self.model_name = model_name
+        self.mean = mean
+        self.components = components
+        self.explained_variance = explained_variance
+
+    @property
+    def tag(self):
+        return f"{self.method}{self.dim}"
+
+    @property
+    def fingerprint(self):
+        """Short hash of the fitted basis; None for truncation, which has no parameters."""
+        if self.method == "truncate":
+            return None
+        digest = hashlib.sha256(np.ascontiguousarray(self.mean).tobytes())
+        digest.update(np.ascontiguousarray(self.components).tobytes())
+        return digest.hexdigest()[:12]
+
+    @classmethod
+    def fit(cls, vectors, method="pca", dim=128, model_name=None, sample_size=100000, seed=0):
+        vectors = np.asarray(vectors)
+        source_dim = vectors.shape[1]
+        if method == "truncate":
+            return cls(method, dim, source_dim, model_name)
+
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(len(vectors), min(len(vectors), sample_size), replace=False))
+        sample = normalize(np.asarray(vectors[rows], dtype=np.float64))
+        mean = sample.mean(axis=0)
+        centered = sample - mean
+        eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered / max(1, len(sample) - 1))
+        order = np.argsort(eigenvalues)[::-1][:dim]
+        explained = float(eigenvalues[order].sum() / max(eigenvalues.sum(), 1e-12))
+        return cls(method, dim, source_dim, model_name, mean.astype(np.float32),
+                   eigenvectors[:, order].T.astype(np.float32), explained)
+
+    def transform(self, vectors):
+        """Projects one (dim,) vector or an (n, dim) matrix; returns normalized float32."""
+        vectors = normalize(np.asarray(vectors, dtype=np.float32))
+        if self.method == "truncate":
+            return normalize(vectors[..., :self.dim])
+        return normalize((vectors - self.mean) @ self.components.T).astype(np.float32)
+
+    def save(self, store_path):
+        arrays_file, meta_file = projection_files(store_path, self.method, self.dim)
+        if self.method == "pca":
+            np.savez(arrays_file, mean=self.mean, components=self.components)
+        meta = {"method": self.method, "dim": self.dim, "source_dim": self.source_dim,
+                "model_name": self.model_name, "explained_variance": self.explained_variance}
+        with open(meta_file, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, store_path, method, dim):
+        arrays_file, meta_file = projection_files(store_path, method, dim)
+        if not os.path.exists(meta_file):
+            raise FileNotFoundError(f"{meta_file} not found, run: python projection.py fit")
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        mean = components = None
+        if method == "pca":
+            with np.load(arrays_file) as arrays:
+                mean, components = arrays["mean"], arrays["components"]
+        return cls(method, dim, meta["source_dim"], meta["model_name"], mean, components,
+                   meta["explained_variance"])
+
+
+def load_projection(config=None, store_path=None):
+    """
+    The projection configured in embedding_config.json, or None when
+    projection_dim is 0 (full width).
+    """
+    config = config or load_embedding_config()
+    if not config["projection_dim"]:
+        return None
+    store_path = store_path or get_store_path()
+    projection = Projection.load(store_path, config["projection_method"], config["projection_dim"])
+    store = EmbeddingStore(store_path)
+    if projection.model_name != store.model_name:
+        raise ValueError(f"Projection was fitted on {projection.model_name} vectors, the store holds "
+                         f"{store.model_name}; run: python projection.py fit")
+    return projection
+
+
+def projected_name(model_name, projection):
+    # Vectors of different projections must never be mixed in one index; a refit
+    # changes the basis without changing method or dim, so the fitted basis is named too
+    if not projection:
+        return model_name
+    name = f"{model_name}:{projection.tag}"
+    return f"{name}@{projection.fingerprint}" if projection.fingerprint else name
+
+
+def carry_over_projection(config, old_store_path, new_store_path):
+    """
+    Copies the configured projection of a previous store into its rebuilt
+    replacement when it was fitted on the same model and width, so the
+    basis (and every vector already indexed with it) stays valid.
+
+    Returns:
+        Projection: The carried projection, or None if there is none to keep
+    """
+    try:
+        projection = Projection.load(old_store_path, config["projection_method"], config["projection_dim"])
+    except (FileNotFoundError, ValueError):
+        return None
+    store = EmbeddingStore(new_store_path)
+    if projection.model_name != store.model_name or projection.source_dim != store.dim:
+        return None
+    projection.save(new_store_path)
+    return projection
+
+
+def fit_store_projection(config=None, store_path=None):
+    config = config or load_embedding_config()
+    store = EmbeddingStore(store_path or get_store_path())
+    projection = Projection.fit(store.vectors(), config["projection_method"], config["projection_dim"],
+                                model_name=store.model_name)
+    projection.save(store.path)
+    return projection
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit the embedding projection on the current store")
+    parser.add_argument("command", choices=["fit"])
+    parser.add_argument("--method", choices=METHODS, help="Default from embedding_config.json")
+    parser.add_argument("--dim", type=int, help="Default from embedding_config.json")
+    args = parser.parse_args()
+
+    config = load_embedding_config()
+    config["projection_method"] = args.method or config["projection_method"]
+    config["projection_dim"] = args.dim or config["projection_dim"]
+    if not config["projection_dim"]:
+        raise SystemExit("projection_dim is 0 in embedding_config.json, pass --dim")
+    projection = fit_store_projection(config)
+    variance = "" if projection.explained_variance is None else \
+        f", {projection.explained_variance:.1%} of the variance kept"
+    print(f"Fitted {projection.tag} projection ({projection.source_dim} -> {projection.dim} dims{variance})")
@@ -0,0 +1,105 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    # all-MiniLM-L6-v2 lowercases its input, so case and spacing never change the vector
+    return _SPACE_RE.sub(" ", query).strip().lower()
+
+
+class QueryEmbeddingCache:
+    """
+    Bounded, thread-safe LRU cache of normalized query -> embedding.
+
+    Entries older than ttl_seconds are treated as misses. The model call
+    happens outside the lock, so concurrent requests never wait on each
+    other's encodes; two threads missing on the same query both encode it
+    and the second result simply replaces the first.
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=3600, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, stored_at = entry
+                if self.ttl_seconds and self.clock() - stored_at > self.ttl_seconds:
+                    del self._entries[key]
+                    self.expired += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+            self.misses += 1
+            return None
+
+    def put(self, key, vector):
+        with self._lock:
+            self._entries[key] = (vector, self.clock())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def get_or_encode(self, query, encode):
+        """
+        Returns the embedding of query, calling encode(normalized_query) on a miss.
+        The cached array is read-only, so callers cannot corrupt shared entries.
+        """
+        key = normalize_query(query)
+        vector = self.get(key)
+        if vector is None:
+            vector = encode(key)
+            vector.setflags(write=False)
+            self.put(key, vector)
+        return vector
+
+    def get_or_encode_many(self, queries, encode_many):
+        """
+        Batch form of get_or_encode: every miss is encoded in a single
+        encode_many(list of normalized queries) call returning one row per query.
+        """
+        keys = [normalize_query(q) for q in queries]
+        vectors = [self.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, vector in zip(keys, vectors) if vector is None))
+        if missing:
+            fresh = {}
+            for key, row in zip(missing, encode_many(missing)):
+                row = row.copy()
+                row.setflags(write=False)
+                fresh[key] = row
+                self.put(key, row)
+            vectors = [fresh[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+        return vectors
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+                "expired": self.expired,
+                "evicted": self.evicted
+            }
@@ -0,0 +1,107 @@
+import os
+import threading
+
+from batch_encoding import load_embedding_config
+from embedding_backends import get_backend
+
+# Everything a backend's output depends on; same key, same shared model
+MODEL_KEYS = ("model_name", "model_revision", "max_seq_length", "onnx_model_dir", "onnx_quantized", "onnx_threads")
+
+_lock = threading.RLock()
+_models = {}
+_clients = {}
+_collections = {}
+_search_collections = {}
+
+
+def model_key(config, backend=None):
+    return (backend or config["backend"],) + tuple(config[key] for key in MODEL_KEYS)
+
+
+def get_model(config=None, backend=None):
+    """
+    The process-wide embedding backend for this configuration, built on
+    first use. SemanticSearch, embeddings.py and the benchmarks share it, so
+    the process holds one copy of the weights. Worker processes of
+    embedding_pool still load their own.
+    """
+    config = config or load_embedding_config()
+    key = model_key(config, backend)
+    with _lock:
+        if key not in _models:
+            _models[key] = get_backend(config, backend)
+        return _models[key]
+
+
+def _connect(path):
+    import chromadb
+    return chromadb.PersistentClient(path=path)
+
+
+def get_chroma_client(path):
+    """One chromadb.PersistentClient per persist directory."""
+    path = os.path.abspath(path)
+    with _lock:
+        if path not in _clients:
+            _clients[path] = _connect(path)
+        return _clients[path]
+
+
+def get_chroma_collection(path, name, create=False):
+    """
+    The shared handle of collection `name`; create=True creates it (cosine
+    space) if missing, otherwise a missing collection raises like Chroma does.
+    """
+    key = (os.path.abspath(path), name)
+    with _lock:
+        if key not in _collections:
+            client = get_chroma_client(path)
+            if create:
+                _collections[key] = client.get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+            else:
+                _collections[key] = client.get_collection(name=name)
+        return _collections[key]
+
+
+def get_search_collection(backend=None):
+    """The shared collection open_search_collection(backend) returns."""
+    from vector_db_setup import load_db_config, get_collection_name, open_search_collection
+
+    key = (backend or load_db_config()["search_backend"], get_collection_name())
+    with _lock:
+        if key not in _search_collections:
+            _search_collections[key] = open_search_collection(key[0])
+        return _search_collections[key]
+
+
+def warm_up(backend=None, search_backend=None):
+    """
+    Builds the model and opens the search collection ahead of the first
+    request, and runs one encode so lazy kernel setup is paid here too.
+    """
+    model = get_model(backend=backend)
+    model.encode("warm up")
+    return model, get_search_collection(search_backend)
+
+
+def close():
+    """Drops every shared instance, closing those that can be; the next get_* rebuilds them."""
+    with _lock:
+        instances = list(_search_collections.values()) + list(_collections.values()) + \
+            list(_clients.values()) + list(_models.values())
+        for registry in (_search_collections, _collections, _clients, _models):
+            registry.clear()
+    for instance in instances:
+        close_instance = getattr(instance, "close", None)
+        if callable(close_instance):
+            close_instance()
+
+
+def stats():
+    with _lock:
+        return {
+            "models": len(_models),
+            "clients": len(_clients),
+            "collections": len(_collections),
+            "search_collections": len(_search_collections)
+        }
@@ -0,0 +1,132 @@
+import os
+import json
+
+# Bits per mask field; 31 keeps every field a positive 32-bit int in any store
+MASK_BITS = 31
+MASK_FIELD = "role_mask_{}"
+FLAG_FIELD = "role_bit_{}"
+VERSION_FIELD = "role_registry_version"
+
+
+def get_registry_path():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, '..', 'config', 'role_registry.json')
+
+
+def get_hierarchy_path():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, '..', '..', 'week 4', 'config', 'role_hierarchy.json')
+
+
+class RoleRegistry:
+    """
+    Versioned role -> bit assignment for chunk access masks.
+
+    Bits are append-only: a role keeps its bit for good and a removed
+    role's bit is never handed out again, so masks written under an older
+    version stay valid. Adding a role bumps the version and only needs a
+    metadata refresh of the index, never a re-embed.
+
+    Which roles may read a chunk comes from the department_access table
+    of week 4's role_hierarchy.json, the same table RBACFilter enforces.
+    Each chunk carries the mask as int fields of MASK_BITS bits
+    (role_mask_0, role_mask_1, ...) plus a boolean role_bit_<n> flag for
+    every registered bit, since Chroma can match flags but has no bitwise
+    operators. Unset bits are written as False rather than left out: Chroma
+    merges metadata on update, so an omitted flag would keep a revoked True.
+    """
+
+    def __init__(self, roles=None, version=0, department_access=None, hierarchy_roles=None):
+        self.roles = dict(roles or {})
+        self.version = version
+        self.hierarchy_roles = [role.lower() for role in hierarchy_roles or []]
+        # department (lowercase) -> roles that may read it
+        self.department_roles = {}
+        for role, departments in (department_access or {}).items():
+            for department in departments:
+                roles_of = self.department_roles.setdefault(department.lower(), [])
+                if role.lower() not in roles_of:
+                    roles_of.append(role.lower())
+
+    @classmethod
+    def load(cls, path=None, hierarchy_path=None):
+        path = path or get_registry_path()
+        with open(hierarchy_path or get_hierarchy_path(), 'r', encoding='utf-8') as f:
+            hierarchy = json.load(f)
+        registry = {"version": 0, "roles": {}}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                registry = json.load(f)
+        return cls(registry["roles"], registry["version"], hierarchy.get("department_access", {}),
+                   list(hierarchy.get("hierarchy", {})))
+
+    def sync(self, roles=None):
+        """
+        Gives every role not yet registered the next free bit; by default
+        the roles of role_hierarchy.json, in their listed order.
+
+        Returns:
+            list: Newly registered roles
+        """
+        roles = self.hierarchy_roles if roles is None else roles
+        added = []
+        for role in roles:
+            role = role.lower()
+            if role not in self.roles:
+                self.roles[role] = max(self.roles.values(), default=-1) + 1
+                added.append(role)
+        if added:
+            self.version += 1
+        return added
+
+    def save(self, path=None):
+        path = path or get_registry_path()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": self.version, "roles": self.roles}, f, indent=4)
+            f.write("\n")
+        os.replace(tmp_path, path)
+
+    @property
+    def field_count(self):
+        return max(self.roles.values(), default=-1) // MASK_BITS + 1
+
+    def bit_of(self, role):
+        return self.roles.get(role.lower())
+
+    def roles_for_department(self, department):
+        return self.department_roles.get((department or "unknown").lower(), [])
+
+    def masks(self, roles):
+        """Mask fields for a set of roles; unregistered roles are ignored."""
+        masks = [0] * self.field_count
+        for role in roles:
+            bit = self.bit_of(role)
+            if bit is not None:
+                masks[bit // MASK_BITS] |= 1 << (bit % MASK_BITS)
+        return {MASK_FIELD.format(i): mask for i, mask in enumerate(masks)}
+
+    def metadata_for_department(self, department):
+        """Mask fields, a flag per registered bit and the registry version for a chunk of this department."""
+        roles = self.roles_for_department(department)
+        metadata = self.masks(roles)
+        allowed = {self.bit_of(role) for role in roles}
+        for bit in sorted(self.roles.values()):
+            metadata[FLAG_FIELD.format(bit)] = bit in allowed
+        metadata[VERSION_FIELD] = self.version
+        return metadata
+
+    def where_for_role(self, role):
+        """Where clause matching the chunks a role may read, or None if the role has no bit."""
+        bit = self.bit_of(role)
+        if bit is None:
+            return None
+        return {FLAG_FIELD.format(bit): True}
+
+
+if __name__ == "__main__":
+    registry = RoleRegistry.load()
+    added = registry.sync()
+    registry.save()
+    print(f"Role registry v{registry.version}: {len(registry.roles)} roles in {registry.field_count} mask field(s)"
+          + (f", added {', '.join(added)}" if added else ""))
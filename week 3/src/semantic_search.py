@@ -1,39 +1,105 @@
 import os
-import chromadb
-from sentence_transformers import SentenceTransformer
 # We can reuse setup from index/vector_db but let's keep it self-contained or import
-from vector_db_setup import get_collection
+from resources import get_model, get_search_collection
+from batch_encoding import load_embedding_config
+from query_cache import QueryEmbeddingCache
+from batching_encoder import BatchingEncoder
+from projection import load_projection
 
 class SemanticSearch:
-    def __init__(self):
+    def __init__(self, backend=None):
         print("Initializing Semantic Search...")
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        self.collection = get_collection()
-        
-    def search(self, query, n_results=5):
-        query_embedding = self.model.encode(query).tolist()
-        
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
-        )
-        
-        # Parse results into a cleaner format
+        # torch or int8 ONNX, chosen by embedding_config.json; must match the indexed vectors.
+        # The model and collection are shared process-wide (resources.py), not owned by this instance
+        config = load_embedding_config()
+        self.model = get_model(config)
+        # Chroma or the exact in-process numpy matrix, chosen by db_config.json "search_backend"
+        self.collection = get_search_collection(backend)
+        # Queries are reduced exactly like the indexed vectors when a projection is configured
+        self.projection = load_projection(config)
+        # Repeated questions skip the model entirely; shared by every search method
+        self.query_cache = QueryEmbeddingCache(config["query_cache_size"], config["query_cache_ttl_seconds"])
+        # Concurrent single-query encodes (API threads) share one model call per micro-batch
+        self.batcher = None
+        if config["query_batch_max_wait_ms"] > 0:
+            batch_size = config["query_batch_max_size"]
+            self.batcher = BatchingEncoder(lambda texts: self.model.encode(texts, batch_size=batch_size),
+                                           batch_size, config["query_batch_max_wait_ms"])
+
+    def encode(self, text):
+        vector = (self.batcher or self.model).encode(text)
+        return vector if self.projection is None else self.projection.transform(vector)
+
+    def stats(self):
+        return {
+            "query_cache": self.query_cache.stats(),
+            "batching": self.batcher.stats() if self.batcher else None
+        }
+
+    def close(self):
+        if self.batcher:
+            self.batcher.close()
+
+    def embed_query(self, query):
+        return self.query_cache.get_or_encode(query, self.encode)
+
+    def embed_queries(self, queries):
+        # Cache misses of the whole batch go through the model in one call
+        return self.query_cache.get_or_encode_many(queries, self.encode)
+
+    @staticmethod
+    def parse_results(results, q=0):
+        # Parse the results of the q-th query embedding into a cleaner format
         parsed_results = []
         if results['ids']:
-            count = len(results['ids'][0])
+            count = len(results['ids'][q])
             for i in range(count):
                 parsed_results.append({
-                    "chunk_id": results['ids'][0][i],
-                    "content": results['documents'][0][i],
-                    "metadata": results['metadatas'][0][i],
-                    "score": results['distances'][0][i] if 'distances' in results else 0
+                    "chunk_id": results['ids'][q][i],
+                    "content": results['documents'][q][i],
+                    "metadata": results['metadatas'][q][i],
+                    "score": results['distances'][q][i] if 'distances' in results else 0
                 })
-        
         return parsed_results
+        
+    def search(self, query, n_results=5, where=None):
+        query_embedding = self.embed_query(query).tolist()
+        
+        # An optional metadata pre-filter, e.g. the departments a role may read
+        results = self.collection.query(
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where=where
+        )
+        
+        return self.parse_results(results)
+
+    def search_batch(self, queries, n_results=5, where=None, embeddings=None):
+        """
+        Searches many queries with one model call and one vector query.
+
+        Args:
+            queries (list): Query strings
+            n_results (int): Results per query
+            where (dict): Metadata pre-filter shared by every query
+            embeddings (list): Precomputed embed_queries(queries) rows; skips the model
+
+        Returns:
+            list: One result list per query, as returned by search()
+        """
+        if not queries:
+            return []
+        if embeddings is None:
+            embeddings = self.embed_queries(queries)
+        results = self.collection.query(
+            query_embeddings=[embedding.tolist() for embedding in embeddings],
+            n_results=n_results,
+            where=where
+        )
+        return [self.parse_results(results, q) for q in range(len(queries))]
 
     def search_with_filter(self, query, department, n_results=5):
-        query_embedding = self.model.encode(query).tolist()
+        query_embedding = self.embed_query(query).tolist()
         
         results = self.collection.query(
             query_embeddings=[query_embedding],
@@ -41,17 +107,7 @@ class SemanticSearch:
             where={"department": department}
         )
         
-        parsed_results = []
-        if results['ids']:
-            count = len(results['ids'][0])
-            for i in range(count):
-                parsed_results.append({
-                    "chunk_id": results['ids'][0][i],
-                    "content": results['documents'][0][i],
-                    "metadata": results['metadatas'][0][i],
-                    "score": results['distances'][0][i]
-                })
-        return parsed_results
+        return self.parse_results(results)
 
 def test_search():
     searcher = SemanticSearch()
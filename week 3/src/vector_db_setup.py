@@ -1,7 +1,38 @@
 import os
 import json
-import chromadb
-from chromadb.config import Settings
+from batch_encoding import load_embedding_config
+from resources import get_chroma_collection
+
+DEFAULT_DB_CONFIG = {
+    "collection_name": "rbac_documents",
+    "persist_directory": "../output/vector_db",
+    "embedding_dimension": 384,
+    "distance_metric": "cosine",
+    "search_backend": "chroma",
+    "numpy_dtype": "float32",
+    "ivf_nlist": 0,
+    "ivf_nprobe": 8,
+    "ivf_rerank": 50,
+    "pq_m": 0,
+    "pq_bits": 8
+}
+
+def load_db_config():
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    config_path = os.path.join(base_dir, '..', 'config', 'db_config.json')
+    config = dict(DEFAULT_DB_CONFIG)
+    if os.path.exists(config_path):
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    return config
+
+def get_collection_name():
+    # Projected vectors get their own collection, so switching width never mixes dimensions
+    config = load_embedding_config()
+    name = load_db_config()["collection_name"]
+    if config["projection_dim"]:
+        name += f"_{config['projection_method']}{config['projection_dim']}"
+    return name
 
 def get_db_path():
     base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -9,29 +40,39 @@ def get_db_path():
 
 def setup_vector_db():
     persist_dir = get_db_path()
-    
-    # Initialize Chroma Client
-    client = chromadb.PersistentClient(path=persist_dir)
-    
-    collection_name = "rbac_documents"
-    
-    # Get or create collection
-    # distance function defaulting to cosine (or l2 in some versions, but we can specify)
-    # metadata={"hnsw:space": "cosine"}
-    collection = client.get_or_create_collection(
-        name=collection_name,
-        metadata={"hnsw:space": "cosine"}
-    )
-    
+
+    collection_name = get_collection_name()
+
+    # Get or create collection, cosine space; the client and handle are shared
+    # process-wide (chromadb is imported on first use, the numpy backend runs without it)
+    collection = get_chroma_collection(persist_dir, collection_name, create=True)
+
     print(f"Vector database initialized at: {persist_dir}")
     print(f"Collection '{collection_name}' ready.")
-    
+
     return collection
 
 def get_collection():
-    persist_dir = get_db_path()
-    client = chromadb.PersistentClient(path=persist_dir)
-    return client.get_collection(name="rbac_documents")
+    return get_chroma_collection(get_db_path(), get_collection_name())
+
+def open_search_collection(backend=None):
+    """
+    Returns the collection SemanticSearch queries, per db_config.json
+    "search_backend": the Chroma collection, the in-process exact
+    NumpyCollection or the approximate IvfPqCollection. All of them answer
+    query(query_embeddings, n_results, where) with the same shape.
+    """
+    config = load_db_config()
+    backend = backend or config["search_backend"]
+    if backend == "chroma":
+        return get_collection()
+    if backend == "numpy":
+        from numpy_search import NumpyCollection
+        return NumpyCollection.load(dtype=config["numpy_dtype"])
+    if backend == "ivfpq":
+        from ivfpq_index import IvfPqCollection
+        return IvfPqCollection.load(nprobe=config["ivf_nprobe"], rerank=config["ivf_rerank"])
+    raise ValueError(f"Unknown search backend: {backend}")
 
 if __name__ == "__main__":
     setup_vector_db()
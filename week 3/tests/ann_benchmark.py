@@ -0,0 +1,140 @@
+import os
+import time
+import json
+import sys
+import argparse
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from batch_encoding import load_embedding_config
+from resources import get_model
+from numpy_search import NumpyCollection
+from ivfpq_index import IvfPqCollection, get_index_path, resident_bytes
+from projection import load_projection
+from vector_db_setup import load_db_config
+
+NPROBE_SWEEP = [1, 2, 4, 8, 16, 32, 64]
+
+def time_queries(collection, query_vectors, k, **kwargs):
+    """Runs every query one at a time, as in serving; returns (ids per query, latencies in ms)."""
+    collection.query(query_embeddings=[query_vectors[0]], n_results=k, **kwargs)  # warm-up
+    found, latencies = [], []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        results = collection.query(query_embeddings=[vector], n_results=k, **kwargs)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(results["ids"][0])
+    return found, latencies
+
+def megabytes(n_bytes):
+    return None if n_bytes is None else n_bytes / (1024 * 1024)
+
+def evaluate(exact, approx, query_vectors, k=10, nprobes=NPROBE_SWEEP, rss=None):
+    """
+    Recall@k of the approximate collection against exact search, with
+    latency and memory, for each nprobe setting.
+
+    Memory is reported twice: arrays_mb sums the arrays each collection
+    holds, rss_mb is the resident set size growth measured while loading
+    it (rss = {"exact": bytes, "ivfpq": bytes}, None when not measured).
+    """
+    rss = rss or {}
+    truth, exact_latencies = time_queries(exact, query_vectors, k)
+    exact_bytes = exact.matrix.nbytes + exact.columns.nbytes()
+    report = {
+        "queries": len(query_vectors),
+        "chunks": exact.count(),
+        "k": k,
+        "exact": {
+            "recall": 1.0,
+            "p50_ms": float(np.percentile(exact_latencies, 50)),
+            "p95_ms": float(np.percentile(exact_latencies, 95)),
+            "arrays_mb": megabytes(exact_bytes),
+            "rss_mb": megabytes(rss.get("exact"))
+        },
+        "ivfpq": []
+    }
+    memory = approx.memory_report()
+    for nprobe in nprobes:
+        if nprobe > approx.index.nlist:
+            break
+        found, latencies = time_queries(approx, query_vectors, k, nprobe=nprobe)
+        hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+        total = sum(len(t) for t in truth)
+        report["ivfpq"].append({
+            "nprobe": nprobe,
+            "recall": hits / total if total else 1.0,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "arrays_mb": megabytes(memory["arrays_total"]),
+            "rss_mb": megabytes(rss.get("ivfpq"))
+        })
+    report["ivfpq_memory"] = memory
+    return report
+
+def load_queries(query_file):
+    with open(query_file, 'r', encoding='utf-8') as f:
+        return [item["query"] for item in json.load(f)]
+
+def run_ann_benchmark(query_file, k=10, build=False, store_path=None, index_path=None, chunks_file=None,
+                      registry=None, output_file=None):
+    queries = load_queries(query_file)
+    print(f"Encoding {len(queries)} queries from {query_file}...")
+    embedding_config = load_embedding_config()
+    model = get_model(embedding_config)
+    query_vectors = np.asarray(model.encode(queries), dtype=np.float32)
+    # Both collections serve projected vectors when a projection is configured;
+    # queries are reduced with the same fit, as SemanticSearch.encode does
+    projection = load_projection(embedding_config, store_path)
+    if projection is not None:
+        query_vectors = projection.transform(query_vectors)
+
+    config = load_db_config()
+    paths = dict(store_path=store_path, index_path=index_path, chunks_file=chunks_file, registry=registry)
+    if build or not os.path.exists(index_path or get_index_path()):
+        print("Building IVF-PQ index...")
+        IvfPqCollection.build(nlist=config["ivf_nlist"], m=config["pq_m"], nbits=config["pq_bits"], **paths)
+    # Resident set growth of each load; the IVF-PQ index first, so the exact matrix is not counted in it
+    rss = {}
+    before = resident_bytes()
+    approx = IvfPqCollection.load(rerank=config["ivf_rerank"], **paths)
+    after = resident_bytes()
+    exact = NumpyCollection.load(store_path, chunks_file, registry=registry)
+    if before is not None:
+        rss = {"ivfpq": after - before, "exact": resident_bytes() - after}
+
+    report = evaluate(exact, approx, query_vectors, k, rss=rss)
+    report["query_file"] = os.path.basename(query_file)
+    report["config"] = {key: config[key] for key in ("ivf_nlist", "ivf_rerank", "pq_m", "pq_bits")}
+    report["config"]["nlist"] = approx.index.nlist
+
+    output_file = output_file or os.path.join(base_dir, '..', 'output', 'ann_benchmark.json')
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nRecall@{k} vs latency vs memory ({report['chunks']} chunks, {report['queries']} queries)")
+    print("-" * 72)
+    print(f"{'Backend':<16} | {'Recall':<7} | {'p50 ms':<8} | {'p95 ms':<8} | {'Arrays MB':<9} | {'RSS MB'}")
+    print("-" * 72)
+    rows = [("exact", report["exact"])] + [(f"ivfpq nprobe={r['nprobe']}", r) for r in report["ivfpq"]]
+    for name, r in rows:
+        rss_mb = "n/a" if r["rss_mb"] is None else f"{r['rss_mb']:.2f}"
+        print(f"{name:<16} | {r['recall']:<7.3f} | {r['p50_ms']:<8.3f} | {r['p95_ms']:<8.3f} | "
+              f"{r['arrays_mb']:<9.2f} | {rss_mb}")
+    print("-" * 72)
+    print(f"Saved to {output_file}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall / latency / memory of the IVF-PQ index against exact search")
+    parser.add_argument("--queries", default=os.path.join(base_dir, 'test_queries.json'),
+                        help="Evaluation set in the test_queries.json format")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--build", action="store_true", help="Rebuild the index before measuring")
+    args = parser.parse_args()
+    run_ann_benchmark(args.queries, args.k, args.build)
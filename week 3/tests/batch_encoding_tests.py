@@ -0,0 +1,57 @@
+import unittest
+import random
+import sys
+import os
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from batch_encoding import encode_sorted, iter_encoded
+
+
+class FakeModel:
+    """Encodes a text as [len, first char code] and records the batches it saw."""
+
+    def __init__(self):
+        self.batches = []
+
+    def encode(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[len(t), ord(t[0]) if t else 0] for t in texts], dtype=np.float32)
+
+
+class TestBatchEncoding(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        self.texts = ["".join(rng.choice("abcdef") for _ in range(rng.randint(1, 300))) for _ in range(250)]
+        self.model = FakeModel()
+
+    def test_restores_input_order(self):
+        vectors = encode_sorted(self.model.encode, self.texts, [len(t) for t in self.texts], batch_size=16)
+        expected = np.array([[len(t), ord(t[0])] for t in self.texts], dtype=np.float32)
+        np.testing.assert_array_equal(vectors, expected)
+
+    def test_batches_are_length_sorted(self):
+        encode_sorted(self.model.encode, self.texts, [len(t) for t in self.texts], batch_size=16)
+        self.assertEqual(len(self.model.batches), 16)
+        self.assertTrue(all(len(b) <= 16 for b in self.model.batches))
+        lengths = [len(t) for batch in self.model.batches for t in batch]
+        self.assertEqual(lengths, sorted(lengths))
+
+    def test_iter_encoded_streams_windows(self):
+        chunks = ({"chunk_id": i, "content": t} for i, t in enumerate(self.texts))
+        pairs = list(iter_encoded(self.model.encode, chunks, batch_size=8, sort_window=100))
+        self.assertEqual([c["chunk_id"] for c, _ in pairs], list(range(len(self.texts))))
+        self.assertEqual([v[0] for _, v in pairs], [len(t) for t in self.texts])
+        # No batch mixes chunks from different windows
+        self.assertEqual(sum(len(b) for b in self.model.batches), len(self.texts))
+
+    def test_empty_input(self):
+        self.assertEqual(list(iter_encoded(self.model.encode, [], batch_size=8)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import threading
+import time
+import sys
+import os
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from batching_encoder import BatchingEncoder
+
+
+class RecordingModel:
+    """Encodes each text as [len(text), batch size], remembering every batch."""
+
+    def __init__(self, delay=0.0, fail=False):
+        self.batches = []
+        self.delay = delay
+        self.fail = fail
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("model failed")
+        return np.array([[len(t), len(texts)] for t in texts], dtype=np.float32)
+
+
+class TestBatchingEncoder(unittest.TestCase):
+    def test_concurrent_queries_share_a_batch(self):
+        # Slow enough that the callers queue up behind the first encode
+        model = RecordingModel(delay=0.05)
+        with BatchingEncoder(model, max_batch_size=64, max_wait_ms=200) as encoder:
+            barrier = threading.Barrier(8)
+            results = {}
+
+            def worker(i):
+                barrier.wait()
+                results[i] = encoder.encode("q" * (i + 1))
+
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            stats = encoder.stats()
+
+        # Each caller gets its own row back
+        self.assertEqual([results[i][0] for i in range(8)], list(range(1, 9)))
+        self.assertLess(len(model.batches), 8)
+        self.assertEqual(stats["requests"], 8)
+        self.assertEqual(sum(size * n for size, n in stats["batch_sizes"].items()), 8)
+        self.assertGreater(stats["mean_batch_size"], 1)
+
+    def test_max_batch_size(self):
+        model = RecordingModel()
+        encoder = BatchingEncoder(model, max_batch_size=3, max_wait_ms=200)
+        # Queued well inside the window, so batches are cut by size, not time
+        futures = [encoder.submit(f"query {i}") for i in range(7)]
+        self.assertEqual([f.result(5)[0] for f in futures], [7] * 7)
+        encoder.close()
+        self.assertTrue(all(len(batch) <= 3 for batch in model.batches))
+        self.assertEqual(sum(len(batch) for batch in model.batches), 7)
+
+    def test_lone_query_is_dispatched_immediately(self):
+        with BatchingEncoder(RecordingModel(), max_batch_size=32, max_wait_ms=500) as encoder:
+            for _ in range(3):
+                start = time.monotonic()
+                encoder.encode("leave policy")
+                elapsed = time.monotonic() - start
+                self.assertLess(elapsed, 0.25)
+            stats = encoder.stats()
+        self.assertEqual(stats["batch_sizes"], {1: 3})
+        self.assertLess(stats["wait_ms_max"], 250)
+
+    def test_queries_during_an_encode_form_the_next_batch(self):
+        model = RecordingModel(delay=0.2)
+        with BatchingEncoder(model, max_batch_size=32, max_wait_ms=0) as encoder:
+            first = encoder.submit("first")
+            time.sleep(0.05)  # the first query is being encoded alone
+            followers = [encoder.submit(f"query {i}") for i in range(5)]
+            first.result(5)
+            for future in followers:
+                future.result(5)
+        self.assertEqual([len(batch) for batch in model.batches], [1, 5])
+
+    def test_list_input_is_encoded_directly(self):
+        model = RecordingModel()
+        with BatchingEncoder(model, max_wait_ms=1000) as encoder:
+            vectors = encoder.encode(["a", "bb"])
+            self.assertEqual(encoder.stats()["batches"], 0)
+        self.assertEqual(vectors[:, 0].tolist(), [1, 2])
+
+    def test_model_error_reaches_every_caller(self):
+        encoder = BatchingEncoder(RecordingModel(fail=True), max_wait_ms=50)
+        futures = [encoder.submit("a"), encoder.submit("b")]
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(5)
+        encoder.close()
+        self.assertGreaterEqual(encoder.stats()["failed_batches"], 1)
+
+    def test_close_drains_queue_and_rejects_new_queries(self):
+        model = RecordingModel(delay=0.05)
+        encoder = BatchingEncoder(model, max_batch_size=2, max_wait_ms=0)
+        futures = [encoder.submit(str(i)) for i in range(5)]
+        encoder.close()
+        self.assertTrue(all(f.done() and f.exception() is None for f in futures))
+        with self.assertRaises(RuntimeError):
+            encoder.submit("late")
+
+
+if __name__ == '__main__':
+    unittest.main()
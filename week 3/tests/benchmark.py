@@ -3,7 +3,6 @@ import time
 import json
 import sys
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 # Add src to path
 base_dir = os.path.dirname(os.path.abspath(__file__))
@@ -11,6 +10,94 @@ src_path = os.path.join(base_dir, '..', 'src')
 sys.path.append(src_path)
 
 from semantic_search import SemanticSearch
+from batch_encoding import load_embedding_config
+from embedding_backends import parity_check, load_parity_texts
+from resources import get_model, get_search_collection
+
+def benchmark_backend(model, queries, docs, repeats=3):
+    model.encode(queries[0])  # warm-up
+    
+    # Query encode latency, one query at a time as in serving
+    latencies = []
+    for _ in range(repeats):
+        for q in queries:
+            start = time.perf_counter()
+            model.encode(q)
+            latencies.append((time.perf_counter() - start) * 1000)
+    
+    # Batch throughput over chunk-sized documents
+    start = time.perf_counter()
+    model.encode(docs, batch_size=32)
+    batch_time = time.perf_counter() - start
+    
+    return {
+        "query_avg_ms": float(np.mean(latencies)),
+        "query_p50_ms": float(np.percentile(latencies, 50)),
+        "query_p95_ms": float(np.percentile(latencies, 95)),
+        "batch_docs_per_sec": len(docs) / batch_time
+    }
+
+def compare_backends(queries):
+    config = load_embedding_config()
+    docs = load_parity_texts(limit=128)
+    backends = {}
+    comparison = {}
+    
+    for name in ("torch", "onnx"):
+        try:
+            backends[name] = get_model(config, name)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"Skipping {name} backend: {e}")
+            continue
+        print(f"Benchmarking {name} backend...")
+        comparison[name] = benchmark_backend(backends[name], queries, docs)
+    
+    if "torch" in backends and "onnx" in backends:
+        comparison["onnx"]["parity"] = parity_check(backends["torch"], backends["onnx"], docs + queries,
+                                                    min_cosine=config["parity_min_cosine"])
+        comparison["onnx"]["query_speedup"] = comparison["torch"]["query_avg_ms"] / comparison["onnx"]["query_avg_ms"]
+        comparison["onnx"]["batch_speedup"] = comparison["onnx"]["batch_docs_per_sec"] / comparison["torch"]["batch_docs_per_sec"]
+    return comparison
+
+def compare_search_backends(searcher, queries, n_results=5, repeats=3):
+    """
+    Times collection.query alone (queries pre-encoded) for Chroma and the
+    exact numpy backend, and measures Chroma's recall@n against numpy.
+    """
+    embeddings = [searcher.embed_query(q).tolist() for q in queries]
+    comparison = {}
+    top_ids = {}
+    
+    for name in ("chroma", "numpy"):
+        try:
+            collection = get_search_collection(name)
+        except (ImportError, FileNotFoundError, ValueError) as e:
+            print(f"Skipping {name} search backend: {e}")
+            continue
+        print(f"Benchmarking {name} search backend...")
+        collection.query(query_embeddings=[embeddings[0]], n_results=n_results)  # warm-up
+        
+        latencies = []
+        for _ in range(repeats):
+            for embedding in embeddings:
+                start = time.perf_counter()
+                collection.query(query_embeddings=[embedding], n_results=n_results)
+                latencies.append((time.perf_counter() - start) * 1000)
+        top_ids[name] = [collection.query(query_embeddings=[e], n_results=n_results)["ids"][0] for e in embeddings]
+        comparison[name] = {
+            "count": collection.count(),
+            "query_avg_ms": float(np.mean(latencies)),
+            "query_p50_ms": float(np.percentile(latencies, 50)),
+            "query_p95_ms": float(np.percentile(latencies, 95))
+        }
+    
+    if "chroma" in top_ids and "numpy" in top_ids:
+        # numpy is exact, so its top n is the ground truth
+        hits = sum(len(set(c) & set(n)) for c, n in zip(top_ids["chroma"], top_ids["numpy"]))
+        total = sum(len(n) for n in top_ids["numpy"])
+        comparison["chroma"][f"recall_at_{n_results}"] = hits / total if total else 1.0
+        comparison["numpy"]["speedup"] = comparison["chroma"]["query_avg_ms"] / comparison["numpy"]["query_avg_ms"]
+    return comparison
 
 def run_benchmark():
     print("Starting Performance Benchmark...")
@@ -18,7 +105,7 @@ def run_benchmark():
     
     # 1. Embedding Benchmark
     print("Benchmarking Embedding Generation...")
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    model = get_model(backend="torch")
     sample_text = "This is a sample document content for benchmarking purposes." * 10
     
     # Single doc
@@ -37,7 +124,12 @@ def run_benchmark():
         "avg_per_doc_ms": batch_time / 10
     }
     
-    # 2. Search Benchmark
+    # 2. Backend comparison (torch vs int8 ONNX)
+    print("Comparing embedding backends...")
+    results['backends'] = compare_backends(["What is the Q4 revenue?", "Employee leave policy",
+                                            "Marketing campaign results", "API architecture", "hiring"] * 4)
+    
+    # 3. Search Benchmark
     print("Benchmarking Search latency...")
     searcher = SemanticSearch()
     queries = ["revenue", "policy", "code", "marketing", "hiring"] * 2 # 10 queries
@@ -55,6 +147,10 @@ def run_benchmark():
         "max_latency_ms": np.max(latencies)
     }
     
+    # 4. Search backend comparison (Chroma HNSW vs exact numpy)
+    print("Comparing search backends...")
+    results['search_backends'] = compare_search_backends(searcher, queries)
+    
     # Output results
     output_file = os.path.join(base_dir, '..', 'output', 'benchmark_results.json')
     with open(output_file, 'w') as f:
@@ -65,9 +161,26 @@ def run_benchmark():
     print(f"Embedding (1 doc):       {single_time:.2f} ms")
     print(f"Embedding (Avg batch):   {batch_time/10:.2f} ms")
     print("-" * 40)
+    for name, stats in results['backends'].items():
+        print(f"{name:<6} query avg/p95:     {stats['query_avg_ms']:.2f} / {stats['query_p95_ms']:.2f} ms")
+        print(f"{name:<6} batch throughput:  {stats['batch_docs_per_sec']:.1f} docs/sec")
+        if 'parity' in stats:
+            parity = stats['parity']
+            print(f"{name:<6} vs torch cosine:   mean {parity['mean_cosine']:.4f}, min {parity['min_cosine']:.4f} "
+                  f"({'PASS' if parity['passed'] else 'FAIL'})")
+            print(f"{name:<6} speedup:           {stats['query_speedup']:.2f}x query, {stats['batch_speedup']:.2f}x batch")
+    print("-" * 40)
     print(f"Search Avg Latency:      {np.mean(latencies):.2f} ms")
     print(f"Search P95 Latency:      {np.percentile(latencies, 95):.2f} ms")
     print("-" * 40)
+    for name, stats in results['search_backends'].items():
+        print(f"{name:<6} query avg/p95:     {stats['query_avg_ms']:.3f} / {stats['query_p95_ms']:.3f} ms "
+              f"({stats['count']} chunks)")
+        if 'recall_at_5' in stats:
+            print(f"{name:<6} recall@5 vs exact: {stats['recall_at_5']:.3f}")
+        if 'speedup' in stats:
+            print(f"{name:<6} speedup:           {stats['speedup']:.2f}x vs chroma")
+    print("-" * 40)
     print(f"Saved to {output_file}")
 
 if __name__ == "__main__":
@@ -0,0 +1,47 @@
+import unittest
+import sys
+import os
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from embedding_backends import cosine_agreement, parity_check, get_backend, hub_model_id
+
+
+class FakeBackend:
+    def __init__(self, noise=0.0):
+        self.noise = noise
+
+    def encode(self, texts, batch_size=32):
+        rng = np.random.default_rng(len(texts))
+        base = np.array([[len(t), t.count("a") + 1, 1.0] for t in texts], dtype=np.float32)
+        return base + self.noise * rng.standard_normal(base.shape)
+
+
+class TestEmbeddingBackends(unittest.TestCase):
+    def test_cosine_agreement(self):
+        a = np.array([[1, 0], [0, 2], [1, 1]], dtype=np.float32)
+        b = np.array([[2, 0], [0, -1], [1, 0]], dtype=np.float32)
+        np.testing.assert_allclose(cosine_agreement(a, b), [1, -1, np.sqrt(0.5)], rtol=1e-6)
+
+    def test_parity_check(self):
+        texts = ["alpha", "banana", "a much longer text about data"]
+        self.assertTrue(parity_check(FakeBackend(), FakeBackend(), texts)["passed"])
+        result = parity_check(FakeBackend(), FakeBackend(noise=5.0), texts, min_cosine=0.999)
+        self.assertFalse(result["passed"])
+        self.assertLessEqual(result["min_cosine"], result["mean_cosine"])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            get_backend({"backend": "tensorrt"})
+
+    def test_hub_model_id(self):
+        self.assertEqual(hub_model_id("all-MiniLM-L6-v2"), "sentence-transformers/all-MiniLM-L6-v2")
+        self.assertEqual(hub_model_id("org/model"), "org/model")
+
+
+if __name__ == '__main__':
+    unittest.main()
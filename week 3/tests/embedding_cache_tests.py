@@ -0,0 +1,105 @@
+import unittest
+import tempfile
+import sys
+import os
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from embedding_cache import EmbeddingCache
+from batch_encoding import iter_encoded_windows
+
+
+class CountingModel:
+    """Deterministic fake model that records how many texts it encoded."""
+
+    def __init__(self, dim=16):
+        self.dim = dim
+        self.encoded = 0
+
+    def encode(self, texts):
+        self.encoded += len(texts)
+        return np.array([np.random.default_rng(abs(hash(t)) % (2 ** 32)).standard_normal(self.dim)
+                         for t in texts], dtype=np.float32)
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def chunks(self, texts):
+        return [{"chunk_id": f"chunk_{i}", "content": t} for i, t in enumerate(texts)]
+
+    def run_encode(self, model, cache, texts):
+        windows = iter_encoded_windows(model.encode, self.chunks(texts), batch_size=4, sort_window=10, cache=cache)
+        return np.vstack([vectors for _, vectors in windows])
+
+    def test_only_changed_chunks_are_encoded(self):
+        texts = [f"document {i} " * (i % 7 + 1) for i in range(25)]
+        model = CountingModel()
+
+        cache = EmbeddingCache(self.path, "model-a", "rev1")
+        first = self.run_encode(model, cache, texts)
+        self.assertEqual(model.encoded, 25)
+        cache.close()
+
+        # A new process: two edited chunks and one new one
+        edited = list(texts)
+        edited[3] = "an edited chunk"
+        edited[17] = "another edited chunk"
+        edited.append("a brand new chunk")
+        model.encoded = 0
+        cache = EmbeddingCache(self.path, "model-a", "rev1")
+        second = self.run_encode(model, cache, edited)
+        self.assertEqual(model.encoded, 3)
+
+        unchanged = [i for i in range(25) if i not in (3, 17)]
+        np.testing.assert_array_equal(second[unchanged], first[unchanged])
+        np.testing.assert_array_equal(second, model.encode(edited))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (23, 3))
+        self.assertAlmostEqual(stats["hit_rate"], 23 / 26, places=4)
+        cache.close()
+
+    def test_model_revision_is_part_of_the_key(self):
+        model = CountingModel()
+        cache = EmbeddingCache(self.path, "model-a", "rev1")
+        self.run_encode(model, cache, ["same text"])
+        cache.close()
+
+        cache = EmbeddingCache(self.path, "model-a", "rev2")
+        self.assertEqual(cache.get_many(["same text"]), {})
+        cache.close()
+        cache = EmbeddingCache(self.path, "model-b", "rev1")
+        self.assertEqual(cache.get_many(["same text"]), {})
+        cache.close()
+
+    def test_size_bound_evicts_least_recently_used(self):
+        # 16 float32 dims = 64 bytes per vector; the limit fits 10 of them
+        cache = EmbeddingCache(self.path, "model-a", max_mb=640 / (1024 * 1024))
+        model = CountingModel()
+        old = [f"old {i}" for i in range(5)]
+        cache.put_many(old, model.encode(old))
+        cache.get_many(old[:2])  # touch two of them
+
+        new = [f"new {i}" for i in range(7)]
+        cache.put_many(new, model.encode(new))
+
+        stats = cache.stats()
+        self.assertLessEqual(stats["entries"] * 64, 640)
+        self.assertGreater(stats["evicted"], 0)
+        self.assertEqual(len(cache.get_many(new)), 7)
+        self.assertEqual(len(cache.get_many(old[:2])), 2)
+        self.assertEqual(cache.get_many(old[2:]), {})
+        cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
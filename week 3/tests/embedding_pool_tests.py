@@ -0,0 +1,63 @@
+import unittest
+import tempfile
+import sys
+import os
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from embedding_pool import iter_pool_encoded_windows
+from embedding_cache import EmbeddingCache
+from embedding_store import EmbeddingStore
+
+CONFIG = {"batch_size": 4, "sort_window": 8}
+
+
+class FakeModel:
+    """Module-level so worker processes can unpickle it as the model factory."""
+
+    def encode(self, texts, batch_size=32):
+        return np.array([[len(t), sum(map(ord, t)) % 97, os.getpid()] for t in texts], dtype=np.float32)
+
+
+def expected(texts):
+    return np.array([[len(t), sum(map(ord, t)) % 97] for t in texts], dtype=np.float32)
+
+
+class TestEmbeddingPool(unittest.TestCase):
+    def setUp(self):
+        self.texts = [f"chunk number {i} " * (i % 5 + 1) for i in range(50)]
+        self.chunks = [{"chunk_id": f"chunk_{i:04d}", "content": t} for i, t in enumerate(self.texts)]
+
+    def test_ordered_output_from_several_workers(self):
+        windows = list(iter_pool_encoded_windows(iter(self.chunks), CONFIG, workers=3, load_model=FakeModel))
+        ids = [c["chunk_id"] for window, _ in windows for c in window]
+        vectors = np.vstack([v for _, v in windows])
+        self.assertEqual(ids, [c["chunk_id"] for c in self.chunks])
+        np.testing.assert_array_equal(vectors[:, :2], expected(self.texts))
+        # Every worker process loaded its own model and did part of the work
+        self.assertGreater(len(set(vectors[:, 2])), 1)
+        self.assertNotIn(os.getpid(), set(vectors[:, 2]))
+
+    def test_writes_store_with_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = EmbeddingCache(os.path.join(tmp, "cache.sqlite"), "fake")
+            cache.put_many(self.texts[:10], np.zeros((10, 3), dtype=np.float32))
+
+            store = EmbeddingStore.create(os.path.join(tmp, "store"), 3)
+            for window, vectors in iter_pool_encoded_windows(self.chunks, CONFIG, workers=2, cache=cache,
+                                                             load_model=FakeModel):
+                store.append([c["chunk_id"] for c in window], vectors)
+
+            self.assertEqual(len(store), 50)
+            np.testing.assert_array_equal(store.vectors()[:10], 0)
+            np.testing.assert_array_equal(store.vectors()[10:, :2], expected(self.texts[10:]))
+            self.assertEqual((cache.stats()["hits"], cache.stats()["misses"]), (10, 40))
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+from unittest import mock
+import tempfile
+import json
+import sys
+import os
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from embedding_store import EmbeddingStore, import_json_embeddings, VECTORS_FILE, IDS_FILE
+
+
+class TestEmbeddingStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "store")
+        self.rng = np.random.default_rng(0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_and_read_back(self):
+        store = EmbeddingStore.create(self.path, 8, model_name="test-model")
+        first = self.rng.standard_normal((5, 8)).astype(np.float32)
+        second = self.rng.standard_normal((3, 8)).astype(np.float32)
+        store.append([f"chunk_{i}" for i in range(5)], first)
+        store.append([f"chunk_{i}" for i in range(5, 8)], second)
+
+        reopened = EmbeddingStore(self.path)
+        self.assertEqual(len(reopened), 8)
+        self.assertEqual(reopened.model_name, "test-model")
+        vectors = reopened.vectors()
+        self.assertIsInstance(vectors, np.memmap)
+        np.testing.assert_array_equal(vectors, np.vstack([first, second]))
+        np.testing.assert_array_equal(reopened.get("chunk_6"), second[1])
+        self.assertIsNone(reopened.get("missing"))
+        self.assertEqual(os.path.getsize(os.path.join(self.path, VECTORS_FILE)), 8 * 8 * 4)
+
+    def test_float16(self):
+        store = EmbeddingStore.create(self.path, 4, dtype="float16")
+        vectors = self.rng.standard_normal((10, 4))
+        store.append([str(i) for i in range(10)], vectors)
+        self.assertEqual(store.vectors().dtype, np.float16)
+        np.testing.assert_allclose(store.vectors(), vectors, atol=1e-2)
+
+    def test_batches_cover_all_rows(self):
+        store = EmbeddingStore.create(self.path, 2)
+        store.append([str(i) for i in range(10)], np.arange(20).reshape(10, 2))
+        batches = list(store.iter_batches(batch_size=4))
+        self.assertEqual([len(ids) for ids, _ in batches], [4, 4, 2])
+        np.testing.assert_array_equal(np.vstack([v for _, v in batches]), store.vectors())
+
+    def test_interrupted_append_is_ignored_and_trimmed(self):
+        store = EmbeddingStore.create(self.path, 2)
+        store.append(["a", "b"], [[1, 2], [3, 4]])
+        # Simulate a crash after the data files were written but before meta.json
+        with open(os.path.join(self.path, VECTORS_FILE), 'ab') as f:
+            f.write(np.ones(2, dtype=np.float32).tobytes())
+        with open(os.path.join(self.path, IDS_FILE), 'a') as f:
+            f.write("partial\n")
+
+        reopened = EmbeddingStore(self.path)
+        self.assertEqual(reopened.ids(), ["a", "b"])
+        reopened.append(["c"], [[5, 6]])
+        self.assertEqual(EmbeddingStore(self.path).ids(), ["a", "b", "c"])
+        np.testing.assert_array_equal(EmbeddingStore(self.path).vectors()[2], [5, 6])
+
+    def test_append_does_not_rescan_ids(self):
+        store = EmbeddingStore.create(self.path, 2)
+        store.append(["a", "b"], [[1, 2], [3, 4]])
+        ids_path = os.path.join(self.path, IDS_FILE)
+        with mock.patch("builtins.open", wraps=open) as opened:
+            store.append(["c"], [[5, 6]])
+        read_modes = [c for c in opened.call_args_list if c.args[0] == ids_path and 'r' in c.args[1]]
+        self.assertEqual(read_modes, [])
+        self.assertEqual(store.meta["ids_bytes"], os.path.getsize(ids_path))
+
+    def test_store_without_ids_bytes_is_measured_and_trimmed(self):
+        store = EmbeddingStore.create(self.path, 2)
+        store.append(["é1", "b"], [[1, 2], [3, 4]])
+        meta = dict(store.meta)
+        del meta["ids_bytes"]
+        EmbeddingStore._write_meta(self.path, meta)
+        with open(os.path.join(self.path, IDS_FILE), 'ab') as f:
+            f.write(b"parti")
+
+        reopened = EmbeddingStore(self.path)
+        reopened.append(["c"], [[5, 6]])
+        self.assertEqual(EmbeddingStore(self.path).ids(), ["é1", "b", "c"])
+        self.assertEqual(EmbeddingStore(self.path).meta["ids_bytes"], len("é1\nb\nc\n".encode('utf-8')))
+
+    def test_shape_mismatch(self):
+        store = EmbeddingStore.create(self.path, 3)
+        with self.assertRaises(ValueError):
+            store.append(["a"], [[1, 2]])
+
+    def test_create_refuses_to_overwrite(self):
+        EmbeddingStore.create(self.path, 3)
+        with self.assertRaises(FileExistsError):
+            EmbeddingStore.create(self.path, 3)
+
+    def test_import_json(self):
+        json_file = os.path.join(self.tmp.name, "chunk_embeddings.json")
+        items = [{"chunk_id": f"chunk_{i}", "content": "x", "embedding": [float(i), 0.5]} for i in range(7)]
+        with open(json_file, 'w') as f:
+            json.dump(items, f)
+        store = import_json_embeddings(json_file, self.path, batch_size=3)
+        self.assertEqual(store.ids(), [item["chunk_id"] for item in items])
+        np.testing.assert_array_equal(store.vectors()[:, 0], np.arange(7))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+import unittest
+import tempfile
+import threading
+import sys
+import os
+from unittest import mock
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+sys.path.append(os.path.join(base_dir, '..', '..', 'week 2', 'src'))
+
+import index_embeddings
+from embedding_store import EmbeddingStore
+from artifacts import write_artifact
+from chunking import content_chunk_id
+from role_registry import RoleRegistry
+from batch_encoding import DEFAULT_CONFIG
+from projection import load_projection, fit_store_projection
+
+
+class FakeCollection:
+    """
+    In-memory stand-in for a Chroma collection, recording every write.
+
+    Like Chroma, writes to an existing ID merge metadata keys into the stored
+    dict and a None value removes the key.
+    """
+
+    def __init__(self):
+        self.items = {}
+        self.upserted = []
+        self.updated = []
+        self.deleted = []
+        self.lock = threading.Lock()
+
+    def get(self, include=None, limit=None, offset=0):
+        ids = sorted(self.items)[offset:offset + limit]
+        return {"ids": ids, "metadatas": [dict(self.items[i]["metadata"]) for i in ids]}
+
+    @staticmethod
+    def merge(stored, metadata):
+        merged = dict(stored)
+        merged.update(metadata)
+        return {key: value for key, value in merged.items() if value is not None}
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        with self.lock:
+            for chunk_id, vector, document, metadata in zip(ids, embeddings, documents, metadatas):
+                stored = self.items.get(chunk_id, {}).get("metadata", {})
+                self.items[chunk_id] = {"vector": vector, "document": document,
+                                        "metadata": self.merge(stored, metadata)}
+            self.upserted.extend(ids)
+
+    def update(self, ids, metadatas):
+        with self.lock:
+            for chunk_id, metadata in zip(ids, metadatas):
+                self.items[chunk_id]["metadata"] = self.merge(self.items[chunk_id]["metadata"], metadata)
+            self.updated.extend(ids)
+
+    def delete(self, ids):
+        with self.lock:
+            for chunk_id in ids:
+                self.items.pop(chunk_id, None)
+            self.deleted.extend(ids)
+
+
+class TestIncrementalIndexing(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store_path = os.path.join(self.tmp.name, "store")
+        self.week2_output = os.path.join(self.tmp.name, "week2")
+        os.makedirs(self.week2_output)
+        self.collection = FakeCollection()
+        self.registry = RoleRegistry({"finance": 0, "hr": 1}, 1, {"finance": ["Finance"], "hr": ["HR"]})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_inputs(self, chunks, model_name="model-a"):
+        store = EmbeddingStore.create(self.store_path, 4, model_name=model_name, overwrite=True)
+        store.append([c["chunk_id"] for c in chunks],
+                     np.array([[len(c["content"]), i, 0, 1] for i, c in enumerate(chunks)], dtype=np.float32))
+        write_artifact(self.week2_output, 'deduped_chunks', chunks)
+
+    def index(self, **kwargs):
+        self.collection.upserted, self.collection.updated, self.collection.deleted = [], [], []
+        with mock.patch.object(index_embeddings, "get_store_path", return_value=self.store_path), \
+                mock.patch.object(index_embeddings, "find_artifact",
+                                  side_effect=lambda _, name: os.path.join(self.week2_output, f"{name}.json")):
+            return index_embeddings.index_data(collection=self.collection, registry=self.registry, workers=3,
+                                               batch_size=2, **kwargs)
+
+    def chunks(self, source, texts, department="Finance"):
+        seen = {}
+        return [{"chunk_id": content_chunk_id(source, text, seen), "content": text, "source": source,
+                 "department": department, "accessible_roles": ["finance", "c-level"], "token_count": 3}
+                for text in texts]
+
+    def test_rerun_only_touches_changes(self):
+        report = self.chunks("report.md", ["q1 revenue", "q2 revenue", "q3 revenue"])
+        policy = self.chunks("policy.md", ["leave policy", "travel policy"], department="HR")
+        self.write_inputs(report + policy)
+        self.assertEqual(self.index()["upserted"], 5)
+        self.assertEqual(len(self.collection.items), 5)
+
+        # Unchanged inputs: nothing is written
+        self.assertEqual(self.index(), {"indexed": 5, "upserted": 0, "updated": 0, "deleted": 0, "unchanged": 5})
+        self.assertEqual(self.collection.upserted, [])
+
+        # One chunk edited, policy.md deleted
+        edited = self.chunks("report.md", ["q1 revenue", "q2 revenue (restated)", "q3 revenue"])
+        self.write_inputs(edited)
+        result = self.index()
+        self.assertEqual((result["upserted"], result["deleted"]), (1, 3))
+        self.assertEqual(self.collection.upserted, [edited[1]["chunk_id"]])
+        self.assertEqual(sorted(self.collection.items), sorted(c["chunk_id"] for c in edited))
+        self.assertEqual(self.collection.items[edited[1]["chunk_id"]]["document"], "q2 revenue (restated)")
+
+    def test_metadata_and_model_changes_are_upserted(self):
+        chunks = self.chunks("report.md", ["q1 revenue", "q2 revenue"])
+        self.write_inputs(chunks)
+        self.index()
+
+        chunks[0]["accessible_roles"] = ["finance"]
+        self.write_inputs(chunks)
+        result = self.index()
+        self.assertEqual((result["upserted"], result["updated"]), (0, 1))
+        self.assertEqual(self.collection.items[chunks[0]["chunk_id"]]["metadata"]["accessible_roles"], "finance")
+
+        self.write_inputs(chunks, model_name="model-b")
+        self.assertEqual(self.index()["upserted"], 2)
+        self.assertEqual(self.index(full=True)["upserted"], 2)
+
+    def test_new_role_is_a_metadata_only_refresh(self):
+        chunks = self.chunks("report.md", ["q1 revenue", "q2 revenue"])
+        self.write_inputs(chunks)
+        self.index()
+        metadata = self.collection.items[chunks[0]["chunk_id"]]["metadata"]
+        self.assertEqual((metadata["role_mask_0"], metadata["role_bit_0"]), (1, True))
+        self.assertIs(metadata["role_bit_1"], False)
+
+        # A new role that may read Finance gets the next bit; the vectors are not re-sent
+        self.registry.department_roles["finance"].append("auditor")
+        self.assertEqual(self.registry.sync(["finance", "hr", "auditor"]), ["auditor"])
+        result = self.index()
+        self.assertEqual((result["upserted"], result["updated"]), (0, 2))
+        metadata = self.collection.items[chunks[0]["chunk_id"]]["metadata"]
+        self.assertEqual((metadata["role_mask_0"], metadata["role_bit_2"], metadata["role_registry_version"]),
+                         (0b101, True, 2))
+
+    def test_revoked_access_clears_flags(self):
+        chunks = self.chunks("report.md", ["q1 revenue", "q2 revenue"])
+        chunks[1]["sources"] = ["report.md", "copy.md"]
+        self.write_inputs(chunks)
+        self.index()
+
+        # Finance loses access to its own department, the second chunk moves to HR and its cluster splits
+        self.registry.department_roles["finance"].remove("finance")
+        chunks[1]["department"] = "HR"
+        del chunks[1]["sources"]
+        self.write_inputs(chunks)
+        self.assertEqual(self.index()["updated"], 2)
+        first, second = (self.collection.items[c["chunk_id"]]["metadata"] for c in chunks)
+        self.assertEqual((first["role_mask_0"], first["role_bit_0"], first["role_bit_1"]), (0, False, False))
+        self.assertEqual((second["role_mask_0"], second["role_bit_0"], second["role_bit_1"]), (0b10, False, True))
+        self.assertNotIn("sources", second)
+
+        # The stored metadata now equals the wanted metadata, so the next run is a no-op
+        self.assertEqual(self.index()["updated"], 0)
+        self.write_inputs(chunks, model_name="model-b")
+        self.index()
+        self.assertEqual(self.index()["unchanged"], 2)
+
+    def test_refitted_projection_reupserts_everything(self):
+        config = dict(DEFAULT_CONFIG, projection_method="pca", projection_dim=2)
+        chunks = self.chunks("report.md", [f"revenue line {i}" * (1 + i % 7) for i in range(80)])
+
+        def stored_matches_projection():
+            projection = load_projection(config, self.store_path)
+            store = EmbeddingStore(self.store_path)
+            return all(np.allclose(item["vector"], projection.transform(store.get(chunk_id)), atol=1e-5)
+                       for chunk_id, item in self.collection.items.items())
+
+        with mock.patch.object(index_embeddings, "load_projection",
+                               side_effect=lambda store_path=None: load_projection(config, store_path)):
+            self.write_inputs(chunks[:50])
+            fit_store_projection(config, self.store_path)
+            self.assertEqual(self.index()["upserted"], 50)
+
+            # The rebuilt store gets a new fit: a different basis for the same method and width
+            self.write_inputs(chunks)
+            fit_store_projection(config, self.store_path)
+            result = self.index()
+            self.assertEqual((result["upserted"], result["unchanged"]), (80, 0))
+            self.assertTrue(stored_matches_projection())
+            self.assertEqual(self.index()["unchanged"], 80)
+
+    def test_content_chunk_ids(self):
+        seen = {}
+        first = content_chunk_id("a.md", "same text", seen)
+        self.assertEqual(first, content_chunk_id("a.md", "same text", {}))
+        self.assertEqual(content_chunk_id("a.md", "same text", seen), first + "_2")
+        self.assertNotEqual(content_chunk_id("b.md", "same text", {}), first)
+        self.assertNotEqual(content_chunk_id("a.md", "other text", {}), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
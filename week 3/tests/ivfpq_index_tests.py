@@ -0,0 +1,198 @@
+import unittest
+import tempfile
+import json
+from unittest import mock
+import sys
+import os
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+sys.path.append(base_dir)
+
+from ivfpq_index import IvfPqIndex, IvfPqCollection, RowView, resolve_pq_m, CHUNKS_FILE
+from numpy_search import NumpyCollection, normalize_rows
+from embedding_store import EmbeddingStore
+from role_registry import RoleRegistry
+from artifacts import write_artifact
+from batch_encoding import DEFAULT_CONFIG
+from vector_db_setup import DEFAULT_DB_CONFIG
+from projection import fit_store_projection
+import ann_benchmark
+from ann_benchmark import evaluate
+
+
+def clustered(rng, n, dim=32, clusters=20, noise=0.3):
+    centers = rng.standard_normal((clusters, dim))
+    return normalize_rows((centers[rng.integers(0, clusters, n)] + noise * rng.standard_normal((n, dim)))
+                          .astype(np.float32))
+
+
+class TestIvfPqIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        rng = np.random.default_rng(0)
+        cls.vectors = clustered(rng, 3000)
+        cls.queries = clustered(np.random.default_rng(1), 40)
+        cls.index = IvfPqIndex.build(cls.vectors, nlist=32, m=8, nbits=6, iterations=10)
+
+    def recall(self, nprobe, rerank=50):
+        hits = 0
+        for query in self.queries:
+            truth = set(np.argsort(-(self.vectors @ query))[:10])
+            found, _ = self.index.search(query, self.vectors, 10, nprobe, rerank)
+            hits += len(truth & set(found))
+        return hits / (10 * len(self.queries))
+
+    def test_recall_grows_with_nprobe(self):
+        low, high = self.recall(1), self.recall(32)
+        self.assertLessEqual(low, high)
+        self.assertGreaterEqual(high, 0.95)
+
+    def test_rescored_similarities_are_exact(self):
+        positions, similarities = self.index.search(self.queries[0], self.vectors, 5, nprobe=32)
+        np.testing.assert_allclose(similarities, self.vectors[positions] @ self.queries[0], atol=1e-5)
+        self.assertTrue(np.all(np.diff(similarities) <= 0))
+
+    def test_codes_are_compact(self):
+        self.assertEqual(self.index.codes.shape, (3000, 8))
+        self.assertEqual(self.index.codes.dtype, np.uint8)
+        self.assertEqual(self.index.list_offsets[-1], 3000)
+        self.assertEqual(sorted(self.index.list_order.tolist()), list(range(3000)))
+
+    def test_mask(self):
+        mask = np.arange(3000) % 3 == 0
+        positions, _ = self.index.search(self.queries[0], self.vectors, 10, nprobe=32, mask=mask)
+        self.assertTrue(np.all(positions % 3 == 0))
+
+    def test_rejects_bad_m(self):
+        with self.assertRaises(ValueError):
+            IvfPqIndex.build(self.vectors[:100], m=5)
+
+    def test_default_m_divides_projected_widths(self):
+        self.assertEqual([resolve_pq_m(dim) for dim in (384, 256, 192, 128, 100)], [48, 32, 24, 16, 10])
+        self.assertEqual(resolve_pq_m(128, 32), 32)
+        with self.assertRaises(ValueError):
+            resolve_pq_m(128, 48)
+
+    def test_blockwise_build_matches_in_memory(self):
+        # A RowView over a shuffled matrix is read in blocks; the index must not depend on it
+        rows = np.random.default_rng(3).permutation(len(self.vectors))
+        matrix = np.empty_like(self.vectors)
+        matrix[rows] = self.vectors
+        with mock.patch("ivfpq_index.BLOCK_ROWS", 256):
+            index = IvfPqIndex.build(RowView(matrix, rows), nlist=32, m=8, nbits=6, iterations=10)
+        np.testing.assert_array_equal(index.codes, self.index.codes)
+        np.testing.assert_array_equal(index.list_order, self.index.list_order)
+
+
+class TestIvfPqCollection(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store_path = os.path.join(self.tmp.name, "store")
+        self.index_path = os.path.join(self.tmp.name, "ivfpq")
+        self.registry = RoleRegistry({"finance": 0, "hr": 1}, 1, {"finance": ["Finance"], "hr": ["HR"]})
+
+        rng = np.random.default_rng(2)
+        self.vectors = clustered(rng, 800)
+        self.ids = [f"chunk_{i}" for i in range(800)]
+        store = EmbeddingStore.create(self.store_path, 32, model_name="model-a")
+        # Store rows in a different order than the artifact
+        store.append(self.ids[::-1], self.vectors[::-1])
+        self.chunks = [{"chunk_id": chunk_id, "content": f"doc {i}", "department": "Finance" if i % 2 else "HR",
+                        "accessible_roles": [], "source": "a.md"} for i, chunk_id in enumerate(self.ids)]
+        self.chunks_file, _ = write_artifact(self.tmp.name, 'deduped_chunks', self.chunks)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def collection_args(self):
+        return dict(store_path=self.store_path, index_path=self.index_path, chunks_file=self.chunks_file,
+                    registry=self.registry)
+
+    def test_build_persist_load(self):
+        built = IvfPqCollection.build(nlist=16, m=8, nbits=6, iterations=10, **self.collection_args())
+        loaded = IvfPqCollection.load(nprobe=16, **self.collection_args())
+        built.nprobe = 16
+        query = self.vectors[7]
+        self.assertEqual(loaded.query(query_embeddings=[query], n_results=5),
+                         built.query(query_embeddings=[query], n_results=5))
+        results = loaded.query(query_embeddings=[query], n_results=1)
+        self.assertEqual(results["ids"], [["chunk_7"]])
+        self.assertEqual(results["documents"], [["doc 7"]])
+
+        filtered = loaded.query(query_embeddings=[query], n_results=5, where=self.registry.where_for_role("hr"))
+        self.assertTrue(all(m["department"] == "HR" for m in filtered["metadatas"][0]))
+
+        memory = loaded.memory_report()
+        self.assertGreater(memory["compression"], 1)
+        self.assertEqual(memory["codes"], 800 * 8)
+        self.assertGreater(memory["process_rss"], 0)
+
+    def test_documents_and_metadata_stay_on_disk(self):
+        collection = IvfPqCollection.build(nlist=16, m=8, nbits=6, iterations=10, **self.collection_args())
+        self.assertFalse(hasattr(collection, "documents") or hasattr(collection, "metadatas"))
+        with open(os.path.join(self.index_path, CHUNKS_FILE), 'rb') as f:
+            self.assertEqual(sum(1 for _ in f), 800)
+        results = collection.query(query_embeddings=[self.vectors[3]], n_results=3)
+        self.assertEqual(results["documents"][0][0], "doc 3")
+        self.assertEqual(results["metadatas"][0][0]["department"], "Finance")
+        self.assertTrue(results["metadatas"][0][0]["role_bit_0"])
+
+    def test_bad_m_is_rejected_before_reading(self):
+        with mock.patch("ivfpq_index.iter_chunk_records") as records:
+            with self.assertRaises(ValueError):
+                IvfPqCollection.build(m=12, **self.collection_args())
+        records.assert_not_called()
+        self.assertFalse(os.path.exists(self.index_path))
+
+    def test_stale_index_is_refused(self):
+        IvfPqCollection.build(nlist=8, m=8, nbits=4, iterations=5, **self.collection_args())
+        self.chunks_file, _ = write_artifact(self.tmp.name, 'deduped_chunks', self.chunks[:-1])
+        with self.assertRaises(ValueError):
+            IvfPqCollection.load(**self.collection_args())
+
+    def test_retagged_or_revoked_access_needs_rebuild(self):
+        # Filter columns are captured at build time, so a changed role table must not be served silently
+        IvfPqCollection.build(nlist=8, m=8, nbits=4, iterations=5, **self.collection_args())
+        self.registry = RoleRegistry({"finance": 0, "hr": 1}, 1, {"finance": ["Finance", "HR"], "hr": ["HR"]})
+        with self.assertRaises(ValueError):
+            IvfPqCollection.load(**self.collection_args())
+
+    def test_evaluation_report(self):
+        approx = IvfPqCollection.build(nlist=16, m=8, nbits=6, iterations=10, **self.collection_args())
+        exact = NumpyCollection.load(self.store_path, self.chunks_file, registry=self.registry)
+        report = evaluate(exact, approx, self.vectors[:10], k=5, nprobes=[1, 16, 64])
+        self.assertEqual([r["nprobe"] for r in report["ivfpq"]], [1, 16])
+        self.assertEqual(report["ivfpq"][-1]["recall"], 1.0)
+        self.assertLess(report["ivfpq"][0]["arrays_mb"], report["exact"]["arrays_mb"])
+        self.assertIsNone(report["exact"]["rss_mb"])
+
+    def test_benchmark_projects_queries(self):
+        config = dict(DEFAULT_CONFIG, projection_method="pca", projection_dim=16)
+        fit_store_projection(config, self.store_path)
+        query_file = os.path.join(self.tmp.name, "queries.json")
+        with open(query_file, 'w', encoding='utf-8') as f:
+            json.dump([{"query": f"question {i}"} for i in range(10)], f)
+
+        # Full-width query vectors from the "model"; the collections hold 16-dim projected rows
+        model = mock.Mock()
+        model.encode.side_effect = lambda texts: self.vectors[:len(texts)]
+        with mock.patch.object(ann_benchmark, "get_model", return_value=model), \
+                mock.patch.object(ann_benchmark, "load_embedding_config", return_value=config), \
+                mock.patch("projection.load_embedding_config", return_value=config), \
+                mock.patch.object(ann_benchmark, "load_db_config",
+                                  return_value=dict(DEFAULT_DB_CONFIG, ivf_nlist=16, pq_m=8, pq_bits=6)):
+            report = ann_benchmark.run_ann_benchmark(query_file, k=5,
+                                                     output_file=os.path.join(self.tmp.name, "out.json"),
+                                                     **self.collection_args())
+        self.assertEqual(report["queries"], 10)
+        self.assertEqual(report["ivfpq_memory"]["full_float32"], 800 * 16 * 4)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, "out.json")))
+        self.assertEqual(report["ivfpq"][-1]["recall"], 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import tempfile
+import sys
+import os
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from numpy_search import NumpyCollection, MetadataColumns
+from embedding_store import EmbeddingStore
+from artifacts import write_artifact
+
+
+class TestNumpyCollection(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.vectors = rng.standard_normal((300, 16)).astype(np.float32)
+        departments = ["Finance", "HR", "Marketing", "engineering"]
+        self.metadatas = [{"department": departments[i % 4], "token_count": i,
+                           "accessible_roles": "finance,c-level" if i % 4 == 0 else "employees"}
+                          for i in range(300)]
+        self.ids = [f"chunk_{i}" for i in range(300)]
+        self.collection = NumpyCollection(self.ids, self.vectors, [f"doc {i}" for i in range(300)], self.metadatas)
+        self.queries = rng.standard_normal((3, 16)).astype(np.float32)
+
+    def expected(self, query, k, allowed=None):
+        normed = self.vectors / np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        scores = normed @ (query / np.linalg.norm(query))
+        rows = [i for i in np.argsort(-scores) if allowed is None or allowed(i)]
+        return [self.ids[i] for i in rows[:k]], [1 - scores[i] for i in rows[:k]]
+
+    def test_exact_top_k(self):
+        results = self.collection.query(query_embeddings=self.queries.tolist(), n_results=10)
+        self.assertEqual(set(results), {"ids", "documents", "metadatas", "distances"})
+        for q, query in enumerate(self.queries):
+            ids, distances = self.expected(query, 10)
+            self.assertEqual(results["ids"][q], ids)
+            np.testing.assert_allclose(results["distances"][q], distances, atol=1e-5)
+            self.assertEqual(results["documents"][q][0], f"doc {ids[0].split('_')[1]}")
+
+    def test_where_filters(self):
+        query = self.queries[0]
+        cases = [
+            ({"department": "HR"}, lambda i: i % 4 == 1),
+            ({"department": {"$in": ["Finance", "Marketing", "unknown"]}}, lambda i: i % 4 in (0, 2)),
+            ({"department": {"$ne": "HR"}}, lambda i: i % 4 != 1),
+            ({"$and": [{"department": {"$nin": ["HR"]}}, {"token_count": {"$gte": 150}}]},
+             lambda i: i % 4 != 1 and i >= 150),
+            ({"$or": [{"department": "HR"}, {"token_count": {"$lt": 10}}]}, lambda i: i % 4 == 1 or i < 10),
+        ]
+        for where, allowed in cases:
+            results = self.collection.query(query_embeddings=[query.tolist()], n_results=7, where=where)
+            self.assertEqual(results["ids"][0], self.expected(query, 7, allowed)[0], where)
+
+    def test_filter_with_fewer_matches_than_k(self):
+        results = self.collection.query(query_embeddings=[self.queries[0]], n_results=5,
+                                        where={"token_count": {"$lt": 3}})
+        self.assertEqual(sorted(results["ids"][0]), ["chunk_0", "chunk_1", "chunk_2"])
+        empty = self.collection.query(query_embeddings=[self.queries[0]], n_results=5, where={"department": "Legal"})
+        self.assertEqual(empty["ids"], [[]])
+
+    def test_float16_matches_float32(self):
+        half = NumpyCollection(self.ids, self.vectors, [""] * 300, self.metadatas, dtype="float16")
+        self.assertEqual(half.matrix.dtype, np.float16)
+        self.assertTrue(half.matrix.flags['C_CONTIGUOUS'])
+        full = self.collection.query(query_embeddings=self.queries, n_results=5)
+        np.testing.assert_allclose(half.query(query_embeddings=self.queries, n_results=5)["distances"],
+                                   full["distances"], atol=2e-3)
+
+    def test_numeric_comparison_on_text_field(self):
+        with self.assertRaises(ValueError):
+            MetadataColumns(self.metadatas).mask({"department": {"$gt": "A"}})
+
+    def test_streamed_columns_and_round_trip(self):
+        metadatas = [{"department": "HR", "token_count": 3, "role_mask_0": 2},
+                     {"department": "Finance", "version": 2},
+                     {"token_count": None, "version": "v3", "role_mask_1": 1},
+                     {}]
+        columns = MetadataColumns(iter(metadatas))
+        self.assertEqual(columns.size, 4)
+        # A field that mixes numbers and text is categorical, rows before the switch included
+        self.assertEqual(columns.mask({"version": 2}).tolist(), [False, True, False, False])
+        self.assertEqual(columns.mask({"version": "v3"}).tolist(), [False, False, True, False])
+        self.assertEqual(columns.mask({"token_count": {"$gte": 3}}).tolist(), [True, False, False, False])
+        self.assertEqual(columns.mask({"role_bit_1": True}).tolist(), [True, False, False, False])
+        self.assertEqual(columns.mask({"role_bit_31": True}).tolist(), [False, False, True, False])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            columns.save(os.path.join(tmp, "columns.npz"), os.path.join(tmp, "columns.json"))
+            loaded = MetadataColumns.load(os.path.join(tmp, "columns.npz"), os.path.join(tmp, "columns.json"))
+        for where in ({"department": {"$in": ["HR", "Finance"]}}, {"version": {"$ne": 2}},
+                      {"$or": [{"role_bit_1": True}, {"token_count": {"$lt": 1}}]}):
+            self.assertEqual(loaded.mask(where).tolist(), columns.mask(where).tolist())
+        self.assertEqual(loaded.nbytes(), columns.nbytes())
+
+    def test_load_from_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = EmbeddingStore.create(os.path.join(tmp, "store"), 16, model_name="model-a")
+            store.append(self.ids[:20], self.vectors[:20])
+            chunks = [{"chunk_id": chunk_id, "content": f"doc {i}", "department": "HR",
+                       "accessible_roles": ["hr"], "source": "a.md"} for i, chunk_id in enumerate(self.ids[:25])]
+            chunks_file, _ = write_artifact(tmp, 'deduped_chunks', reversed(chunks))
+            collection = NumpyCollection.load(os.path.join(tmp, "store"), chunks_file)
+            self.assertEqual(collection.count(), 20)
+            self.assertEqual(collection.metadatas[0]["embedding_model"], "model-a")
+            results = collection.query(query_embeddings=[self.vectors[3]], n_results=1)
+            self.assertEqual(results["ids"], [["chunk_3"]])
+            self.assertAlmostEqual(results["distances"][0][0], 0, places=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
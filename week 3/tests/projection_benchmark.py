@@ -0,0 +1,91 @@
+import os
+import time
+import json
+import sys
+import argparse
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from batch_encoding import load_embedding_config
+from resources import get_model
+from embedding_store import EmbeddingStore, get_store_path
+from numpy_search import NumpyCollection
+from projection import Projection
+
+DIMS = [128, 192, 256]
+METHODS = ["pca", "truncate"]
+
+def measure(collection, query_vectors, k, repeats=3):
+    found = [collection.query(query_embeddings=[v], n_results=k)["ids"][0] for v in query_vectors]
+    latencies = []
+    for _ in range(repeats):
+        for vector in query_vectors:
+            start = time.perf_counter()
+            collection.query(query_embeddings=[vector], n_results=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return found, latencies
+
+def compare_projections(vectors, query_vectors, k=10, dims=DIMS, methods=METHODS):
+    """
+    Index size, exact-search latency and top-k overlap with full-width
+    search for each projection, all on the same in-process numpy backend.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    ids = [str(i) for i in range(len(vectors))]
+    empty_docs, empty_meta = [""] * len(ids), [{}] * len(ids)
+
+    full = NumpyCollection(ids, vectors, empty_docs, empty_meta)
+    truth, latencies = measure(full, query_vectors, k)
+    report = [{"method": "full", "dim": vectors.shape[1], "index_mb": full.matrix.nbytes / (1024 * 1024),
+               "p50_ms": float(np.percentile(latencies, 50)), "overlap": 1.0, "explained_variance": 1.0}]
+
+    for method in methods:
+        for dim in dims:
+            if dim >= vectors.shape[1]:
+                continue
+            projection = Projection.fit(vectors, method, dim)
+            reduced = NumpyCollection(ids, projection.transform(vectors), empty_docs, empty_meta)
+            found, latencies = measure(reduced, projection.transform(query_vectors), k)
+            overlap = sum(len(set(f) & set(t)) for f, t in zip(found, truth)) / sum(len(t) for t in truth)
+            report.append({"method": method, "dim": dim, "index_mb": reduced.matrix.nbytes / (1024 * 1024),
+                           "p50_ms": float(np.percentile(latencies, 50)), "overlap": overlap,
+                           "explained_variance": projection.explained_variance})
+    return report
+
+def run_projection_benchmark(query_file, k=10):
+    with open(query_file, 'r', encoding='utf-8') as f:
+        queries = [item["query"] for item in json.load(f)]
+    print(f"Encoding {len(queries)} queries from {query_file}...")
+    model = get_model(load_embedding_config())
+    query_vectors = np.asarray(model.encode(queries), dtype=np.float32)
+    vectors = EmbeddingStore(get_store_path()).vectors()
+
+    report = compare_projections(vectors, query_vectors, k)
+    output_file = os.path.join(base_dir, '..', 'output', 'projection_benchmark.json')
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    with open(output_file, 'w') as f:
+        json.dump({"chunks": len(vectors), "queries": len(queries), "k": k, "results": report}, f, indent=2)
+
+    print(f"\nTop-{k} overlap with full-width search ({len(vectors)} chunks, {len(queries)} queries)")
+    print("-" * 64)
+    print(f"{'Projection':<14} | {'Index MB':<9} | {'p50 ms':<8} | {'Overlap':<7} | {'Variance'}")
+    print("-" * 64)
+    for r in report:
+        variance = "" if r["explained_variance"] is None else f"{r['explained_variance']:.1%}"
+        print(f"{r['method'] + str(r['dim']):<14} | {r['index_mb']:<9.2f} | {r['p50_ms']:<8.3f} | "
+              f"{r['overlap']:<7.3f} | {variance}")
+    print("-" * 64)
+    print(f"Saved to {output_file}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall vs cost of PCA / truncated embeddings")
+    parser.add_argument("--queries", default=os.path.join(base_dir, 'test_queries.json'),
+                        help="Evaluation set in the test_queries.json format")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    args = parser.parse_args()
+    run_projection_benchmark(args.queries, args.k)
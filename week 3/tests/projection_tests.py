@@ -0,0 +1,110 @@
+import unittest
+import tempfile
+import sys
+import os
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+sys.path.append(base_dir)
+
+from projection import Projection, load_projection, fit_store_projection, projected_name, carry_over_projection
+from embedding_store import EmbeddingStore
+from batch_encoding import DEFAULT_CONFIG
+from projection_benchmark import compare_projections
+
+
+def low_rank(rng, n, dim=64, rank=12):
+    # Most of the variance in a few directions, as with real sentence embeddings
+    basis = rng.standard_normal((rank, dim))
+    vectors = rng.standard_normal((n, rank)) @ basis + 0.05 * rng.standard_normal((n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+class TestProjection(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store_path = os.path.join(self.tmp.name, "store")
+        self.vectors = low_rank(np.random.default_rng(0), 1000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pca_preserves_neighbours(self):
+        projection = Projection.fit(self.vectors, "pca", 16)
+        reduced = projection.transform(self.vectors)
+        self.assertEqual(reduced.shape, (1000, 16))
+        np.testing.assert_allclose(np.linalg.norm(reduced, axis=1), 1, atol=1e-5)
+        self.assertGreater(projection.explained_variance, 0.95)
+
+        query = self.vectors[:20]
+        full = np.argsort(-(query @ self.vectors.T), axis=1)[:, :10]
+        small = np.argsort(-(projection.transform(query) @ reduced.T), axis=1)[:, :10]
+        overlap = np.mean([len(set(a) & set(b)) / 10 for a, b in zip(full, small)])
+        self.assertGreater(overlap, 0.8)
+
+    def test_single_vector_matches_batch(self):
+        projection = Projection.fit(self.vectors, "pca", 16)
+        np.testing.assert_allclose(projection.transform(self.vectors[3]), projection.transform(self.vectors)[3],
+                                   atol=1e-6)
+
+    def test_truncate(self):
+        projection = Projection.fit(self.vectors, "truncate", 8)
+        reduced = projection.transform(self.vectors[:2])
+        expected = self.vectors[:2, :8] / np.linalg.norm(self.vectors[:2, :8], axis=1, keepdims=True)
+        np.testing.assert_allclose(reduced, expected, atol=1e-6)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Projection.fit(self.vectors, "pca", 128)
+        with self.assertRaises(ValueError):
+            Projection.fit(self.vectors, "svd", 8)
+
+    def test_stored_with_the_store(self):
+        store = EmbeddingStore.create(self.store_path, 64, model_name="model-a")
+        store.append([str(i) for i in range(1000)], self.vectors)
+        config = dict(DEFAULT_CONFIG, projection_method="pca", projection_dim=16)
+
+        self.assertIsNone(load_projection(dict(config, projection_dim=0), self.store_path))
+        with self.assertRaises(FileNotFoundError):
+            load_projection(config, self.store_path)
+
+        fitted = fit_store_projection(config, self.store_path)
+        loaded = load_projection(config, self.store_path)
+        np.testing.assert_allclose(loaded.transform(self.vectors[:5]), fitted.transform(self.vectors[:5]))
+        self.assertEqual(projected_name("model-a", loaded), f"model-a:pca16@{fitted.fingerprint}")
+        self.assertEqual(projected_name("model-a", None), "model-a")
+        self.assertEqual(projected_name("model-a", Projection("truncate", 16, 64)), "model-a:truncate16")
+
+        # Refitting on other data changes the name, so indexes built with the old basis are replaced
+        refit = Projection.fit(self.vectors[:500], "pca", 16, model_name="model-a")
+        self.assertNotEqual(refit.fingerprint, fitted.fingerprint)
+        self.assertNotEqual(projected_name("model-a", refit), projected_name("model-a", loaded))
+
+        # A rebuilt store of the same model can keep the fitted basis
+        kept_path = self.store_path + "_rebuilt"
+        EmbeddingStore.create(kept_path, 64, model_name="model-a")
+        kept = carry_over_projection(config, self.store_path, kept_path)
+        self.assertEqual(load_projection(config, kept_path).fingerprint, fitted.fingerprint)
+        self.assertEqual(kept.fingerprint, fitted.fingerprint)
+        other_path = self.store_path + "_other"
+        EmbeddingStore.create(other_path, 64, model_name="model-b")
+        self.assertIsNone(carry_over_projection(config, self.store_path, other_path))
+
+        # A rebuilt store does not carry the old parameters
+        EmbeddingStore.create(self.store_path, 64, model_name="model-b", overwrite=True)
+        with self.assertRaises(FileNotFoundError):
+            load_projection(config, self.store_path)
+
+    def test_benchmark_report(self):
+        report = compare_projections(self.vectors, self.vectors[:10], k=5, dims=[8, 32, 64])
+        self.assertEqual([(r["method"], r["dim"]) for r in report],
+                         [("full", 64), ("pca", 8), ("pca", 32), ("truncate", 8), ("truncate", 32)])
+        self.assertAlmostEqual(report[2]["index_mb"] * 2, report[0]["index_mb"])
+        self.assertGreater(report[2]["overlap"], 0.9)
+
+
+if __name__ == '__main__':
+    unittest.main()
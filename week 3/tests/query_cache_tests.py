@@ -0,0 +1,111 @@
+import unittest
+import threading
+import sys
+import os
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from query_cache import QueryEmbeddingCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, text):
+        with self.lock:
+            self.calls.append(text)
+        return np.array([len(text), 1.0], dtype=np.float32)
+
+
+class TestQueryEmbeddingCache(unittest.TestCase):
+    def test_normalization(self):
+        self.assertEqual(normalize_query("  Q4   Revenue\n"), "q4 revenue")
+
+    def test_hits_share_normalized_key(self):
+        cache, encode = QueryEmbeddingCache(max_size=10), CountingEncoder()
+        first = cache.get_or_encode("Q4 revenue", encode)
+        second = cache.get_or_encode("  q4  REVENUE ", encode)
+        self.assertIs(first, second)
+        self.assertEqual(encode.calls, ["q4 revenue"])
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["hit_rate"]), (1, 1, 0.5))
+
+    def test_cached_vectors_are_read_only(self):
+        cache = QueryEmbeddingCache()
+        vector = cache.get_or_encode("leave policy", CountingEncoder())
+        with self.assertRaises(ValueError):
+            vector[0] = 0
+
+    def test_lru_eviction(self):
+        cache, encode = QueryEmbeddingCache(max_size=2), CountingEncoder()
+        cache.get_or_encode("a", encode)
+        cache.get_or_encode("b", encode)
+        cache.get_or_encode("a", encode)  # a is now most recent
+        cache.get_or_encode("c", encode)  # evicts b
+        cache.get_or_encode("a", encode)
+        cache.get_or_encode("b", encode)
+        self.assertEqual(encode.calls, ["a", "b", "c", "b"])
+        self.assertEqual(cache.stats()["evicted"], 2)
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_batch_encodes_misses_in_one_call(self):
+        cache, calls = QueryEmbeddingCache(), []
+
+        def encode_many(texts):
+            calls.append(texts)
+            return np.array([[len(t), 1.0] for t in texts], dtype=np.float32)
+
+        cache.get_or_encode("hiring", CountingEncoder())
+        vectors = cache.get_or_encode_many(["Hiring", "leave policy", "LEAVE  policy", "q4"], encode_many)
+        self.assertEqual(calls, [["leave policy", "q4"]])
+        self.assertEqual([v[0] for v in vectors], [6, 12, 12, 2])
+        self.assertFalse(vectors[1].flags.writeable)
+        self.assertIs(cache.get_or_encode_many(["q4"], encode_many)[0], vectors[3])
+        self.assertEqual(len(calls), 1)
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        cache, encode = QueryEmbeddingCache(ttl_seconds=60, clock=clock), CountingEncoder()
+        cache.get_or_encode("hiring", encode)
+        clock.now = 59
+        cache.get_or_encode("hiring", encode)
+        clock.now = 121
+        cache.get_or_encode("hiring", encode)
+        self.assertEqual(len(encode.calls), 2)
+        self.assertEqual(cache.stats()["expired"], 1)
+
+    def test_thread_safety(self):
+        cache, encode = QueryEmbeddingCache(max_size=8), CountingEncoder()
+        queries = [f"query {i % 12}" for i in range(2000)]
+
+        def worker(offset):
+            for q in queries[offset::4]:
+                self.assertEqual(cache.get_or_encode(q, encode)[0], len(normalize_query(q)))
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"] + stats["misses"], len(queries))
+        self.assertLessEqual(stats["size"], 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from unittest import mock
+import sys
+import os
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+import resources
+import vector_db_setup
+from batch_encoding import DEFAULT_CONFIG
+
+
+class FakeModel:
+    def __init__(self, config, backend=None):
+        self.backend = backend or config["backend"]
+        self.encoded = []
+        self.closed = False
+
+    def encode(self, texts, **kwargs):
+        self.encoded.append(texts)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeClient:
+    def __init__(self, path):
+        self.path = path
+        self.opened = []
+
+    def get_or_create_collection(self, name, metadata=None):
+        self.opened.append(name)
+        return (self.path, name)
+
+    def get_collection(self, name):
+        self.opened.append(name)
+        return (self.path, name)
+
+
+class TestResources(unittest.TestCase):
+    def setUp(self):
+        resources.close()
+        self.patches = [mock.patch.object(resources, "get_backend", side_effect=FakeModel),
+                        mock.patch.object(resources, "_connect", side_effect=FakeClient)]
+        self.get_backend, self.connect = [p.start() for p in self.patches]
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        resources.close()
+
+    def test_model_shared_per_configuration(self):
+        config = dict(DEFAULT_CONFIG)
+        model = resources.get_model(config)
+        self.assertIs(resources.get_model(dict(config, batch_size=8)), model)
+        self.assertIsNot(resources.get_model(config, "onnx"), model)
+        self.assertIsNot(resources.get_model(dict(config, model_revision="abc")), model)
+        self.assertEqual(self.get_backend.call_count, 3)
+
+    def test_chroma_client_and_collection_shared(self):
+        first = vector_db_setup.get_collection()
+        self.assertIs(vector_db_setup.get_collection(), first)
+        self.assertIs(vector_db_setup.setup_vector_db(), first)
+        self.assertEqual(self.connect.call_count, 1)
+        self.assertEqual(resources.stats()["collections"], 1)
+
+    def test_close_releases_and_rebuilds(self):
+        model = resources.get_model(dict(DEFAULT_CONFIG))
+        resources.close()
+        self.assertTrue(model.closed)
+        self.assertEqual(resources.stats(), {"models": 0, "clients": 0, "collections": 0, "search_collections": 0})
+        self.assertIsNot(resources.get_model(dict(DEFAULT_CONFIG)), model)
+
+    def test_warm_up_encodes_once_and_opens_collection(self):
+        with mock.patch.object(vector_db_setup, "load_db_config",
+                               return_value=dict(vector_db_setup.DEFAULT_DB_CONFIG, search_backend="chroma")):
+            model, collection = resources.warm_up()
+        self.assertEqual(model.encoded, ["warm up"])
+        self.assertEqual(collection[1], vector_db_setup.get_collection_name())
+        self.assertEqual(resources.stats()["search_collections"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import tempfile
+import json
+import sys
+import os
+import numpy as np
+
+# Add src to path
+base_dir = os.path.dirname(os.path.abspath(__file__))
+src_path = os.path.join(base_dir, '..', 'src')
+sys.path.append(src_path)
+
+from role_registry import RoleRegistry, MASK_BITS
+from numpy_search import NumpyCollection
+
+
+class TestRoleRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry_path = os.path.join(self.tmp.name, "role_registry.json")
+        self.hierarchy_path = os.path.join(self.tmp.name, "role_hierarchy.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_hierarchy(self, roles):
+        # Role i reads its own department, c-level reads them all
+        access = {role: [f"dept{i}"] for i, role in enumerate(roles)}
+        access["c-level"] = [f"dept{i}" for i in range(len(roles))]
+        with open(self.hierarchy_path, 'w') as f:
+            json.dump({"hierarchy": {role: 50 for role in ["c-level"] + roles},
+                       "department_access": access}, f)
+
+    def load(self):
+        return RoleRegistry.load(self.registry_path, self.hierarchy_path)
+
+    def test_bits_are_append_only(self):
+        self.write_hierarchy(["finance", "hr"])
+        registry = self.load()
+        self.assertEqual(registry.sync(), ["c-level", "finance", "hr"])
+        registry.save(self.registry_path)
+
+        # hr removed, legal added: hr keeps its bit and legal does not reuse it
+        self.write_hierarchy(["finance", "legal"])
+        registry = self.load()
+        self.assertEqual(registry.sync(), ["legal"])
+        self.assertEqual(registry.roles, {"c-level": 0, "finance": 1, "hr": 2, "legal": 3})
+        self.assertEqual(registry.version, 2)
+        self.assertEqual(registry.sync(), [])
+        self.assertEqual(registry.version, 2)
+
+    def test_masks_span_fields_past_31_roles(self):
+        roles = [f"role{i}" for i in range(44)]
+        self.write_hierarchy(roles)
+        registry = self.load()
+        registry.sync()
+        self.assertEqual(registry.field_count, 2)
+
+        metadata = registry.metadata_for_department("DEPT40")
+        bit = registry.bit_of("role40")
+        self.assertEqual(metadata["role_mask_0"], 1)  # c-level
+        self.assertEqual(metadata["role_mask_1"], 1 << (bit - MASK_BITS))
+        self.assertTrue(metadata[f"role_bit_{bit}"])
+        self.assertTrue(all(0 <= metadata[f"role_mask_{i}"] < 2 ** MASK_BITS for i in range(2)))
+        self.assertEqual(registry.where_for_role("ROLE40"), {f"role_bit_{bit}": True})
+        self.assertIsNone(registry.where_for_role("contractor"))
+
+    def test_numpy_backend_filters_on_masks(self):
+        roles = [f"role{i}" for i in range(40)]
+        self.write_hierarchy(roles)
+        registry = self.load()
+        registry.sync()
+
+        rng = np.random.default_rng(1)
+        metadatas = [dict(registry.metadata_for_department(f"dept{i % 40}"), department=f"dept{i % 40}")
+                     for i in range(400)]
+        collection = NumpyCollection([str(i) for i in range(400)], rng.standard_normal((400, 8)),
+                                     [""] * 400, metadatas)
+        self.assertEqual(set(collection.columns.role_masks), {0, 1})
+        self.assertNotIn("role_bit_35", collection.columns.codes)
+
+        for role in ("role3", "role35", "c-level"):
+            results = collection.query(query_embeddings=[rng.standard_normal(8)], n_results=10,
+                                       where=registry.where_for_role(role))
+            departments = {m["department"] for m in results["metadatas"][0]}
+            self.assertEqual(len(results["ids"][0]), 10)
+            if role != "c-level":
+                self.assertEqual(departments, {f"dept{role[4:]}"})
+
+
+if __name__ == '__main__':
+    unittest.main()
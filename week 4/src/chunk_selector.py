@@ -11,6 +11,19 @@ class ChunkSelector:
             
         self.top_k = self.config.get("top_k", 5)
         self.similarity_threshold = self.config.get("similarity_threshold", 0.3)
+        self.max_context_tokens = self.config.get("max_context_tokens", 2000)
+
+    def apply_token_budget(self, chunks):
+        # Uses the token_count stored at index time; chunks indexed before it existed are not counted
+        selected = []
+        used = 0
+        for chunk in chunks:
+            tokens = chunk.get('metadata', {}).get('token_count', 0)
+            if used + tokens > self.max_context_tokens and selected:
+                break
+            selected.append(chunk)
+            used += tokens
+        return selected
 
     def select_chunks(self, filtered_results):
         """
@@ -39,8 +52,8 @@ class ChunkSelector:
         # Sort Ascending (Lower distance = Better)
         valid_chunks.sort(key=lambda x: x['score']) 
         
-        # Slice top-k
-        selected = valid_chunks[:self.top_k]
+        # Slice top-k, then trim to the context token budget
+        selected = self.apply_token_budget(valid_chunks[:self.top_k])
         
         print(f"Selector: Input={len(filtered_results)} | Valid(Dist<{cutoff})={len(valid_chunks)} | Selected={len(selected)}")
         
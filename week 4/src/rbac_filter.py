@@ -17,6 +17,11 @@ class RBACFilter:
         self.role_hierarchy = self.config.get("hierarchy", {})
         self.dept_access = self.config.get("department_access", {})
         
+        # Vector DB filters match exactly, so they need the departments as written in the config
+        # plus their lowercase forms
+        self.raw_dept_access = {k.lower(): list(dict.fromkeys(v + [d.lower() for d in v]))
+                                for k, v in self.dept_access.items()}
+        
         # Normalize dept access keys to lowercase for robust matching
         self.dept_access = {k.lower(): [d.lower() for d in v] for k, v in self.dept_access.items()}
 
@@ -24,6 +29,19 @@ class RBACFilter:
         user_role = user_role.lower()
         return self.dept_access.get(user_role, [])
 
+    def where_for_role(self, user_role):
+        """
+        Metadata pre-filter for the vector query, so retrieval only ranks
+        chunks the role may see.
+        
+        Returns:
+            dict: Chroma-style where clause, or None if the role can see nothing
+        """
+        departments = self.raw_dept_access.get(user_role.lower(), [])
+        if not departments:
+            return None
+        return {"department": {"$in": departments}}
+
     def filter_by_role(self, user_role, search_results):
         """
         Filters search results based on user role.
@@ -13,6 +13,7 @@ try:
     from semantic_search import SemanticSearch
 except ImportError:
     print("Error importing SemanticSearch. Make sure week 3/src is correct.")
+from role_registry import RoleRegistry
     
 from query_processor import QueryProcessor
 from rbac_filter import RBACFilter
@@ -28,6 +29,7 @@ class SearchPipeline:
         self.processor = QueryProcessor()
         self.searcher = SemanticSearch()
         self.rbac = RBACFilter()
+        self.roles = RoleRegistry.load()
         self.selector = ChunkSelector()
         
     def search(self, query, user_role, top_k=5):
@@ -37,13 +39,69 @@ class SearchPipeline:
         processed_query = self.processor.preprocess(query)
         logger.info(f"Processed Query: {processed_query}")
         
-        # 2. Vector Search (Get more results than needed to allow for filtering)
-        # Fetching 5x top_k to ensure we have enough after RBAC
-        raw_results = self.searcher.search(processed_query, n_results=top_k * 5)
+        # 2. Vector Search, restricted to the role's chunks inside the query,
+        # so the top_k hits are all authorized and nothing is over-fetched
+        where = self.where_for_role(user_role)
+        raw_results = [] if where is None else self.searcher.search(processed_query, n_results=top_k, where=where)
         logger.info(f"Vector Search Found: {len(raw_results)}")
         
-        # 3. RBAC Filtering
+        return self.select(query, processed_query, user_role, raw_results, top_k)
+
+    def search_batch(self, queries, user_roles, top_k=5):
+        """
+        Runs many queries through the pipeline with one model call for the
+        whole batch and one vector query per distinct role, instead of one
+        of each per query.
+        
+        Args:
+            queries (list): Query strings
+            user_roles (str or list): One role for all queries, or one per query
+            top_k (int): Results per query
+            
+        Returns:
+            list: One result dict per query, as returned by search()
+        """
+        if isinstance(user_roles, str):
+            user_roles = [user_roles] * len(queries)
+        logger.info(f"Batch Pipeline Start: {len(queries)} queries, {len(set(user_roles))} roles")
+        
+        processed_queries = [self.processor.preprocess(q) for q in queries]
+        
+        # The role pre-filter is part of the vector query, so queries are grouped by role;
+        # roles without any accessible department never reach the model
+        by_role = {}
+        for i, role in enumerate(user_roles):
+            by_role.setdefault(role.lower(), []).append(i)
+        wheres = {role: self.where_for_role(role) for role in by_role}
+        
+        searched = [i for role, positions in by_role.items() if wheres[role] is not None for i in positions]
+        embeddings = dict(zip(searched, self.searcher.embed_queries([processed_queries[i] for i in searched])))
+        
+        raw_results = [[] for _ in queries]
+        for role, positions in by_role.items():
+            if wheres[role] is None:
+                continue
+            found = self.searcher.search_batch([processed_queries[i] for i in positions], n_results=top_k,
+                                               where=wheres[role], embeddings=[embeddings[i] for i in positions])
+            for i, results in zip(positions, found):
+                raw_results[i] = results
+        
+        return [self.select(queries[i], processed_queries[i], user_roles[i], raw_results[i], top_k)
+                for i in range(len(queries))]
+
+    def where_for_role(self, user_role):
+        # A role without a registry bit yet (not re-indexed) falls back to its department list
+        where = self.roles.where_for_role(user_role) or self.rbac.where_for_role(user_role)
+        if where is None:
+            logger.warning(f"Role '{user_role}' has no accessible departments")
+        return where
+
+    def select(self, query, processed_query, user_role, raw_results, top_k):
+        # 3. RBAC Filtering, kept as defense in depth: the pre-filter should already have removed everything
         filtered_results = self.rbac.filter_by_role(user_role, raw_results)
+        if len(filtered_results) != len(raw_results):
+            logger.error(f"RBAC pre-filter leaked {len(raw_results) - len(filtered_results)} "
+                         f"unauthorized results for role '{user_role}'; dropped by post-filter")
         logger.info(f"After RBAC Filter: {len(filtered_results)}")
         
         # 4. Chunk Selection (Re-ranking/Thresholding)
@@ -7,8 +7,31 @@ base_dir = os.path.dirname(os.path.abspath(__file__))
 src_path = os.path.join(base_dir, '..', 'src')
 config_path = os.path.join(base_dir, '..', 'config')
 sys.path.append(src_path)
+sys.path.append(os.path.join(base_dir, '..', '..', 'week 3', 'src'))
 
+import numpy as np
 from rbac_filter import RBACFilter
+from numpy_search import NumpyCollection
+from query_cache import QueryEmbeddingCache
+from role_registry import RoleRegistry
+from semantic_search import SemanticSearch
+from search_pipeline import SearchPipeline
+from query_processor import QueryProcessor
+from chunk_selector import ChunkSelector
+
+class CountingModel:
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.calls = []
+
+    def encode(self, texts):
+        self.calls.append(texts)
+        return np.ones((len(texts), self.dim), dtype=np.float32)
+
+class CountingCollection(NumpyCollection):
+    def query(self, query_embeddings, **kwargs):
+        self.calls = getattr(self, "calls", 0) + 1
+        return super().query(query_embeddings, **kwargs)
 
 class TestRBAC(unittest.TestCase):
     def setUp(self):
@@ -56,6 +79,57 @@ class TestRBAC(unittest.TestCase):
         self.assertIn("General", depts)
         self.assertNotIn("Finance", depts)
 
+    def test_where_for_role(self):
+        where = self.rbac.where_for_role("Finance")
+        self.assertEqual(set(where["department"]["$in"]), {"Finance", "finance", "General", "general", "unknown"})
+        self.assertIsNone(self.rbac.where_for_role("contractor"))
+
+    def test_prefilter_returns_top_k_authorized(self):
+        # 95% of the corpus is HR, a post-filter over 5x top_k would often come back short
+        rng = np.random.default_rng(3)
+        departments = ["Finance" if i % 20 == 0 else "HR" for i in range(400)]
+        collection = NumpyCollection([f"c{i}" for i in range(400)], rng.standard_normal((400, 8)),
+                                     [""] * 400, [{"department": d} for d in departments])
+        results = collection.query(query_embeddings=[rng.standard_normal(8)], n_results=5,
+                                   where=self.rbac.where_for_role("finance"))
+        found = [{"metadata": m} for m in results["metadatas"][0]]
+        self.assertEqual(len(found), 5)
+        self.assertEqual(self.rbac.filter_by_role("finance", found), found)
+
+    def make_pipeline(self):
+        rng = np.random.default_rng(5)
+        roles = RoleRegistry.load()
+        departments = ["Finance", "HR", "General", "Engineering"] * 10
+        vectors = 1 + 0.1 * rng.standard_normal((len(departments), 8))
+        metadatas = [dict(department=d, **roles.metadata_for_department(d)) for d in departments]
+        searcher = SemanticSearch.__new__(SemanticSearch)
+        searcher.model, searcher.projection, searcher.batcher = CountingModel(), None, None
+        searcher.query_cache = QueryEmbeddingCache()
+        searcher.collection = CountingCollection([f"c{i}" for i in range(len(departments))], vectors,
+                                                 [""] * len(departments), metadatas)
+        pipeline = SearchPipeline.__new__(SearchPipeline)
+        pipeline.processor, pipeline.searcher, pipeline.rbac = QueryProcessor(), searcher, self.rbac
+        pipeline.roles, pipeline.selector = roles, ChunkSelector()
+        return pipeline
+
+    def test_search_batch_matches_single_queries(self):
+        pipeline = self.make_pipeline()
+        queries = ["Q4 revenue", "leave policy", "budget forecast", "office hours"]
+        roles = ["finance", "hr", "finance", "contractor"]
+        batch = pipeline.search_batch(queries, roles, top_k=3)
+
+        # One model call for the batch, one vector query per distinct role that may read anything
+        self.assertEqual(pipeline.searcher.collection.calls, 2)
+        self.assertEqual(len(pipeline.searcher.model.calls), 1)
+        self.assertEqual(len(pipeline.searcher.model.calls[0]), 3)
+        self.assertEqual(batch[3]["results"], [])
+        for query, role, result in zip(queries[:3], roles[:3], batch):
+            self.assertEqual(result, pipeline.search(query, role, top_k=3))
+            self.assertEqual(result["filtered_count"], 0)
+            self.assertTrue(result["results"])
+            found = [r["metadata"]["department"] for r in result["results"]]
+            self.assertLessEqual(set(found), set(self.rbac.raw_dept_access[role]))
+
 if __name__ == '__main__':
     # Save results to output
     import json
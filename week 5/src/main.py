@@ -99,6 +99,20 @@ def query_general(request: QueryRequest, user: dict = Depends(RoleChecker(["empl
     if not rag: return {"error": "RAG unavailable"}
     return rag.generate_response(request.query, user["role"])
 
+@app.on_event("startup")
+def warm_up_search():
+    # Pay model and index loading before the first request rather than during it
+    if rag is not None:
+        import resources
+        resources.warm_up()
+
+@app.on_event("shutdown")
+def close_search():
+    if rag is not None:
+        import resources
+        rag.retriever.searcher.close()
+        resources.close()
+
 # Health Check
 @app.get("/health")
 def health_check():